@@ -0,0 +1,26 @@
+"""add users.version for optimistic concurrency
+
+Revision ID: 5e7a1c9b2f48
+Revises: 8c4f2a91d3e6
+Create Date: 2026-10-18 14:03:27.918264
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e7a1c9b2f48'
+down_revision: Union[str, None] = '8c4f2a91d3e6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('version', sa.Integer(), server_default=sa.text('1'), nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('users', 'version')
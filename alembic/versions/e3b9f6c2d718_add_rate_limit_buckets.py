@@ -0,0 +1,37 @@
+"""add rate_limit_buckets table
+
+Revision ID: e3b9f6c2d718
+Revises: c7e1d4a9b25f
+Create Date: 2026-10-18 19:41:36.902514
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'e3b9f6c2d718'
+down_revision: Union[str, None] = 'c7e1d4a9b25f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('rate_limit_buckets',
+    sa.Column('key', sa.String(length=400), nullable=False),
+    sa.Column('tokens', sa.Float(), nullable=True),
+    sa.Column('window_start', sa.Float(), nullable=True),
+    sa.Column('count', sa.Integer(), nullable=True),
+    sa.Column('previous_count', sa.Integer(), nullable=True),
+    sa.Column('updated_at', sa.Float(), nullable=False),
+    sa.Column('allowed', sa.Boolean(), nullable=False),
+    sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('key')
+    )
+    op.create_index(op.f('ix_rate_limit_buckets_expires_at'), 'rate_limit_buckets', ['expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_rate_limit_buckets_expires_at'), table_name='rate_limit_buckets')
+    op.drop_table('rate_limit_buckets')
@@ -0,0 +1,87 @@
+"""
+Application-scoped resources, built once per worker process.
+
+The container owns everything that is expensive to construct or holds open resources (settings, the database
+engine, the email service with its template cache and SMTP pool, the password hashing pool, outbox workers,
+the last-login recorder, the token revocation and primary pin tables, the rate limiter, the concurrency
+limiters).
+`app.main.lifespan` starts it and shuts it down; `app.dependencies` hands its members to request handlers.
+"""
+
+from typing import Optional
+from app.database import Database
+from app.services.email_outbox_service import start_email_outbox_workers, stop_email_outbox_workers
+from app.services.email_service import EmailService
+from app.services.jwt_service import configure_token_verifier
+from app.services.login_activity_service import start_last_login_recorder, stop_last_login_recorder
+from app.services.rate_limit_service import configure_rate_limiter
+from app.services.token_revocation_service import configure_revocation_table, start_revocation_sync, stop_revocation_sync
+from app.services.user_cache import configure_user_cache
+from app.services.user_count_service import configure_user_count_strategy
+from app.utils.concurrency_limit import configure_concurrency_limits
+from app.utils.nickname_gen import configure_nickname_generator
+from app.utils.primary_pins import configure_primary_pins
+from app.utils.security import configure_hashing_pool, configure_password_hasher, shutdown_hashing_pool
+from app.utils.smtp_connection import SMTPClient, get_smtp_client
+from app.utils.template_manager import TemplateManager
+from settings.config import Settings, settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+class AppContainer:
+    def __init__(self, settings: Settings):
+        self.settings = settings
+        self.template_manager = TemplateManager()
+        self.smtp_client: SMTPClient = get_smtp_client()
+        self.email_service = EmailService(template_manager=self.template_manager, smtp_client=self.smtp_client)
+        self.started = False
+
+    async def startup(self):
+        """Connects the database, sizes the hashing pool, warms templates and starts background workers."""
+        settings = self.settings
+        Database.initialize(settings.database_url, settings.debug, settings)
+        if Database.has_replicas():
+            await Database.check_replicas(settings.replica_max_lag_seconds)
+            Database.start_replica_monitor(settings)
+        configure_password_hasher(settings)
+        configure_hashing_pool(settings)
+        configure_user_count_strategy(settings)
+        configure_user_cache(settings)
+        configure_token_verifier(settings)
+        configure_revocation_table(settings)
+        configure_primary_pins(settings)
+        configure_rate_limiter(settings)
+        configure_concurrency_limits(settings)
+        configure_nickname_generator(settings)
+        self.template_manager.warm()
+        start_email_outbox_workers(Database.get_session_factory(), self.email_service, settings)
+        start_last_login_recorder(Database.get_session_factory(), settings)
+        start_revocation_sync(Database.get_session_factory(), settings)
+        self.started = True
+
+    async def shutdown(self):
+        """Stops workers first, then releases pools and connections in reverse order of use."""
+        await stop_email_outbox_workers()
+        await stop_last_login_recorder()
+        await stop_revocation_sync()
+        shutdown_hashing_pool()
+        await self.smtp_client.close()
+        await Database.dispose()
+        self.started = False
+        logger.info("Application container shut down")
+
+
+_container: Optional[AppContainer] = None
+
+def get_container() -> AppContainer:
+    """Returns this process's container, creating it (not started) on first use."""
+    global _container
+    if _container is None:
+        _container = AppContainer(settings)
+    return _container
+
+def reset_container():
+    """Forgets the current container so the next `get_container()` builds a fresh one."""
+    global _container
+    _container = None
@@ -1,21 +1,304 @@
+from builtins import Exception, ValueError, bool, dict, float, id, int, isinstance, len, list, max, round, set, str, sum, type
+import asyncio
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional
+from sqlalchemy import event, exc, text
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from settings.config import Settings, settings
+import logging
 
 Base = declarative_base()
+logger = logging.getLogger(__name__)
+
+# Pool defaults per deployment profile; any `db_pool_*` setting that is set overrides its profile value.
+POOL_PROFILES: Dict[str, dict] = {
+    "development": {
+        "pool_size": 5, "max_overflow": 5, "pool_timeout": 10.0, "pool_recycle": 1800,
+        "pool_pre_ping": True, "statement_cache_size": 100, "leak_threshold_seconds": 30.0,
+    },
+    "test": {
+        "pool_size": 2, "max_overflow": 8, "pool_timeout": 10.0, "pool_recycle": -1,
+        "pool_pre_ping": False, "statement_cache_size": 100, "leak_threshold_seconds": 30.0,
+    },
+    "production": {
+        "pool_size": 20, "max_overflow": 10, "pool_timeout": 5.0, "pool_recycle": 1800,
+        "pool_pre_ping": True, "statement_cache_size": 500, "leak_threshold_seconds": 10.0,
+    },
+}
+
+class PoolMetrics:
+    """
+    Counters fed by pool events: how long callers wait for a connection and how long they hold it.
+
+    A connection still checked out after `leak_threshold_seconds` is reported as a probable leak (a session
+    that was never closed, or a transaction left open across slow work), once when it is noticed and again
+    when it is finally returned.
+    """
+    def __init__(self, leak_threshold_seconds: float = 30.0):
+        self.leak_threshold_seconds = leak_threshold_seconds
+        self.checkouts = 0
+        self.timeouts = 0
+        self.leak_warnings = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._hold_total = 0.0
+        self._hold_max = 0.0
+        self._holds = 0
+        self._outstanding: Dict[int, float] = {}
+        self._reported: set = set()
+
+    def record_wait(self, seconds: float, timed_out: bool = False):
+        if timed_out:
+            self.timeouts += 1
+        else:
+            self.checkouts += 1
+            self._wait_total += seconds
+        self._wait_max = max(self._wait_max, seconds)
+
+    def on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        self._outstanding[id(connection_record)] = time.monotonic()
+
+    def on_checkin(self, dbapi_connection, connection_record):
+        started = self._outstanding.pop(id(connection_record), None)
+        if started is None:
+            return
+        held = time.monotonic() - started
+        self._holds += 1
+        self._hold_total += held
+        self._hold_max = max(self._hold_max, held)
+        if held > self.leak_threshold_seconds:
+            self.leak_warnings += 1
+            logger.warning(f"Database connection was held for {held:.1f}s (leak threshold {self.leak_threshold_seconds}s)")
+        self._reported.discard(id(connection_record))
+
+    def check_leaks(self) -> int:
+        """Logs connections checked out for longer than the threshold; returns how many there are."""
+        now = time.monotonic()
+        leaked = [key for key, started in list(self._outstanding.items()) if now - started > self.leak_threshold_seconds]
+        for key in leaked:
+            if key not in self._reported:
+                self._reported.add(key)
+                self.leak_warnings += 1
+                logger.warning(f"Database connection checked out for {now - self._outstanding[key]:.1f}s and not returned yet")
+        return len(leaked)
+
+    def stats(self) -> dict:
+        return {
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "wait_avg_ms": round(self._wait_total / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+            "wait_max_ms": round(self._wait_max * 1000, 3),
+            "hold_avg_ms": round(self._hold_total / self._holds * 1000, 3) if self._holds else 0.0,
+            "hold_max_ms": round(self._hold_max * 1000, 3),
+            "held_past_threshold": self.check_leaks(),
+            "leak_warnings": self.leak_warnings,
+        }
+
+class InstrumentedAsyncPool(AsyncAdaptedQueuePool):
+    """`AsyncAdaptedQueuePool` that reports checkout waits, hold times and probable leaks to `PoolMetrics`."""
+    def __init__(self, creator, **kw):
+        super().__init__(creator, **kw)
+        self.metrics = PoolMetrics()
+        event.listen(self, "checkout", self._on_checkout)
+        event.listen(self, "checkin", self._on_checkin)
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        self.metrics.on_checkout(dbapi_connection, connection_record, connection_proxy)
+
+    def _on_checkin(self, dbapi_connection, connection_record):
+        self.metrics.on_checkin(dbapi_connection, connection_record)
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            self.metrics.record_wait(time.perf_counter() - started, timed_out=True)
+            raise
+        self.metrics.record_wait(time.perf_counter() - started)
+        return connection
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+def pool_options(config: Settings = settings) -> dict:
+    """Resolves pool settings: the `db_pool_profile` defaults overridden by any explicitly set `db_pool_*` value."""
+    if config.db_pool_profile not in POOL_PROFILES:
+        raise ValueError(f"Unknown database pool profile '{config.db_pool_profile}'")
+    options = dict(POOL_PROFILES[config.db_pool_profile])
+    overrides = {
+        "pool_size": config.db_pool_size,
+        "max_overflow": config.db_max_overflow,
+        "pool_timeout": config.db_pool_timeout_seconds,
+        "pool_recycle": config.db_pool_recycle_seconds,
+        "pool_pre_ping": config.db_pool_pre_ping,
+        "statement_cache_size": config.db_statement_cache_size,
+        "leak_threshold_seconds": config.db_pool_leak_threshold_seconds,
+    }
+    options.update({key: value for key, value in overrides.items() if value is not None})
+    return options
+
+class QueryCounter:
+    """Database round trips made while a `count_queries()` block (e.g. one request) is active."""
+    def __init__(self):
+        self.queries = 0
+        self.commits = 0
+        self.rollbacks = 0
+
+_query_counter: ContextVar[Optional[QueryCounter]] = ContextVar("query_counter", default=None)
+
+@contextmanager
+def count_queries() -> Iterator[QueryCounter]:
+    """Counts statements, commits and rollbacks issued by any engine in the current context."""
+    counter = QueryCounter()
+    token = _query_counter.set(counter)
+    try:
+        yield counter
+    finally:
+        _query_counter.reset(token)
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    counter = _query_counter.get()
+    if counter is not None:
+        counter.queries += 1
+
+@event.listens_for(Engine, "commit")
+def _count_commit(conn):
+    counter = _query_counter.get()
+    if counter is not None:
+        counter.commits += 1
+
+@event.listens_for(Engine, "rollback")
+def _count_rollback(conn):
+    counter = _query_counter.get()
+    if counter is not None:
+        counter.rollbacks += 1
+
+def _create_engine(database_url: str, echo: bool, options: dict):
+    url = make_url(database_url)
+    engine_options = {}
+    if url.get_backend_name() != "sqlite":
+        engine_options.update(
+            poolclass=InstrumentedAsyncPool,
+            pool_size=options["pool_size"],
+            max_overflow=options["max_overflow"],
+            pool_timeout=options["pool_timeout"],
+            pool_recycle=options["pool_recycle"],
+            pool_pre_ping=options["pool_pre_ping"],
+        )
+    if url.get_driver_name() == "asyncpg":
+        engine_options["connect_args"] = {"prepared_statement_cache_size": options["statement_cache_size"]}
+    engine = create_async_engine(database_url, echo=echo, future=True, **engine_options)
+    pool = engine.sync_engine.pool
+    if isinstance(pool, InstrumentedAsyncPool):
+        pool.metrics.leak_threshold_seconds = options["leak_threshold_seconds"]
+    return engine
+
+def _pool_stats(engine) -> dict:
+    pool = engine.sync_engine.pool
+    stats = {"pool_class": type(pool).__name__}
+    if isinstance(pool, AsyncAdaptedQueuePool):
+        stats.update(size=pool.size(), checked_out=pool.checkedout(), checked_in=pool.checkedin(), overflow=max(pool.overflow(), 0))
+    if isinstance(pool, InstrumentedAsyncPool):
+        stats.update(pool.metrics.stats())
+    return stats
+
+# Seconds the replica is behind the primary; 0 when it has replayed everything it received, or is not a standby.
+REPLICA_LAG_QUERY = text(
+    "SELECT CASE"
+    " WHEN NOT pg_is_in_recovery() THEN 0"
+    " WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0"
+    " ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+# session.info key naming the replica a session reads from; absent on primary sessions
+REPLICA_SESSION = "replica"
+
+class Replica:
+    """A read-only replica engine plus the health state used to keep it in or out of rotation."""
+    def __init__(self, name: str, engine):
+        self.name = name
+        self.engine = engine
+        self.session_factory = sessionmaker(
+            bind=engine, class_=AsyncSession, expire_on_commit=False, future=True, info={REPLICA_SESSION: name}
+        )
+        self.healthy = True
+        self.lag_seconds: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    async def measure_lag(self) -> float:
+        async with self.engine.connect() as conn:
+            result = await conn.execute(REPLICA_LAG_QUERY)
+            return float(result.scalar() or 0)
+
+    async def check(self, max_lag_seconds: float, timeout: float) -> bool:
+        try:
+            self.lag_seconds = await asyncio.wait_for(self.measure_lag(), timeout)
+            self.last_error = None
+            healthy = self.lag_seconds <= max_lag_seconds
+        except Exception as e:
+            self.last_error = str(e)
+            healthy = False
+        if healthy != self.healthy:
+            logger.warning(f"Replica {self.name} {'back in' if healthy else 'taken out of'} rotation (lag={self.lag_seconds}, error={self.last_error})")
+        self.healthy = healthy
+        return healthy
+
+    def stats(self) -> dict:
+        return {"name": self.name, "healthy": self.healthy, "lag_seconds": self.lag_seconds, "last_error": self.last_error, **_pool_stats(self.engine)}
 
 class Database:
-    """Handles database connections and sessions."""
+    """
+    Handles database connections and sessions.
+
+    Writes and read-your-writes reads go to the primary. Other reads can use `get_read_session_factory()`,
+    which round-robins across healthy replicas and falls back to the primary when none is available.
+    """
     _engine = None
     _session_factory = None
+    _replicas: List[Replica] = []
+    _next_replica = 0
+    _monitor: Optional[asyncio.Task] = None
 
     @classmethod
-    def initialize(cls, database_url: str, echo: bool = False):
-        """Initialize the async engine and sessionmaker."""
+    def initialize(cls, database_url: str, echo: bool = False, config: Settings = settings):
+        """
+        Initialize the async engines and sessionmakers for the primary and any `database_replica_urls`.
+
+        Pool size, overflow, timeout, recycling, pre-ping and the asyncpg prepared statement cache come from
+        `config` (the application settings by default), see `pool_options`.
+        """
         if cls._engine is None:  # Ensure engine is created once
-            cls._engine = create_async_engine(database_url, echo=echo, future=True)
+            options = pool_options(config)
+            cls._engine = _create_engine(database_url, echo, options)
             cls._session_factory = sessionmaker(
                 bind=cls._engine, class_=AsyncSession, expire_on_commit=False, future=True
             )
+            cls._replicas = [
+                Replica(make_url(url).render_as_string(hide_password=True), _create_engine(url, echo, options))
+                for url in config.database_replica_urls
+            ]
+            cls._next_replica = 0
+
+    @classmethod
+    async def dispose(cls):
+        """Close all pooled connections and forget the engines; `initialize()` may be called again afterwards."""
+        await cls.stop_replica_monitor()
+        for replica in cls._replicas:
+            await replica.engine.dispose()
+        cls._replicas = []
+        if cls._engine is not None:
+            await cls._engine.dispose()
+            cls._engine = None
+            cls._session_factory = None
 
     @classmethod
     def get_session_factory(cls):
@@ -23,3 +306,52 @@ class Database:
         if cls._session_factory is None:
             raise ValueError("Database not initialized. Call `initialize()` first.")
         return cls._session_factory
+
+    @classmethod
+    def has_replicas(cls) -> bool:
+        return bool(cls._replicas)
+
+    @classmethod
+    def get_read_session_factory(cls, use_primary: bool = False):
+        """Returns the next healthy replica's session factory, or the primary's if `use_primary` or none is healthy."""
+        if not use_primary:
+            replicas = [replica for replica in cls._replicas if replica.healthy]
+            if replicas:
+                cls._next_replica += 1
+                return replicas[cls._next_replica % len(replicas)].session_factory
+        return cls.get_session_factory()
+
+    @classmethod
+    async def check_replicas(cls, max_lag_seconds: float, timeout: float = 2.0) -> int:
+        """Health-checks every replica; returns how many are in rotation."""
+        results = await asyncio.gather(*(replica.check(max_lag_seconds, timeout) for replica in cls._replicas))
+        return sum(results)
+
+    @classmethod
+    def start_replica_monitor(cls, config: Settings = settings):
+        """Starts a task that re-checks replica health and lag every `replica_health_check_interval_seconds`."""
+        if cls._replicas and cls._monitor is None:
+            cls._monitor = asyncio.create_task(cls._monitor_replicas(config), name="replica-monitor")
+
+    @classmethod
+    async def stop_replica_monitor(cls):
+        if cls._monitor is not None:
+            cls._monitor.cancel()
+            await asyncio.gather(cls._monitor, return_exceptions=True)
+            cls._monitor = None
+
+    @classmethod
+    async def _monitor_replicas(cls, config: Settings):
+        while True:
+            await cls.check_replicas(config.replica_max_lag_seconds)
+            await asyncio.sleep(config.replica_health_check_interval_seconds)
+
+    @classmethod
+    def pool_stats(cls) -> Optional[dict]:
+        """Pool occupancy and `PoolMetrics` counters for the primary (plus replicas), or None before `initialize()`."""
+        if cls._engine is None:
+            return None
+        stats = _pool_stats(cls._engine)
+        if cls._replicas:
+            stats["replicas"] = [replica.stats() for replica in cls._replicas]
+        return stats
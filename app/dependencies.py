@@ -1,31 +1,85 @@
-from builtins import Exception, dict, str
-from fastapi import Depends, HTTPException
+from builtins import Exception, ValueError, bool, dict, float, isinstance, len, min, str
+import time
+from typing import Optional
+from fastapi import Depends, HTTPException, Request
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.ext.asyncio import AsyncSession
+from app.container import get_container
 from app.database import Database
-from app.utils.template_manager import TemplateManager
 from app.services.email_service import EmailService
 from app.services.jwt_service import decode_token
-from settings.config import Settings
+from app.services.rate_limit_service import get_rate_limiter
+from app.utils.primary_pins import subject_pinned
+from app.utils.rate_limit import retry_after_header
+from settings.config import Settings, settings
 from fastapi import Depends
 
 def get_settings() -> Settings:
-    """Return application settings."""
-    return Settings()
+    """Return the application settings, parsed once per process."""
+    return settings
 
 def get_email_service() -> EmailService:
-    template_manager = TemplateManager()
-    return EmailService(template_manager=template_manager)
+    """Return the process-wide email service (shared template cache and SMTP connection pool)."""
+    return get_container().email_service
+
+def get_session_factory():
+    """Dependency that provides the session factory for work that outlives the request, such as streamed responses."""
+    return Database.get_session_factory()
+
+# Set after a successful write as a fallback for clients without a bearer token; until the timestamp it holds,
+# that client's reads go to the primary.
+PRIMARY_PIN_COOKIE = "db_primary_until"
+
+def reads_pinned_to_primary(request: Request) -> bool:
+    """
+    True if this client wrote within `read_your_writes_seconds`.
+
+    Authenticated clients are pinned by token subject on the server (see `app.utils.primary_pins`). Otherwise
+    the cookie is honoured, but only up to one window ahead, so a client cannot pin itself for longer.
+    """
+    subject = token_subject(request)
+    if subject is not None and subject_pinned(subject):
+        return True
+    now = time.time()
+    try:
+        return now < float(request.cookies.get(PRIMARY_PIN_COOKIE, 0)) <= now + get_settings().read_your_writes_seconds
+    except ValueError:
+        return False
+
+def get_read_session_factory(request: Request):
+    """Session factory for read-only work that outlives the request, on a replica unless the client is pinned to the primary."""
+    return Database.get_read_session_factory(use_primary=reads_pinned_to_primary(request))
+
+async def get_read_db(request: Request) -> AsyncSession:
+    """
+    Dependency that provides a read-only session, on a replica unless the client recently wrote.
+
+    On PostgreSQL the transaction is started READ ONLY; it is rolled back when the request ends.
+    """
+    async_session_factory = Database.get_read_session_factory(use_primary=reads_pinned_to_primary(request))
+    async with async_session_factory() as session:
+        if session.get_bind().dialect.name == "postgresql":
+            await session.connection(execution_options={"postgresql_readonly": True})
+        yield session
 
 async def get_db() -> AsyncSession:
-    """Dependency that provides a database session for each request."""
+    """
+    Dependency that provides the request's unit of work: one session and one transaction, committed once after
+    the endpoint returns and rolled back if it raises.
+
+    Exceptions are re-raised unchanged so the app's exception handlers answer them (503 for a saturated worker
+    pool, a generic 500 otherwise).
+    """
     async_session_factory = Database.get_session_factory()
     async with async_session_factory() as session:
         try:
             yield session
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=str(e))
-        
+            if session.in_transaction():
+                await session.commit()
+        except Exception:
+            await session.rollback()
+            raise
+
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/login")
 
@@ -44,8 +98,72 @@ def get_current_user(token: str = Depends(oauth2_scheme)):
         raise credentials_exception
     return {"user_id": user_id, "role": user_role}
 
+def client_ip(request: Request, trusted_proxies: int) -> Optional[str]:
+    """
+    The client's address.
+
+    Each of the `trusted_proxies` in front of the app appends the address it received the request from to
+    X-Forwarded-For (nginx's `$proxy_add_x_forwarded_for`), so the client is that many entries from the end;
+    anything before it was sent by the client and cannot be trusted.
+    """
+    if trusted_proxies > 0:
+        forwarded = [address.strip() for address in request.headers.get("x-forwarded-for", "").split(",") if address.strip()]
+        if forwarded:
+            return forwarded[-min(trusted_proxies, len(forwarded))]
+    return request.client.host if request.client else None
+
+async def request_email(request: Request) -> Optional[str]:
+    """The account a login or registration is for: the `username` form field or the JSON `email`."""
+    content_type = request.headers.get("content-type", "")
+    try:
+        if content_type.startswith(("application/x-www-form-urlencoded", "multipart/form-data")):
+            email = (await request.form()).get("username")
+        elif content_type.startswith("application/json"):
+            body = await request.json()
+            email = body.get("email") if isinstance(body, dict) else None
+        else:
+            return None
+    except ValueError:
+        return None
+    return email.strip().lower() if isinstance(email, str) and email.strip() else None
+
+def token_subject(request: Request) -> Optional[str]:
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    claims = decode_token(token)
+    return claims.get("sub") if claims else None
+
+def rate_limit(policy: str):
+    """
+    Dependency that rejects a request with 429 and Retry-After once it exceeds a limit of `policy`.
+
+    Declare it ahead of anything expensive (route `dependencies=[...]` run first): it only reads the request,
+    so over-limit traffic is turned away before any password hashing or database work.
+    """
+    async def limiter(request: Request):
+        rate_limiter = get_rate_limiter()
+        if rate_limiter is None:
+            return
+        key_types = rate_limiter.key_types(policy)
+        keys = {}
+        if "ip" in key_types:
+            keys["ip"] = client_ip(request, get_settings().rate_limit_trusted_proxies)
+        if "email" in key_types:
+            keys["email"] = await request_email(request)
+        if "subject" in key_types:
+            keys["subject"] = token_subject(request)
+        decision = await rate_limiter.check(policy, keys)
+        if not decision.allowed:
+            raise HTTPException(
+                status_code=429,
+                detail="Too many requests, please retry later.",
+                headers={"Retry-After": retry_after_header(decision.retry_after)},
+            )
+    return limiter
+
 def require_role(role: str):
-    def role_checker(current_user: dict = Depends(get_current_user)):
+    def role_checker(current_user: dict = Depends(get_current_user), _: None = Depends(rate_limit("api"))):
         if current_user["role"] not in role:
             raise HTTPException(status_code=403, detail="Operation not permitted")
         return current_user
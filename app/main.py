@@ -1,10 +1,26 @@
-from builtins import Exception
-from fastapi import FastAPI
+from builtins import Exception, int, str
+from contextlib import asynccontextmanager
+import math
+import time
+from fastapi import FastAPI, Request
 from starlette.responses import JSONResponse
-from app.database import Database
-from app.dependencies import get_settings
-from app.routers import user_routes
+from app.container import get_container
+from app.database import Database, count_queries
+from app.dependencies import PRIMARY_PIN_COOKIE, get_settings, token_subject
+from app.routers import metrics_routes, user_routes
 from app.utils.api_description import getDescription
+from app.utils.concurrency_limit import LoadSheddingError, get_concurrency_limiter, request_lane
+from app.utils.primary_pins import pin_subject
+from app.utils.worker_pool import WorkerPoolSaturatedError
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    container = get_container()
+    await container.startup()
+    app.state.container = container
+    yield
+    await container.shutdown()
+
 app = FastAPI(
     title="User Management",
     description=getDescription(),
@@ -15,17 +31,55 @@ app = FastAPI(
         "email": "support@example.com",
     },
     license_info={"name": "MIT", "url": "https://opensource.org/licenses/MIT"},
+    lifespan=lifespan,
 )
 
-@app.on_event("startup")
-async def startup_event():
-    settings = get_settings()
-    Database.initialize(settings.database_url, settings.debug)
+@app.middleware("http")
+async def count_database_round_trips(request: Request, call_next):
+    """Counts the request's statements and commits; reported as X-DB-Queries / X-DB-Commits in debug mode."""
+    with count_queries() as counter:
+        response = await call_next(request)
+    if get_settings().debug:
+        response.headers["X-DB-Queries"] = str(counter.queries)
+        response.headers["X-DB-Commits"] = str(counter.commits)
+    return response
+
+@app.middleware("http")
+async def pin_reads_after_writes(request: Request, call_next):
+    """
+    After a successful write, send this client's reads to the primary for `read_your_writes_seconds`.
+
+    The token's subject is pinned server-side; the cookie covers clients that write without one (e.g. login).
+    """
+    response = await call_next(request)
+    window = get_settings().read_your_writes_seconds
+    if request.method not in ("GET", "HEAD", "OPTIONS") and response.status_code < 400 and window > 0 and Database.has_replicas():
+        subject = token_subject(request)
+        if subject is not None:
+            pin_subject(subject, window)
+        response.set_cookie(PRIMARY_PIN_COOKIE, str(time.time() + window), max_age=int(math.ceil(window)), httponly=True, samesite="lax")
+    return response
+
+# Added last so it runs first: shed requests before any other middleware or handler work
+@app.middleware("http")
+async def limit_concurrency(request: Request, call_next):
+    """Admit the request through its lane's adaptive concurrency limiter; 503 at once if the lane is overloaded."""
+    limiter = get_concurrency_limiter(request_lane(request.method, request.url.path))
+    if limiter is None:
+        return await call_next(request)
+    try:
+        async with limiter.acquire():
+            return await call_next(request)
+    except LoadSheddingError:
+        return JSONResponse(status_code=503, content={"message": "Server is busy, please retry shortly."}, headers={"Retry-After": "1"})
+
+@app.exception_handler(WorkerPoolSaturatedError)
+async def worker_pool_saturated_handler(request, exc):
+    return JSONResponse(status_code=503, content={"message": "Server is busy, please retry shortly."}, headers={"Retry-After": "1"})
 
 @app.exception_handler(Exception)
 async def exception_handler(request, exc):
     return JSONResponse(status_code=500, content={"message": "An unexpected error occurred."})
 
 app.include_router(user_routes.router)
-
-
+app.include_router(metrics_routes.router)
@@ -0,0 +1,50 @@
+from builtins import int, str
+from datetime import datetime
+import uuid
+from sqlalchemy import Column, String, Integer, DateTime, Text, Index, JSON, func
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+from app.database import Base
+
+class EmailOutbox(Base):
+    """
+    An email waiting to be delivered, stored in the 'email_outbox' table.
+
+    Rows are inserted in the same transaction as the change that triggers the email, so an email is queued
+    if and only if that change commits. Background workers deliver them (see `EmailOutboxService`).
+
+    Attributes:
+        id (UUID): Unique identifier for the message.
+        email_type (str): Template / subject key understood by `EmailService.send_user_email`.
+        recipient (str): Destination address.
+        payload (dict): Template context, including the recipient's `email`; cleared once the message is sent or fails.
+        status (str): 'pending' until delivered ('sent') or out of attempts ('failed').
+        attempts (int): Delivery attempts so far.
+        next_attempt_at (datetime): Earliest time a worker may claim the row; also acts as the claim lease.
+        last_error (str): Error from the latest failed attempt.
+        created_at (datetime): When the message was queued.
+        sent_at (datetime): When the message was delivered.
+    """
+    __tablename__ = "email_outbox"
+    __table_args__ = (
+        # Workers scan pending rows in due order
+        Index("ix_email_outbox_status_next_attempt_at", "status", "next_attempt_at"),
+    )
+
+    PENDING = "pending"
+    SENT = "sent"
+    FAILED = "failed"
+
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    email_type: Mapped[str] = Column(String(50), nullable=False)
+    recipient: Mapped[str] = Column(String(255), nullable=False)
+    payload: Mapped[dict] = Column(JSON, nullable=False)
+    status: Mapped[str] = Column(String(20), nullable=False, default=PENDING)
+    attempts: Mapped[int] = Column(Integer, nullable=False, default=0)
+    next_attempt_at: Mapped[datetime] = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    last_error: Mapped[str] = Column(Text, nullable=True)
+    created_at: Mapped[datetime] = Column(DateTime(timezone=True), server_default=func.now())
+    sent_at: Mapped[datetime] = Column(DateTime(timezone=True), nullable=True)
+
+    def __repr__(self) -> str:
+        return f"<EmailOutbox {self.email_type} to {self.recipient}, {self.status}>"
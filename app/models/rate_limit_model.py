@@ -0,0 +1,36 @@
+from builtins import bool, float, int, str
+from datetime import datetime
+from sqlalchemy import Boolean, Column, DateTime, Float, Integer, String
+from sqlalchemy.orm import Mapped
+from app.database import Base
+
+class RateLimitBucket(Base):
+    """
+    Rate limit state shared by every worker, stored in the 'rate_limit_buckets' table.
+
+    Used by `PostgresRateLimitBackend`; each request updates its bucket with a single upsert. Times are Unix
+    seconds from the database clock, so workers on hosts with skewed clocks still agree.
+
+    Attributes:
+        key (str): Policy, limit and the client / account / subject being limited.
+        tokens (float): Token bucket: tokens left after the last request.
+        window_start (float): Sliding window: start of the current fixed window.
+        count (int): Sliding window: requests allowed in the current window.
+        previous_count (int): Sliding window: requests allowed in the window before.
+        updated_at (float): Time of the last request.
+        allowed (bool): Whether the last request was allowed.
+        expires_at (datetime): After this the bucket is equivalent to a fresh one and may be deleted.
+    """
+    __tablename__ = "rate_limit_buckets"
+
+    key: Mapped[str] = Column(String(400), primary_key=True)
+    tokens: Mapped[float] = Column(Float, nullable=True)
+    window_start: Mapped[float] = Column(Float, nullable=True)
+    count: Mapped[int] = Column(Integer, nullable=True)
+    previous_count: Mapped[int] = Column(Integer, nullable=True)
+    updated_at: Mapped[float] = Column(Float, nullable=False)
+    allowed: Mapped[bool] = Column(Boolean, nullable=False)
+    expires_at: Mapped[datetime] = Column(DateTime(timezone=True), nullable=False, index=True)
+
+    def __repr__(self) -> str:
+        return f"<RateLimitBucket {self.key}>"
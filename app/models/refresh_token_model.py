@@ -0,0 +1,38 @@
+from builtins import str
+from datetime import datetime
+import uuid
+from sqlalchemy import Column, String, DateTime, ForeignKey, func
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+from app.database import Base
+
+class RefreshToken(Base):
+    """
+    A refresh token issued to a user, stored in the 'refresh_tokens' table.
+
+    Only a SHA-256 digest of the token is stored. Each token is single-use: redeeming it marks it used and
+    issues its successor in the same family, and presenting a used token again revokes the whole family.
+
+    Attributes:
+        id (UUID): Unique identifier for the token.
+        user_id (UUID): The user the token was issued to.
+        family_id (UUID): Shared by a token and all tokens rotated from it, starting at a login.
+        token_hash (str): Hex SHA-256 digest of the token.
+        expires_at (datetime): When the token stops being accepted.
+        created_at (datetime): When the token was issued.
+        used_at (datetime): When the token was redeemed for a new one.
+        revoked_at (datetime): When the token's family was revoked.
+    """
+    __tablename__ = "refresh_tokens"
+
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    user_id: Mapped[uuid.UUID] = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    family_id: Mapped[uuid.UUID] = Column(UUID(as_uuid=True), nullable=False, index=True)
+    token_hash: Mapped[str] = Column(String(64), nullable=False, unique=True)
+    expires_at: Mapped[datetime] = Column(DateTime(timezone=True), nullable=False)
+    created_at: Mapped[datetime] = Column(DateTime(timezone=True), server_default=func.now())
+    used_at: Mapped[datetime] = Column(DateTime(timezone=True), nullable=True)
+    revoked_at: Mapped[datetime] = Column(DateTime(timezone=True), nullable=True)
+
+    def __repr__(self) -> str:
+        return f"<RefreshToken {self.id} of user {self.user_id}>"
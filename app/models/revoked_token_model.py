@@ -0,0 +1,32 @@
+from builtins import int, str
+from datetime import datetime
+from sqlalchemy import BigInteger, Column, String, DateTime, func
+from sqlalchemy.orm import Mapped, mapped_column
+from app.database import Base
+
+class RevokedToken(Base):
+    """
+    An access token revocation, stored in the 'revoked_tokens' table.
+
+    This table is the durable record; workers mirror the rows into the host's shared revocation table (see
+    `app.services.token_revocation_service`) and read them from there. Ids increase, so workers pick up new
+    rows with an `id > last seen` scan, re-checking skipped ids for rows whose transactions commit late.
+
+    Attributes:
+        id (int): Sequence number of the revocation.
+        key (str): What is revoked: `jti:<token id>` for one token, `sub:<email>` for all of a user's tokens.
+        issued_before (datetime): Tokens issued at or before this time are revoked; null revokes every token
+            with the key.
+        expires_at (datetime): After this every token the row could match has expired, so it can be ignored.
+        created_at (datetime): When the revocation was made.
+    """
+    __tablename__ = "revoked_tokens"
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    key: Mapped[str] = Column(String(320), nullable=False)
+    issued_before: Mapped[datetime] = Column(DateTime(timezone=True), nullable=True)
+    expires_at: Mapped[datetime] = Column(DateTime(timezone=True), nullable=False)
+    created_at: Mapped[datetime] = Column(DateTime(timezone=True), server_default=func.now())
+
+    def __repr__(self) -> str:
+        return f"<RevokedToken {self.id} {self.key}>"
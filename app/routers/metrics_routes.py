@@ -0,0 +1,67 @@
+"""
+Operational metrics for the running worker process.
+
+These endpoints expose in-process counters (queue depths, timings, hit rates) so capacity problems can be
+observed instead of guessed at. Values are per worker process; aggregate across workers in the scraper.
+"""
+
+from builtins import dict
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import Database
+from app.dependencies import get_db, require_role
+from app.services.email_outbox_service import EmailOutboxService, EmailOutboxWorker
+from app.services.jwt_service import get_token_verifier
+from app.services.login_activity_service import get_last_login_recorder
+from app.services.nickname_service import NicknameService
+from app.services.rate_limit_service import get_rate_limiter
+from app.services.token_revocation_service import get_revocation_syncer, get_revocation_table
+from app.services.user_cache import get_user_cache
+from app.utils.concurrency_limit import concurrency_stats
+from app.utils.security import get_hashing_pool, get_password_hasher
+
+router = APIRouter()
+
+@router.get("/metrics/", name="get_metrics", tags=["Metrics Requires (Admin Role)"])
+async def get_metrics(db: AsyncSession = Depends(get_db), current_user: dict = Depends(require_role(["ADMIN"]))):
+    """
+    Return a snapshot of this worker's runtime metrics.
+
+    - **password_hashing**: occupancy of the hashing pool plus average/max queue-wait and compute time in ms,
+      and the scheme and cost used for new hashes.
+    - **database_pool**: pool size and current checkouts/overflow, average/max wait for a connection and
+      hold time in ms, pool timeouts, and connections held past the leak threshold.
+    - **email_outbox**: messages waiting for delivery (all workers) and this worker's sent / failed attempt counts.
+    - **last_login_writes**: buffered, recorded and written last-login timestamps, or null when written inline.
+    - **nicknames**: allocations, candidates checked and the share already taken, exhausted allocations, and the
+      size of the nickname space.
+    - **user_cache**: lookups served from this worker's user cache (hits, misses, hit rate), entries, evictions
+      and expirations, or null when the cache is disabled.
+    - **token_cache**: verified access tokens served without re-verification (hits, misses, hit rate), entries,
+      evictions and expirations.
+    - **token_revocations**: the shared revocation table's capacity and used slots, this worker's lookups, hits on
+      revoked tokens and table rebuilds, and how far its sync from the database has got; null when disabled.
+    - **rate_limits**: the backend, and per policy its limits and this worker's allowed / rejected requests;
+      null when rate limiting is off.
+    - **concurrency**: per lane (auth, write, read) the current adaptive limit, requests in flight and waiting,
+      the learned no-load latency in ms, admitted / queued requests, rejections (queue full or wait timed
+      out) and limit cuts; null when concurrency limiting is off.
+    """
+    hasher = get_password_hasher()
+    recorder = get_last_login_recorder()
+    user_cache = get_user_cache()
+    revocations = get_revocation_table()
+    syncer = get_revocation_syncer()
+    rate_limiter = get_rate_limiter()
+    return {
+        "password_hashing": {**get_hashing_pool().stats(), "scheme": hasher.scheme, "cost": hasher.cost},
+        "database_pool": Database.pool_stats(),
+        "email_outbox": {"pending": await EmailOutboxService.pending_count(db), **EmailOutboxWorker.stats()},
+        "last_login_writes": recorder.stats() if recorder is not None else None,
+        "nicknames": NicknameService.stats(),
+        "user_cache": user_cache.stats() if user_cache is not None else None,
+        "token_cache": get_token_verifier().stats(),
+        "token_revocations": {**revocations.stats(), "sync": syncer.stats() if syncer is not None else None} if revocations is not None else None,
+        "rate_limits": rate_limiter.stats() if rate_limiter is not None else None,
+        "concurrency": concurrency_stats(),
+    }
@@ -18,58 +18,112 @@ Key Highlights:
 - Utilizes OAuth2PasswordBearer for securing API endpoints, requiring valid access tokens for operations.
 """
 
-from builtins import dict, int, len, str
-from datetime import timedelta
+from builtins import bool, dict, int, len, str
+from datetime import datetime, timedelta
+from typing import Awaitable, Optional
 from uuid import UUID
-from fastapi import APIRouter, Depends, HTTPException, Response, status, Request
+from fastapi import APIRouter, BackgroundTasks, Depends, Header, HTTPException, Query, Response, status, Request
+from fastapi.responses import StreamingResponse
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.dependencies import get_current_user, get_db, get_email_service, require_role
+from app.dependencies import get_current_user, get_db, get_email_service, get_read_db, get_read_session_factory, rate_limit, require_role
+from app.models.user_model import User, UserRole
 from app.schemas.pagination_schema import EnhancedPagination
-from app.schemas.token_schema import TokenResponse
-from app.schemas.user_schemas import LoginRequest, UserBase, UserCreate, UserListResponse, UserResponse, UserUpdate
-from app.services.user_service import UserService
-from app.services.jwt_service import create_access_token
-from app.utils.link_generation import create_user_links, generate_pagination_links
+from app.schemas.token_schema import RefreshTokenRequest, TokenResponse
+from app.schemas.user_schemas import LoginRequest, UserBase, UserCreate, UserImportResponse, UserListResponse, UserResponse, UserUpdate
+from app.schemas.user_serialization import dump_user, dump_user_list
+from app.services.refresh_token_service import RefreshOutcome, RefreshTokenService
+from app.services.token_revocation_service import TokenRevocationService
+from app.services.user_export_service import EXPORT_FORMATS, UserExportService
+from app.services.user_import_service import UserImportService, iter_lines
+from app.services.nickname_service import NicknameExhaustedError
+from app.services.user_service import DuplicateEmailError, LoginOutcome, UniqueFieldConflictError, UserService, VersionConflictError
+from app.services.jwt_service import create_access_token, decode_token
+from app.utils.json_response import PreserializedJSONResponse
+from app.utils.etag import http_date, none_match, not_modified_since, parse_if_match, version_etag
+from app.utils.link_generation import generate_cursor_pagination_links, generate_pagination_links
 from app.dependencies import get_settings
 from app.services.email_service import EmailService
 router = APIRouter()
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
 settings = get_settings()
+
+def validator_headers(etag: str, updated_at: Optional[datetime]) -> dict:
+    # no-cache: caches may keep the user but must revalidate it on every use
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if updated_at is not None:
+        headers["Last-Modified"] = http_date(updated_at)
+    return headers
+
+async def create_or_conflict(creation: Awaitable[Optional[User]]) -> Optional[User]:
+    """Await a user creation, turning a taken email into 400 and an unallocatable nickname into 409."""
+    try:
+        return await creation
+    except DuplicateEmailError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email already exists")
+    except NicknameExhaustedError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+
+
+# Declared before /users/{user_id} so "export" is not parsed as a user id.
+@router.get("/users/export", name="export_users", tags=["User Management Requires (Admin Role)"])
+async def export_users(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    role: Optional[UserRole] = None,
+    email_verified: Optional[bool] = None,
+    is_locked: Optional[bool] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    session_factory = Depends(get_read_session_factory),
+    current_user: dict = Depends(require_role(["ADMIN"]))
+):
+    """
+    Stream every user matching the filters as NDJSON or CSV. Admin only.
+
+    Rows are read through a server-side cursor and written to the response as they arrive, so a
+    million-row export runs in one pass with constant memory. Passwords and tokens are never exported.
+    """
+    query = UserExportService.build_query(role, email_verified, is_locked, created_after, created_before)
+    return StreamingResponse(
+        UserExportService.stream(session_factory, query, format, settings.user_export_batch_size),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="users.{format}"'},
+    )
+
 @router.get("/users/{user_id}", response_model=UserResponse, name="get_user", tags=["User Management Requires (Admin or Manager Roles)"])
-async def get_user(user_id: UUID, request: Request, db: AsyncSession = Depends(get_db), token: str = Depends(oauth2_scheme), current_user: dict = Depends(require_role(["ADMIN", "MANAGER"]))):
+async def get_user(user_id: UUID, if_none_match: Optional[str] = Header(None), if_modified_since: Optional[str] = Header(None), db: AsyncSession = Depends(get_read_db), token: str = Depends(oauth2_scheme), current_user: dict = Depends(require_role(["ADMIN", "MANAGER"]))):
     """
     Endpoint to fetch a user by their unique identifier (UUID).
 
-    Utilizes the UserService to query the database asynchronously for the user and constructs a response
-    model that includes the user's details along with HATEOAS links for possible next actions.
+    Utilizes the UserService to query the database asynchronously for the user and serializes the user's
+    details straight to JSON with a prebuilt TypeAdapter (see app.schemas.user_serialization).
 
     Args:
         user_id: UUID of the user to fetch.
-        request: The request object, used to generate full URLs in the response.
-        db: Dependency that provides an AsyncSession for database access.
+        db: Dependency that provides a read-only AsyncSession (a replica when configured).
         token: The OAuth2 access token obtained through OAuth2PasswordBearer dependency.
+
+    Responses carry `ETag` and `Last-Modified`. A request with `If-None-Match` (or, without it,
+    `If-Modified-Since`) that still matches gets an empty 304 after a probe of just the version and timestamp.
     """
+    if if_none_match is not None or if_modified_since is not None:
+        validators = await UserService.get_validators(db, user_id)
+        if validators is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+        version, updated_at = validators
+        etag = version_etag(version)
+        if if_none_match is not None:
+            not_modified = none_match(if_none_match, etag)
+        else:
+            not_modified = updated_at is not None and not_modified_since(if_modified_since, updated_at)
+        if not_modified:
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=validator_headers(etag, updated_at))
+
     user = await UserService.get_by_id(db, user_id)
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
 
-    return UserResponse.model_construct(
-        id=user.id,
-        nickname=user.nickname,
-        first_name=user.first_name,
-        last_name=user.last_name,
-        bio=user.bio,
-        profile_picture_url=user.profile_picture_url,
-        github_profile_url=user.github_profile_url,
-        linkedin_profile_url=user.linkedin_profile_url,
-        role=user.role,
-        email=user.email,
-        last_login_at=user.last_login_at,
-        created_at=user.created_at,
-        updated_at=user.updated_at,
-        links=create_user_links(user.id, request)  
-    )
+    return PreserializedJSONResponse(dump_user(user), headers=validator_headers(version_etag(user.version), user.updated_at))
 
 # Additional endpoints for update, delete, create, and list users follow a similar pattern, using
 # asynchronous database operations, handling security with OAuth2PasswordBearer, and enhancing response
@@ -79,33 +133,31 @@ async def get_user(user_id: UUID, request: Request, db: AsyncSession = Depends(g
 # experience by adhering to REST principles and providing self-discoverable operations.
 
 @router.put("/users/{user_id}", response_model=UserResponse, name="update_user", tags=["User Management Requires (Admin or Manager Roles)"])
-async def update_user(user_id: UUID, user_update: UserUpdate, request: Request, db: AsyncSession = Depends(get_db), token: str = Depends(oauth2_scheme), current_user: dict = Depends(require_role(["ADMIN", "MANAGER"]))):
+async def update_user(user_id: UUID, user_update: UserUpdate, if_match: Optional[str] = Header(None), db: AsyncSession = Depends(get_db), token: str = Depends(oauth2_scheme), current_user: dict = Depends(require_role(["ADMIN", "MANAGER"]))):
     """
     Update user information.
 
     - **user_id**: UUID of the user to update.
     - **user_update**: UserUpdate model with updated user information.
+    - **If-Match** (header): ETag from a previous read; the update fails with 412 if the user changed since.
+
+    An email or nickname another user already has is rejected with 409.
     """
     user_data = user_update.model_dump(exclude_unset=True)
-    updated_user = await UserService.update(db, user_id, user_data)
+    try:
+        updated_user = await UserService.update(db, user_id, user_data, expected_versions=parse_if_match(if_match))
+    except VersionConflictError as e:
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail="User was modified by another request",
+            headers={"ETag": version_etag(e.current_version)},
+        )
+    except UniqueFieldConflictError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
     if not updated_user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
 
-    return UserResponse.model_construct(
-        id=updated_user.id,
-        bio=updated_user.bio,
-        first_name=updated_user.first_name,
-        last_name=updated_user.last_name,
-        nickname=updated_user.nickname,
-        email=updated_user.email,
-        last_login_at=updated_user.last_login_at,
-        profile_picture_url=updated_user.profile_picture_url,
-        github_profile_url=updated_user.github_profile_url,
-        linkedin_profile_url=updated_user.linkedin_profile_url,
-        created_at=updated_user.created_at,
-        updated_at=updated_user.updated_at,
-        links=create_user_links(updated_user.id, request)
-    )
+    return PreserializedJSONResponse(dump_user(updated_user), headers={"ETag": version_etag(updated_user.version)})
 
 
 @router.delete("/users/{user_id}", status_code=status.HTTP_204_NO_CONTENT, name="delete_user", tags=["User Management Requires (Admin or Manager Roles)"])
@@ -120,6 +172,34 @@ async def delete_user(user_id: UUID, db: AsyncSession = Depends(get_db), token:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
     return Response(status_code=status.HTTP_204_NO_CONTENT)
 
+@router.post("/users/{user_id}/lock", status_code=status.HTTP_204_NO_CONTENT, name="lock_user", tags=["User Management Requires (Admin Role)"])
+async def lock_user(user_id: UUID, db: AsyncSession = Depends(get_db), current_user: dict = Depends(require_role(["ADMIN"]))):
+    """
+    Lock a user's account and sign them out everywhere.
+
+    Access tokens already issued to the user stop working immediately and their refresh tokens are revoked.
+
+    - **user_id**: UUID of the user to lock.
+    """
+    user = await UserService.lock_user_account(db, user_id)
+    if user is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+    await TokenRevocationService.revoke_user(db, user)
+    await RefreshTokenService.revoke_user(db, user.id)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+@router.post("/users/{user_id}/unlock", status_code=status.HTTP_204_NO_CONTENT, name="unlock_user", tags=["User Management Requires (Admin Role)"])
+async def unlock_user(user_id: UUID, db: AsyncSession = Depends(get_db), current_user: dict = Depends(require_role(["ADMIN"]))):
+    """
+    Unlock a user's account and reset their failed login attempts.
+
+    - **user_id**: UUID of the user to unlock.
+    """
+    if await UserService.get_by_id(db, user_id) is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+    await UserService.unlock_user_account(db, user_id)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
 
 
 @router.post("/users/", response_model=UserResponse, status_code=status.HTTP_201_CREATED, tags=["User Management Requires (Admin or Manager Roles)"], name="create_user")
@@ -139,97 +219,148 @@ async def create_user(user: UserCreate, request: Request, db: AsyncSession = Dep
     Returns:
     - UserResponse: The newly created user's information along with navigation links.
     """
-    existing_user = await UserService.get_by_email(db, user.email)
-    if existing_user:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email already exists")
-    
-    created_user = await UserService.create(db, user.model_dump(), email_service)
+    created_user = await create_or_conflict(UserService.create(db, user.model_dump(), email_service))
     if not created_user:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to create user")
-    
-    
-    return UserResponse.model_construct(
-        id=created_user.id,
-        bio=created_user.bio,
-        first_name=created_user.first_name,
-        last_name=created_user.last_name,
-        profile_picture_url=created_user.profile_picture_url,
-        nickname=created_user.nickname,
-        email=created_user.email,
-        last_login_at=created_user.last_login_at,
-        created_at=created_user.created_at,
-        updated_at=created_user.updated_at,
-        links=create_user_links(created_user.id, request)
-    )
+
+    return PreserializedJSONResponse(dump_user(created_user), status_code=status.HTTP_201_CREATED)
+
+
+@router.post("/users/import", response_model=UserImportResponse, name="import_users", tags=["User Management Requires (Admin or Manager Roles)"])
+async def import_users(request: Request, background_tasks: BackgroundTasks, db: AsyncSession = Depends(get_db), email_service: EmailService = Depends(get_email_service), current_user: dict = Depends(require_role(["ADMIN", "MANAGER"]))):
+    """
+    Bulk-create users from a streamed body.
+
+    Send `Content-Type: application/x-ndjson` with one `UserCreate` object per line, or `text/csv` with a
+    header row naming `UserCreate` fields. Rows are validated, hashed in parallel and inserted in batches;
+    invalid or duplicate rows are reported individually without failing the rest. Verification emails are
+    queued in the email outbox with each batch (or sent after the response when the outbox is disabled).
+    """
+    content_type = request.headers.get("content-type", "")
+    import_format = "csv" if "csv" in content_type else "ndjson" if "ndjson" in content_type or "json" in content_type else None
+    if import_format is None:
+        raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail="Send application/x-ndjson or text/csv")
+
+    report, created_users = await UserImportService.import_users(db, iter_lines(request.stream()), import_format, settings.user_import_batch_size)
+    if not settings.email_outbox_enabled:
+        for created_user in created_users:
+            background_tasks.add_task(email_service.send_verification_email, created_user)
+    return report
 
 
 @router.get("/users/", response_model=UserListResponse, tags=["User Management Requires (Admin or Manager Roles)"])
 async def list_users(
     request: Request,
-    skip: int = 0,
-    limit: int = 10,
-    db: AsyncSession = Depends(get_db),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(10, ge=1, le=100),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_read_db),
     current_user: dict = Depends(require_role(["ADMIN", "MANAGER"]))
 ):
-    total_users = await UserService.count(db)
-    users = await UserService.list_users(db, skip, limit)
+    """
+    List users.
 
-    user_responses = [
-        UserResponse.model_validate(user) for user in users
-    ]
-    
-    pagination_links = generate_pagination_links(request, skip, limit, total_users)
-    
-    # Construct the final response with pagination details
-    return UserListResponse(
-        items=user_responses,
-        total=total_users,
+    Two pagination modes are supported:
+    - **skip/limit** (default): classic offset pagination, kept for compatibility. Deep pages get slower.
+    - **cursor/limit**: keyset pagination ordered by creation time. Pass an empty `cursor` for the first page,
+      then follow the `next`/`prev` links. Every page costs the same regardless of depth.
+
+    `total` comes from the configured count strategy; `total_is_exact` is false when it is cached or estimated.
+    """
+    if cursor is not None:
+        try:
+            users, next_cursor, prev_cursor = await UserService.list_users_keyset(db, limit, cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        user_count = await UserService.count_for_listing(db)
+        return PreserializedJSONResponse(dump_user_list(
+            users,
+            total=user_count.total,
+            total_is_exact=user_count.exact,
+            next_cursor=next_cursor,
+            prev_cursor=prev_cursor,
+            links=generate_cursor_pagination_links(request, limit, cursor, next_cursor, prev_cursor)
+        ))
+
+    users, user_count = await UserService.list_users_page(db, skip, limit)
+
+    pagination_links = generate_pagination_links(request, skip, limit, user_count.total)
+
+    # Rows go straight to JSON bytes; see app.schemas.user_serialization
+    return PreserializedJSONResponse(dump_user_list(
+        users,
+        total=user_count.total,
+        total_is_exact=user_count.exact,
         page=skip // limit + 1,
-        size=len(user_responses),
-        links=pagination_links  # Ensure you have appropriate logic to create these links
-    )
+        links=pagination_links
+    ))
 
 
-@router.post("/register/", response_model=UserResponse, tags=["Login and Registration"])
+@router.post("/register/", response_model=UserResponse, tags=["Login and Registration"], dependencies=[Depends(rate_limit("register"))])
 async def register(user_data: UserCreate, session: AsyncSession = Depends(get_db), email_service: EmailService = Depends(get_email_service)):
-    user = await UserService.register_user(session, user_data.model_dump(), email_service)
+    user = await create_or_conflict(UserService.register_user(session, user_data.model_dump(), email_service))
     if user:
         return user
     raise HTTPException(status_code=400, detail="Email already exists")
 
-@router.post("/login/", response_model=TokenResponse, tags=["Login and Registration"])
-async def login(form_data: OAuth2PasswordRequestForm = Depends(), session: AsyncSession = Depends(get_db)):
-    if await UserService.is_account_locked(session, form_data.username):
-        raise HTTPException(status_code=400, detail="Account locked due to too many failed login attempts.")
-
-    user = await UserService.login_user(session, form_data.username, form_data.password)
-    if user:
-        access_token_expires = timedelta(minutes=settings.access_token_expire_minutes)
+def access_token_for(user: User) -> str:
+    return create_access_token(
+        data={"sub": user.email, "role": str(user.role.name)},
+        expires_delta=timedelta(minutes=settings.access_token_expire_minutes)
+    )
 
-        access_token = create_access_token(
-            data={"sub": user.email, "role": str(user.role.name)},
-            expires_delta=access_token_expires
-        )
+def issue_tokens(session: AsyncSession, user: User) -> dict:
+    """Tokens for a fresh login: an access token and the first refresh token of a new family."""
+    refresh_token = RefreshTokenService.issue(session, user.id)
+    return {"access_token": access_token_for(user), "token_type": "bearer", "refresh_token": refresh_token}
 
-        return {"access_token": access_token, "token_type": "bearer"}
+@router.post("/login/", response_model=TokenResponse, tags=["Login and Registration"], dependencies=[Depends(rate_limit("login"))])
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), session: AsyncSession = Depends(get_db)):
+    outcome, user = await UserService.authenticate(session, form_data.username, form_data.password)
+    if outcome is LoginOutcome.LOCKED:
+        raise HTTPException(status_code=400, detail="Account locked due to too many failed login attempts.")
+    if outcome is LoginOutcome.SUCCESS:
+        return issue_tokens(session, user)
     raise HTTPException(status_code=401, detail="Incorrect email or password.")
 
-@router.post("/login/", include_in_schema=False, response_model=TokenResponse, tags=["Login and Registration"])
+@router.post("/login/", include_in_schema=False, response_model=TokenResponse, tags=["Login and Registration"], dependencies=[Depends(rate_limit("login"))])
 async def login(form_data: OAuth2PasswordRequestForm = Depends(), session: AsyncSession = Depends(get_db)):
-    if await UserService.is_account_locked(session, form_data.username):
+    outcome, user = await UserService.authenticate(session, form_data.username, form_data.password)
+    if outcome is LoginOutcome.LOCKED:
         raise HTTPException(status_code=400, detail="Account locked due to too many failed login attempts.")
+    if outcome is LoginOutcome.SUCCESS:
+        return issue_tokens(session, user)
+    raise HTTPException(status_code=401, detail="Incorrect email or password.")
 
-    user = await UserService.login_user(session, form_data.username, form_data.password)
-    if user:
-        access_token_expires = timedelta(minutes=settings.access_token_expire_minutes)
+@router.post("/token/refresh", response_model=TokenResponse, tags=["Login and Registration"], dependencies=[Depends(rate_limit("refresh"))])
+async def refresh_token(body: RefreshTokenRequest, session: AsyncSession = Depends(get_db)):
+    """
+    Exchange a refresh token for a new access token and a new refresh token, without a password check.
 
-        access_token = create_access_token(
-            data={"sub": user.email, "role": str(user.role.name)},
-            expires_delta=access_token_expires
-        )
+    Each refresh token works once. Presenting one that was already used revokes every token issued from the
+    same login, so a stolen token is useless as soon as either party uses it a second time.
+    """
+    outcome, user, new_refresh_token = await RefreshTokenService.rotate(session, body.refresh_token)
+    if outcome is RefreshOutcome.LOCKED:
+        raise HTTPException(status_code=400, detail="Account locked due to too many failed login attempts.")
+    if outcome is not RefreshOutcome.ROTATED:
+        raise HTTPException(status_code=401, detail="Invalid or expired refresh token.", headers={"WWW-Authenticate": "Bearer"})
+    return {"access_token": access_token_for(user), "token_type": "bearer", "refresh_token": new_refresh_token}
 
-        return {"access_token": access_token, "token_type": "bearer"}
-    raise HTTPException(status_code=401, detail="Incorrect email or password.")
+@router.post("/logout/", status_code=status.HTTP_204_NO_CONTENT, tags=["Login and Registration"])
+async def logout(body: Optional[RefreshTokenRequest] = None, token: str = Depends(oauth2_scheme), session: AsyncSession = Depends(get_db)):
+    """
+    Revoke the access token used for this request and, if given, the refresh token issued with it.
+
+    The access token is refused by every worker on this host as soon as this returns.
+    """
+    claims = decode_token(token)
+    if claims is None or "jti" not in claims:
+        raise HTTPException(status_code=401, detail="Could not validate credentials", headers={"WWW-Authenticate": "Bearer"})
+    await TokenRevocationService.revoke_token(session, claims)
+    if body is not None:
+        await RefreshTokenService.revoke(session, body.refresh_token)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
 
 
 @router.get("/verify-email/{user_id}/{token}", status_code=status.HTTP_200_OK, name="verify_email", tags=["Login and Registration"])
@@ -6,6 +6,7 @@ from enum import Enum
 import uuid
 import re
 
+from app.schemas.pagination_schema import PaginationLink
 from app.utils.nickname_gen import generate_nickname
 
 class UserRole(str, Enum):
@@ -114,5 +115,20 @@ class UserListResponse(BaseModel):
         "github_profile_url": "https://github.com/johndoe"
     }])
     total: int = Field(..., example=100)
-    page: int = Field(..., example=1)
+    total_is_exact: bool = Field(True, example=True, description="False when the total is a cached value or a planner estimate.")
+    page: Optional[int] = Field(None, example=1, description="Page number in skip mode; not set in cursor mode.")
     size: int = Field(..., example=10)
+    next_cursor: Optional[str] = Field(None, description="Cursor for the following page in cursor mode.")
+    prev_cursor: Optional[str] = Field(None, description="Cursor for the preceding page in cursor mode.")
+    links: List[PaginationLink] = []
+
+class UserImportError(BaseModel):
+    row: int = Field(..., example=3, description="1-based data row number in the uploaded file.")
+    email: Optional[str] = Field(None, example="john.doe@example.com")
+    error: str = Field(..., example="Email already exists")
+
+class UserImportResponse(BaseModel):
+    total_rows: int = Field(..., example=1000)
+    created: int = Field(..., example=998)
+    failed: int = Field(..., example=2)
+    errors: List[UserImportError] = []
@@ -0,0 +1,77 @@
+from builtins import bool, bytes, int, len, str
+from typing import Iterable, List, Optional
+from uuid import UUID
+from pydantic import TypeAdapter
+from typing_extensions import TypedDict
+from app.models.user_model import User
+from app.schemas.pagination_schema import PaginationLink
+
+# JSON shapes of UserResponse and UserListResponse, field for field and in the same order. The routes still
+# declare those models as response_model for the OpenAPI schema; these only exist to serialize rows that came
+# from the database, which need no validation.
+
+class UserPayload(TypedDict):
+    email: str
+    nickname: Optional[str]
+    first_name: Optional[str]
+    last_name: Optional[str]
+    bio: Optional[str]
+    profile_picture_url: Optional[str]
+    linkedin_profile_url: Optional[str]
+    github_profile_url: Optional[str]
+    id: UUID
+    role: str
+    is_professional: Optional[bool]
+
+class PaginationLinkPayload(TypedDict):
+    rel: str
+    href: str
+    method: str
+
+class UserListPayload(TypedDict):
+    items: List[UserPayload]
+    total: int
+    total_is_exact: bool
+    page: Optional[int]
+    size: int
+    next_cursor: Optional[str]
+    prev_cursor: Optional[str]
+    links: List[PaginationLinkPayload]
+
+# Built once: each adapter compiles its serializer up front and writes JSON bytes directly, UUIDs included
+user_adapter = TypeAdapter(UserPayload)
+user_list_adapter = TypeAdapter(UserListPayload)
+
+def user_payload(user: User) -> UserPayload:
+    return {
+        "email": user.email,
+        "nickname": user.nickname,
+        "first_name": user.first_name,
+        "last_name": user.last_name,
+        "bio": user.bio,
+        "profile_picture_url": user.profile_picture_url,
+        "linkedin_profile_url": user.linkedin_profile_url,
+        "github_profile_url": user.github_profile_url,
+        "id": user.id,
+        "role": user.role.value,
+        "is_professional": user.is_professional,
+    }
+
+def dump_user(user: User) -> bytes:
+    """A user as UserResponse JSON."""
+    return user_adapter.dump_json(user_payload(user))
+
+def dump_user_list(users: Iterable[User], total: int, total_is_exact: bool, links: List[PaginationLink],
+                   page: Optional[int] = None, next_cursor: Optional[str] = None, prev_cursor: Optional[str] = None) -> bytes:
+    """A page of users as UserListResponse JSON."""
+    items = [user_payload(user) for user in users]
+    return user_list_adapter.dump_json({
+        "items": items,
+        "total": total,
+        "total_is_exact": total_is_exact,
+        "page": page,
+        "size": len(items),
+        "next_cursor": next_cursor,
+        "prev_cursor": prev_cursor,
+        "links": [{"rel": link.rel, "href": str(link.href), "method": link.method} for link in links],
+    })
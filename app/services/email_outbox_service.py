@@ -0,0 +1,216 @@
+from builtins import Exception, classmethod, dict, float, int, isinstance, len, list, min, object, range, str, zip
+import asyncio
+import time
+from datetime import timedelta
+from typing import Callable, Dict, List, Optional
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.email_outbox_model import EmailOutbox
+from app.models.user_model import User
+from app.services.email_service import EmailService
+from settings.config import Settings, settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+class EmailOutboxService:
+    @classmethod
+    def enqueue(cls, session: AsyncSession, email_type: str, user_data: dict) -> EmailOutbox:
+        """Adds an outbox row to the session; it is queued when the caller's transaction commits."""
+        message = EmailOutbox(email_type=email_type, recipient=user_data["email"], payload=user_data)
+        session.add(message)
+        return message
+
+    @classmethod
+    def enqueue_verification_email(cls, session: AsyncSession, user: User) -> EmailOutbox:
+        return cls.enqueue(session, "email_verification", EmailService.verification_email_data(user))
+
+    @classmethod
+    async def enqueue_verification_emails(cls, session: AsyncSession, users: List[User]):
+        """Queues verification emails for many users with a single multi-row INSERT."""
+        if users:
+            rows = []
+            for user in users:
+                user_data = EmailService.verification_email_data(user)
+                rows.append({"email_type": "email_verification", "recipient": user_data["email"], "payload": user_data})
+            await session.execute(insert(EmailOutbox), rows)
+
+    @classmethod
+    async def claim_batch(cls, session: AsyncSession, batch_size: int, lease_seconds: float) -> List[EmailOutbox]:
+        """
+        Claims up to `batch_size` due messages and commits the claim.
+
+        Rows are picked with `FOR UPDATE SKIP LOCKED`, so concurrent workers (in this or other processes) never
+        claim the same row. Claiming pushes `next_attempt_at` out by `lease_seconds`: a worker that dies mid-send
+        leaves the row to be picked up again once the lease runs out.
+        """
+        due = (
+            select(EmailOutbox.id)
+            .where(EmailOutbox.status == EmailOutbox.PENDING, EmailOutbox.next_attempt_at <= func.now())
+            .order_by(EmailOutbox.next_attempt_at)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        claim = (
+            update(EmailOutbox)
+            .where(EmailOutbox.id.in_(due.scalar_subquery()))
+            .values(attempts=EmailOutbox.attempts + 1, next_attempt_at=func.now() + timedelta(seconds=lease_seconds))
+            .returning(EmailOutbox)
+            .execution_options(synchronize_session=False)
+        )
+        result = await session.execute(claim)
+        claimed = list(result.scalars().all())
+        await session.commit()
+        return claimed
+
+    @classmethod
+    def backoff_seconds(cls, attempts: int, base_seconds: float, max_seconds: float) -> float:
+        """Exponential backoff: base, 2*base, 4*base, ... capped at max_seconds."""
+        return min(max_seconds, base_seconds * 2 ** (attempts - 1))
+
+    @classmethod
+    async def deliver_batch(cls, session_factory: Callable[[], AsyncSession], email_service: EmailService, config: Settings = settings) -> int:
+        """
+        Claims one batch, sends it concurrently and records the outcome of every message.
+
+        Failed messages are rescheduled with exponential backoff until `email_outbox_max_attempts` is reached,
+        after which they are marked failed. Sent and failed messages have their payload cleared, since it
+        carries the verification link.
+
+        :return: The number of messages claimed.
+        """
+        async with session_factory() as session:
+            claimed = await cls.claim_batch(session, config.email_outbox_batch_size, config.email_outbox_lease_seconds)
+        if not claimed:
+            return 0
+
+        outcomes = await asyncio.gather(
+            *(email_service.send_user_email(message.payload, message.email_type) for message in claimed),
+            return_exceptions=True,
+        )
+
+        sent_ids = []
+        async with session_factory() as session:
+            for message, outcome in zip(claimed, outcomes):
+                if not isinstance(outcome, Exception):
+                    sent_ids.append(message.id)
+                    continue
+                values: Dict[str, object] = {"last_error": str(outcome)[:1000]}
+                if message.attempts >= config.email_outbox_max_attempts:
+                    values["status"] = EmailOutbox.FAILED
+                    values["payload"] = {}
+                    logger.error(f"Giving up on {message.email_type} email to {message.recipient} after {message.attempts} attempts: {outcome}")
+                else:
+                    delay = cls.backoff_seconds(message.attempts, config.email_outbox_backoff_base_seconds, config.email_outbox_backoff_max_seconds)
+                    values["next_attempt_at"] = func.now() + timedelta(seconds=delay)
+                    logger.warning(f"Sending {message.email_type} email to {message.recipient} failed, retrying in {delay}s: {outcome}")
+                await session.execute(update(EmailOutbox).where(EmailOutbox.id == message.id).values(**values))
+            if sent_ids:
+                await session.execute(
+                    update(EmailOutbox).where(EmailOutbox.id.in_(sent_ids))
+                    .values(status=EmailOutbox.SENT, sent_at=func.now(), last_error=None, payload={})
+                )
+            await session.commit()
+        EmailOutboxWorker.record(len(sent_ids), len(claimed) - len(sent_ids))
+        return len(claimed)
+
+    @classmethod
+    async def purge_sent(cls, session: AsyncSession, retention_hours: float) -> int:
+        """Deletes messages sent more than `retention_hours` ago and commits; returns how many were deleted."""
+        result = await session.execute(
+            delete(EmailOutbox).where(EmailOutbox.status == EmailOutbox.SENT, EmailOutbox.sent_at < func.now() - timedelta(hours=retention_hours))
+        )
+        await session.commit()
+        return result.rowcount
+
+    @classmethod
+    async def pending_count(cls, session: AsyncSession) -> int:
+        result = await session.execute(select(func.count()).select_from(EmailOutbox).where(EmailOutbox.status == EmailOutbox.PENDING))
+        return result.scalar()
+
+
+class EmailOutboxWorker:
+    """
+    Background tasks that drain the outbox, started and stopped by the application lifespan.
+
+    Each task loops over `EmailOutboxService.deliver_batch` and sleeps for the poll interval whenever it finds
+    less than a full batch. Any number of tasks and processes may run at once. Sent messages older than
+    `email_outbox_retention_hours` are deleted once per `PURGE_INTERVAL_SECONDS`.
+    """
+    PURGE_INTERVAL_SECONDS = 3600.0
+    sent = 0
+    failed_attempts = 0
+
+    def __init__(self, session_factory: Callable[[], AsyncSession], email_service: EmailService, config: Settings = settings):
+        self.session_factory = session_factory
+        self.email_service = email_service
+        self.config = config
+        self._tasks: List[asyncio.Task] = []
+        self._stopping: Optional[asyncio.Event] = None
+        self._next_purge = 0.0
+
+    @classmethod
+    def record(cls, sent: int, failed: int):
+        cls.sent += sent
+        cls.failed_attempts += failed
+
+    @classmethod
+    def stats(cls) -> dict:
+        return {"sent": cls.sent, "failed_attempts": cls.failed_attempts}
+
+    def start(self):
+        self._stopping = asyncio.Event()
+        for index in range(self.config.email_outbox_workers):
+            self._tasks.append(asyncio.create_task(self._run(), name=f"email-outbox-{index}"))
+
+    async def stop(self, timeout: float = 10.0):
+        """Lets in-flight batches finish recording their outcome, cancelling tasks that take longer than `timeout`."""
+        self._stopping.set()
+        _, pending = await asyncio.wait(self._tasks, timeout=timeout) if self._tasks else ((), ())
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _run(self):
+        while not self._stopping.is_set():
+            try:
+                claimed = await EmailOutboxService.deliver_batch(self.session_factory, self.email_service, self.config)
+            except Exception as e:
+                logger.error(f"Email outbox worker failed: {e}")
+                claimed = 0
+            if time.monotonic() >= self._next_purge:
+                self._next_purge = time.monotonic() + self.PURGE_INTERVAL_SECONDS
+                await self._purge()
+            if claimed < self.config.email_outbox_batch_size:
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), self.config.email_outbox_poll_interval_seconds)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def _purge(self):
+        try:
+            async with self.session_factory() as session:
+                purged = await EmailOutboxService.purge_sent(session, self.config.email_outbox_retention_hours)
+            if purged:
+                logger.info(f"Purged {purged} sent emails from the outbox")
+        except Exception as e:
+            logger.error(f"Purging the email outbox failed: {e}")
+
+
+_worker: Optional[EmailOutboxWorker] = None
+
+def start_email_outbox_workers(session_factory: Callable[[], AsyncSession], email_service: EmailService, config: Settings = settings) -> Optional[EmailOutboxWorker]:
+    """Starts the outbox workers when `Settings.email_outbox_enabled` is set."""
+    global _worker
+    if not config.email_outbox_enabled or config.email_outbox_workers < 1:
+        return None
+    _worker = EmailOutboxWorker(session_factory, email_service, config)
+    _worker.start()
+    return _worker
+
+async def stop_email_outbox_workers():
+    global _worker
+    if _worker is not None:
+        await _worker.stop()
+        _worker = None
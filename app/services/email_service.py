@@ -1,19 +1,13 @@
 # email_service.py
-from builtins import ValueError, dict, str
+from builtins import ValueError, dict, staticmethod, str
 from settings.config import settings
-from app.utils.smtp_connection import SMTPClient
+from app.utils.smtp_connection import SMTPClient, get_smtp_client
 from app.utils.template_manager import TemplateManager
 from app.models.user_model import User
 
 class EmailService:
     def __init__(self, template_manager: TemplateManager, smtp_client: SMTPClient = None):
-        print(f"DEBUG: EmailService __init__ called with template_manager={template_manager}, smtp_client={smtp_client}")
-        self.smtp_client = smtp_client or SMTPClient(
-            server=settings.smtp_server,
-            port=settings.smtp_port,
-            username=settings.smtp_username,
-            password=settings.smtp_password
-        )
+        self.smtp_client = smtp_client or get_smtp_client()
         self.template_manager = template_manager
 
     async def send_user_email(self, user_data: dict, email_type: str):
@@ -33,10 +27,14 @@ class EmailService:
 
         await self.smtp_client.send_email(subject_map[email_type], html_content, user_data['email'])
 
-    async def send_verification_email(self, user: User):
-        verification_url = f"{settings.server_base_url}verify-email/{user.id}/{user.verification_token}"
-        await self.send_user_email({
+    @staticmethod
+    def verification_email_data(user: User) -> dict:
+        """Template context for a user's verification email."""
+        return {
             "name": user.first_name,
-            "verification_url": verification_url,
+            "verification_url": f"{settings.server_base_url}verify-email/{user.id}/{user.verification_token}",
             "email": user.email
-        }, 'email_verification')
\ No newline at end of file
+        }
+
+    async def send_verification_email(self, user: User):
+        await self.send_user_email(self.verification_email_data(user), 'email_verification')
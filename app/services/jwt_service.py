@@ -1,22 +1,76 @@
 # app/services/jwt_service.py
-from builtins import dict, str
+from builtins import dict, float, int, isinstance, str
+import hashlib
+import time
+import uuid
 import jwt
 from datetime import datetime, timedelta
-from settings.config import settings
+from typing import Any, Optional
+from app.services.token_revocation_service import TokenRevocationService
+from app.utils.ttl_cache import TTLCache
+from settings.config import Settings, settings
 
 def create_access_token(*, data: dict, expires_delta: timedelta = None):
     to_encode = data.copy()
     # Convert role to uppercase before encoding the JWT
     if 'role' in to_encode:
         to_encode['role'] = to_encode['role'].upper()
-    expire = datetime.utcnow() + (expires_delta if expires_delta else timedelta(minutes=settings.access_token_expire_minutes))
-    to_encode.update({"exp": expire})
+    issued_at = datetime.utcnow()
+    expire = issued_at + (expires_delta if expires_delta else timedelta(minutes=settings.access_token_expire_minutes))
+    # jti and iat let a single token, or everything issued to a user so far, be revoked
+    to_encode.update({"exp": expire, "iat": issued_at, "jti": uuid.uuid4().hex})
     encoded_jwt = jwt.encode(to_encode, settings.jwt_secret_key, algorithm=settings.jwt_algorithm)
     return encoded_jwt
 
+
+class TokenVerifier:
+    """
+    Verifies access tokens, remembering the claims of tokens it has already verified.
+
+    The verification key is prepared once. Verified claims are cached under a SHA-256 digest of the token
+    (the token itself is never kept) until the token's own `exp`, so a token presented again skips parsing and
+    the HMAC check but still stops working the moment it expires. Invalid tokens are never cached, and every
+    call, cached or not, checks the shared revocation table.
+    """
+    def __init__(self, secret_key: str, algorithm: str, cache_size: int):
+        self.algorithm = algorithm
+        self.key: Any = jwt.get_algorithm_by_name(algorithm).prepare_key(secret_key)
+        self._jwt = jwt.PyJWT()
+        self.cache = TTLCache(cache_size, ttl_seconds=0)
+
+    def decode(self, token: str) -> Optional[dict]:
+        """Return a copy of the verified claims, or None if the token is invalid, expired or revoked."""
+        digest = hashlib.sha256(token.encode()).digest()
+        claims = self.cache.get(digest)
+        if claims is None:
+            try:
+                claims = self._jwt.decode(token, self.key, algorithms=[self.algorithm])
+            except jwt.PyJWTError:
+                return None
+            expires_at = claims.get("exp")
+            if isinstance(expires_at, (int, float)):
+                # The cache runs on the monotonic clock; `exp` is wall-clock time
+                self.cache.set(digest, claims, expires_at=self.cache.clock() + (expires_at - time.time()))
+        if TokenRevocationService.is_revoked(claims):
+            return None
+        return dict(claims)
+
+    def stats(self) -> dict:
+        return self.cache.stats()
+
+
+_verifier: Optional[TokenVerifier] = None
+
+def configure_token_verifier(config: Settings = settings) -> TokenVerifier:
+    """Prepare the verification key and claims cache; called at startup and whenever the key changes."""
+    global _verifier
+    _verifier = TokenVerifier(config.jwt_secret_key, config.jwt_algorithm, config.jwt_cache_size)
+    return _verifier
+
+def get_token_verifier() -> TokenVerifier:
+    if _verifier is None:
+        return configure_token_verifier()
+    return _verifier
+
 def decode_token(token: str):
-    try:
-        decoded = jwt.decode(token, settings.jwt_secret_key, algorithms=[settings.jwt_algorithm])
-        return decoded
-    except jwt.PyJWTError:
-        return None
+    return get_token_verifier().decode(token)
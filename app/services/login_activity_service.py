@@ -0,0 +1,102 @@
+from builtins import Exception, dict, float, int, len, max
+import asyncio
+from datetime import datetime
+from typing import Callable, Dict, Optional
+from uuid import UUID
+from sqlalchemy import bindparam, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.user_model import User
+from app.services.user_cache import get_user_cache
+from settings.config import Settings, settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+class LastLoginRecorder:
+    """
+    Write-behind buffer for `users.last_login_at`.
+
+    Successful logins only record the timestamp in memory; a background task writes the latest timestamp per
+    user every `flush_interval_seconds` in one batched UPDATE. A user who logs in many times between flushes
+    costs one row write, and the login request itself never writes the row.
+    """
+    def __init__(self, session_factory: Callable[[], AsyncSession], flush_interval_seconds: float):
+        self.session_factory = session_factory
+        self.flush_interval_seconds = flush_interval_seconds
+        self._pending: Dict[UUID, datetime] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.recorded = 0
+        self.written = 0
+
+    def record(self, user_id: UUID, logged_in_at: datetime):
+        self.recorded += 1
+        previous = self._pending.get(user_id)
+        self._pending[user_id] = logged_in_at if previous is None else max(previous, logged_in_at)
+
+    async def flush(self) -> int:
+        """Writes every buffered timestamp; returns the number of rows updated."""
+        if not self._pending:
+            return 0
+        pending, self._pending = self._pending, {}
+        try:
+            async with self.session_factory() as session:
+                statement = (
+                    update(User.__table__).where(User.id == bindparam("user_id"))
+                    .values(last_login_at=bindparam("at"), version=User.version)
+                )
+                await session.execute(statement, [{"user_id": user_id, "at": at} for user_id, at in pending.items()])
+                await session.commit()
+        except Exception:
+            # Keep the timestamps for the next flush, unless newer ones arrived meanwhile
+            for user_id, at in pending.items():
+                newer = self._pending.get(user_id)
+                self._pending[user_id] = at if newer is None else max(newer, at)
+            raise
+        cache = get_user_cache()
+        if cache is not None:
+            for user_id in pending:
+                cache.invalidate(user_id)
+        self.written += len(pending)
+        return len(pending)
+
+    def start(self):
+        self._task = asyncio.create_task(self._run(), name="last-login-writer")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval_seconds)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Writing last login timestamps failed: {e}")
+
+    def stats(self) -> dict:
+        return {"pending": len(self._pending), "recorded": self.recorded, "written": self.written}
+
+
+_recorder: Optional[LastLoginRecorder] = None
+
+def start_last_login_recorder(session_factory: Callable[[], AsyncSession], config: Settings = settings) -> Optional[LastLoginRecorder]:
+    """Starts write-behind for last login times unless `login_write_behind_seconds` is 0."""
+    global _recorder
+    if config.login_write_behind_seconds <= 0:
+        return None
+    _recorder = LastLoginRecorder(session_factory, config.login_write_behind_seconds)
+    _recorder.start()
+    return _recorder
+
+async def stop_last_login_recorder():
+    global _recorder
+    if _recorder is not None:
+        await _recorder.stop()
+        _recorder = None
+
+def get_last_login_recorder() -> Optional[LastLoginRecorder]:
+    return _recorder
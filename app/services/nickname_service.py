@@ -0,0 +1,45 @@
+from builtins import Exception, dict, int, round
+from app.utils.nickname_gen import get_nickname_generator
+import logging
+
+logger = logging.getLogger(__name__)
+
+class NicknameExhaustedError(Exception):
+    """Raised when every candidate tried was already taken."""
+
+class NicknameService:
+    """
+    Bookkeeping for nickname allocation.
+
+    Nicknames are generated in memory and inserted without checking them first; the unique index on
+    `users.nickname` rejects a taken one and the insert is retried with a fresh nickname, at most
+    `nickname_max_queries` times. Counters are per worker process.
+    """
+    allocations = 0
+    candidates_checked = 0
+    collisions = 0
+    exhausted = 0
+
+    @classmethod
+    def record(cls, checked: int, collided: int, allocated: int = 0):
+        cls.candidates_checked += checked
+        cls.collisions += collided
+        cls.allocations += allocated
+
+    @classmethod
+    def exhausted_error(cls, attempts: int) -> NicknameExhaustedError:
+        cls.exhausted += 1
+        logger.error(f"No free nickname after {attempts} attempts; the nickname space may be nearly full")
+        return NicknameExhaustedError("Could not allocate a unique nickname")
+
+    @classmethod
+    def stats(cls) -> dict:
+        rate = cls.collisions / cls.candidates_checked if cls.candidates_checked else 0.0
+        return {
+            "allocations": cls.allocations,
+            "candidates_checked": cls.candidates_checked,
+            "collisions": cls.collisions,
+            "collision_rate": round(rate, 4),
+            "exhausted": cls.exhausted,
+            "space": get_nickname_generator().size,
+        }
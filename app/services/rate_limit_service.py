@@ -0,0 +1,181 @@
+from builtins import Exception, ValueError, dict, float, int, str
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+from sqlalchemy import Float, case, cast, delete, extract, func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import Database
+from app.models.rate_limit_model import RateLimitBucket
+from app.utils.rate_limit import TOKEN_BUCKET, MemoryRateLimitBackend, RateLimit, RateLimitDecision, sliding_window_retry_after
+from settings.config import Settings, settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+class PostgresRateLimitBackend:
+    """
+    Keeps rate limit state in the `rate_limit_buckets` table, so limits hold across workers and hosts.
+
+    Each check is one `INSERT ... ON CONFLICT DO UPDATE ... RETURNING` that applies the same algorithms as
+    `app.utils.rate_limit` inside the database, on the database clock; concurrent requests for a bucket are
+    serialised by its row lock. If the database cannot be reached the request is let through: rate limiting
+    should not turn a database outage into a login outage. Expired buckets are deleted at most once per
+    `purge_interval_seconds` per worker.
+    """
+    name = "postgres"
+
+    def __init__(self, session_factory: Optional[Callable[[], AsyncSession]] = None, purge_interval_seconds: float = 60.0):
+        self.session_factory = session_factory
+        self.purge_interval_seconds = purge_interval_seconds
+        self._next_purge = 0.0
+        self.errors = 0
+
+    async def hit(self, bucket: str, rate_limit: RateLimit) -> RateLimitDecision:
+        session_factory = self.session_factory or Database.get_session_factory()
+        try:
+            async with session_factory() as session:
+                if rate_limit.algorithm == TOKEN_BUCKET:
+                    decision = await self._token_bucket(session, bucket, rate_limit)
+                else:
+                    decision = await self._sliding_window(session, bucket, rate_limit)
+                if time.monotonic() >= self._next_purge:
+                    self._next_purge = time.monotonic() + self.purge_interval_seconds
+                    await session.execute(delete(RateLimitBucket).where(RateLimitBucket.expires_at < func.now()))
+                await session.commit()
+            return decision
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Rate limit check for {bucket} failed, allowing the request: {e}")
+            return RateLimitDecision(True, 0.0)
+
+    @staticmethod
+    def _now():
+        # One value per statement, so every column of the upsert sees the same instant
+        return cast(extract("epoch", func.statement_timestamp()), Float)
+
+    async def _token_bucket(self, session: AsyncSession, bucket: str, rate_limit: RateLimit) -> RateLimitDecision:
+        table = RateLimitBucket.__table__
+        capacity = float(rate_limit.limit)
+        rate = capacity / rate_limit.period_seconds
+        now = self._now()
+        stmt = insert(table).values(
+            key=bucket, tokens=capacity - 1, updated_at=now, allowed=True, expires_at=func.to_timestamp(now + 1 / rate),
+        )
+        refilled = func.least(capacity, table.c.tokens + func.greatest(stmt.excluded.updated_at - table.c.updated_at, 0) * rate)
+        allowed = refilled >= 1
+        tokens = refilled - case((allowed, 1), else_=0)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.key],
+            set_={
+                "tokens": tokens,
+                "allowed": allowed,
+                "updated_at": stmt.excluded.updated_at,
+                "expires_at": func.to_timestamp(stmt.excluded.updated_at + (capacity - tokens) / rate),
+            },
+        ).returning(table.c.allowed, table.c.tokens)
+        row = (await session.execute(stmt)).one()
+        return RateLimitDecision(True, 0.0) if row.allowed else RateLimitDecision(False, (1 - row.tokens) / rate)
+
+    async def _sliding_window(self, session: AsyncSession, bucket: str, rate_limit: RateLimit) -> RateLimitDecision:
+        table = RateLimitBucket.__table__
+        period = rate_limit.period_seconds
+        now = self._now()
+        window_start = func.floor(now / period) * period
+        stmt = insert(table).values(
+            key=bucket, window_start=window_start, count=1, previous_count=0, updated_at=now, allowed=True,
+            expires_at=func.to_timestamp(window_start + 2 * period),
+        )
+        excluded = stmt.excluded
+        same_window = table.c.window_start == excluded.window_start
+        previous_window = table.c.window_start == excluded.window_start - period
+        count = case((same_window, table.c.count), else_=0)
+        previous_count = case((same_window, table.c.previous_count), (previous_window, table.c.count), else_=0)
+        estimate = previous_count * (1 - (excluded.updated_at - excluded.window_start) / period) + count
+        allowed = estimate + 1 <= rate_limit.limit
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.key],
+            set_={
+                "window_start": excluded.window_start,
+                "count": count + case((allowed, 1), else_=0),
+                "previous_count": previous_count,
+                "updated_at": excluded.updated_at,
+                "allowed": allowed,
+                "expires_at": excluded.expires_at,
+            },
+        ).returning(table.c.allowed, table.c.window_start, table.c.count, table.c.previous_count, table.c.updated_at)
+        row = (await session.execute(stmt)).one()
+        if row.allowed:
+            return RateLimitDecision(True, 0.0)
+        return RateLimitDecision(False, sliding_window_retry_after(rate_limit, row.window_start, row.count, row.previous_count, row.updated_at))
+
+    def clear(self):
+        pass
+
+    def stats(self) -> dict:
+        return {"errors": self.errors}
+
+
+class RateLimiter:
+    """
+    Applies named policies, each a list of `RateLimit`s, to requests.
+
+    A request must fit within every limit of its policy; the first one it exceeds rejects it. Buckets are
+    per policy, limit and key value, so e.g. the login limit for an email is independent of the register
+    limit for the same client address.
+    """
+    def __init__(self, backend, policies: Dict[str, List[RateLimit]]):
+        self.backend = backend
+        self.policies = policies
+        self.allowed: Dict[str, int] = {}
+        self.rejected: Dict[str, int] = {}
+
+    def key_types(self, policy: str) -> Iterable[str]:
+        return {rate_limit.key for rate_limit in self.policies.get(policy, ())}
+
+    async def check(self, policy: str, keys: Dict[str, Optional[str]]) -> RateLimitDecision:
+        """Count the request against each of the policy's limits whose key it has; keys that are None are skipped."""
+        for rate_limit in self.policies.get(policy, ()):
+            value = keys.get(rate_limit.key)
+            if not value:
+                continue
+            decision = await self.backend.hit(f"{policy}:{rate_limit}:{value}", rate_limit)
+            if not decision.allowed:
+                self.rejected[policy] = self.rejected.get(policy, 0) + 1
+                return decision
+        self.allowed[policy] = self.allowed.get(policy, 0) + 1
+        return RateLimitDecision(True, 0.0)
+
+    def stats(self) -> dict:
+        return {
+            "backend": self.backend.name,
+            **self.backend.stats(),
+            "policies": {
+                policy: {"limits": [str(rate_limit) for rate_limit in limits], "allowed": self.allowed.get(policy, 0), "rejected": self.rejected.get(policy, 0)}
+                for policy, limits in self.policies.items()
+            },
+        }
+
+
+_limiter: Optional[RateLimiter] = None
+_configured = False
+
+def configure_rate_limiter(config: Settings = settings) -> Optional[RateLimiter]:
+    """Build the limiter from `Settings.rate_limits` and `rate_limit_backend`; None when rate limiting is off."""
+    global _limiter, _configured
+    policies = {policy: [RateLimit.parse(rule) for rule in rules] for policy, rules in config.rate_limits.items()}
+    name = config.rate_limit_backend
+    if not config.rate_limit_enabled:
+        _limiter = None
+    elif name == MemoryRateLimitBackend.name:
+        _limiter = RateLimiter(MemoryRateLimitBackend(config.rate_limit_memory_size), policies)
+    elif name == PostgresRateLimitBackend.name:
+        _limiter = RateLimiter(PostgresRateLimitBackend(), policies)
+    else:
+        raise ValueError(f"Unknown rate limit backend '{name}'")
+    _configured = True
+    return _limiter
+
+def get_rate_limiter() -> Optional[RateLimiter]:
+    if not _configured:
+        configure_rate_limiter()
+    return _limiter
@@ -0,0 +1,129 @@
+from builtins import bool, classmethod, str
+from datetime import datetime, timedelta, timezone
+from enum import Enum
+import hashlib
+import secrets
+from typing import Optional, Tuple
+from uuid import UUID, uuid4
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.refresh_token_model import RefreshToken
+from app.models.user_model import User
+from app.services.user_service import UserService
+from settings.config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+class RefreshOutcome(Enum):
+    ROTATED = "rotated"
+    INVALID = "invalid"
+    REUSED = "reused"
+    LOCKED = "locked"
+
+class RefreshTokenService:
+    """
+    Issues and rotates refresh tokens.
+
+    Tokens are 256-bit random strings, so a single SHA-256 is enough to store them safely and looking one up
+    costs an index probe, not a password hash. Redeeming a token marks it used and issues a successor in the
+    same family; a token that is presented again after being used means it leaked, and the whole family is
+    revoked so neither the thief nor the user can continue with it.
+    """
+    @staticmethod
+    def hash_token(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    @classmethod
+    def issue(cls, session: AsyncSession, user_id: UUID, family_id: Optional[UUID] = None) -> str:
+        """Add a new refresh token to the session (written when it flushes) and return it."""
+        token = secrets.token_urlsafe(32)
+        session.add(RefreshToken(
+            id=uuid4(),
+            user_id=user_id,
+            family_id=family_id or uuid4(),
+            token_hash=cls.hash_token(token),
+            expires_at=datetime.now(timezone.utc) + timedelta(minutes=settings.refresh_token_expire_minutes),
+        ))
+        return token
+
+    @classmethod
+    async def rotate(cls, session: AsyncSession, token: str) -> Tuple[RefreshOutcome, Optional[User], Optional[str]]:
+        """
+        Redeem `token` for its successor: returns (ROTATED, user, new token) or a failure outcome.
+
+        The token is claimed with one conditional `UPDATE ... RETURNING`, so of two concurrent redemptions
+        only one succeeds; the other is treated as reuse.
+        """
+        token_hash = cls.hash_token(token)
+        result = await session.execute(
+            update(RefreshToken)
+            .where(
+                RefreshToken.token_hash == token_hash,
+                RefreshToken.used_at.is_(None),
+                RefreshToken.revoked_at.is_(None),
+                RefreshToken.expires_at > func.now(),
+            )
+            .values(used_at=func.now())
+            .returning(RefreshToken.user_id, RefreshToken.family_id)
+            .execution_options(synchronize_session=False)
+        )
+        claimed = result.first()
+        if claimed is None:
+            return await cls._reject(session, token_hash), None, None
+
+        # Read past the user cache: a lock set by another worker would otherwise go unseen until the TTL ran out
+        user = await UserService.get_by_id(session, claimed.user_id, with_secrets=True)
+        if user is None:
+            return RefreshOutcome.INVALID, None, None
+        if user.is_locked:
+            await cls.revoke_family(session, claimed.family_id)
+            # Committed here because the request fails afterwards and its unit of work is rolled back
+            await session.commit()
+            return RefreshOutcome.LOCKED, None, None
+        return RefreshOutcome.ROTATED, user, cls.issue(session, user.id, claimed.family_id)
+
+    @classmethod
+    async def _reject(cls, session: AsyncSession, token_hash: str) -> RefreshOutcome:
+        result = await session.execute(
+            select(RefreshToken.family_id, RefreshToken.used_at, RefreshToken.revoked_at)
+            .where(RefreshToken.token_hash == token_hash)
+        )
+        stored = result.first()
+        if stored is None or stored.used_at is None or stored.revoked_at is not None:
+            # Unknown, expired, or already revoked
+            return RefreshOutcome.INVALID
+        logger.warning(f"Refresh token reuse detected; revoking token family {stored.family_id}")
+        await cls.revoke_family(session, stored.family_id)
+        await session.commit()
+        return RefreshOutcome.REUSED
+
+    @classmethod
+    async def revoke_family(cls, session: AsyncSession, family_id: UUID) -> bool:
+        result = await session.execute(
+            update(RefreshToken)
+            .where(RefreshToken.family_id == family_id, RefreshToken.revoked_at.is_(None))
+            .values(revoked_at=func.now())
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount > 0
+
+    @classmethod
+    async def revoke(cls, session: AsyncSession, token: str) -> bool:
+        """Revoke the family `token` belongs to (logout); False if the token is unknown."""
+        result = await session.execute(
+            select(RefreshToken.family_id).where(RefreshToken.token_hash == cls.hash_token(token))
+        )
+        family_id = result.scalar_one_or_none()
+        return family_id is not None and await cls.revoke_family(session, family_id)
+
+    @classmethod
+    async def revoke_user(cls, session: AsyncSession, user_id: UUID) -> bool:
+        """Revoke every refresh token a user holds."""
+        result = await session.execute(
+            update(RefreshToken)
+            .where(RefreshToken.user_id == user_id, RefreshToken.revoked_at.is_(None))
+            .values(revoked_at=func.now())
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount > 0
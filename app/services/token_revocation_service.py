@@ -0,0 +1,206 @@
+from builtins import Exception, bool, dict, int, len, list, max, min, range, sorted, str
+import asyncio
+from datetime import datetime, timezone
+import math
+import time
+from typing import Callable, Dict, Optional
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.revoked_token_model import RevokedToken
+from app.models.user_model import User
+from app.utils.revocation_table import ALL_TOKENS, SharedRevocationTable, shared_memory_path
+from settings.config import Settings, settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+def default_revocation_path() -> str:
+    return shared_memory_path("user_api_token_revocations")
+
+def _timestamp(moment: datetime) -> int:
+    return int(math.ceil(moment.timestamp()))
+
+
+class TokenRevocationService:
+    """
+    Revokes access tokens before their `exp`.
+
+    Revocations are inserted into `revoked_tokens` and written straight into the host's shared revocation
+    table, so they apply to every worker on this host at once; workers on other hosts pick them up from the
+    table within `token_revocation_sync_seconds`. The local write happens before the transaction commits: if
+    it rolls back, the worst case is a token refused a little early, never one that stays usable.
+    """
+    @classmethod
+    async def revoke_token(cls, session: AsyncSession, claims: dict):
+        """Revoke one access token (logout) until it expires."""
+        await cls._revoke(session, f"jti:{claims['jti']}", None, datetime.fromtimestamp(claims["exp"], timezone.utc))
+
+    @classmethod
+    async def revoke_subject(cls, session: AsyncSession, subject: str):
+        """Revoke every access token issued to `subject` so far; later tokens are unaffected."""
+        now = datetime.now(timezone.utc)
+        expires_at = datetime.fromtimestamp(now.timestamp() + settings.access_token_expire_minutes * 60, timezone.utc)
+        await cls._revoke(session, f"sub:{subject}", now, expires_at)
+
+    @classmethod
+    async def revoke_user(cls, session: AsyncSession, user: User):
+        """Revoke every access token issued to a user so far (account lock), whichever subject it names them by."""
+        # Login puts the email in `sub`; tokens minted elsewhere use the user id
+        await cls.revoke_subject(session, user.email)
+        await cls.revoke_subject(session, str(user.id))
+
+    @classmethod
+    async def _revoke(cls, session: AsyncSession, key: str, issued_before: Optional[datetime], expires_at: datetime):
+        session.add(RevokedToken(key=key, issued_before=issued_before, expires_at=expires_at))
+        await session.flush()
+        apply_revocation(key, issued_before, expires_at)
+
+    @classmethod
+    def is_revoked(cls, claims: dict) -> bool:
+        """True if the token with these (verified) claims was revoked; one or two shared memory lookups."""
+        table = get_revocation_table()
+        if table is None:
+            return False
+        # Tokens from before revocation support carry no iat; a subject revocation covers them
+        issued_at = claims.get("iat", 0)
+        jti = claims.get("jti")
+        if jti is not None and table.is_revoked(f"jti:{jti}", issued_at):
+            return True
+        return table.is_revoked(f"sub:{claims.get('sub')}", issued_at)
+
+
+def apply_revocation(key: str, issued_before: Optional[datetime], expires_at: datetime):
+    table = get_revocation_table()
+    if table is not None:
+        table.revoke(key, ALL_TOKENS if issued_before is None else int(issued_before.timestamp()), _timestamp(expires_at))
+
+
+class RevocationSyncer:
+    """
+    Mirrors rows added to `revoked_tokens` (by any host) into the shared revocation table.
+
+    Each worker polls for ids above the last one it has seen; the first poll loads every revocation that has
+    not expired yet. Ids are handed out when a row is inserted but become visible when its transaction
+    commits, so a lower id can show up after a higher one. Ids skipped over are remembered as gaps and looked
+    up again on every poll for `gap_seconds` (the newest `max_gaps` of them); a gap still empty by then
+    belonged to a transaction that rolled back. Rows are applied idempotently, so several workers syncing the
+    same table is harmless.
+    """
+    def __init__(self, session_factory: Callable[[], AsyncSession], interval_seconds: float, batch_size: int = 1000,
+                 gap_seconds: float = 60.0, max_gaps: int = 1000):
+        self.session_factory = session_factory
+        self.interval_seconds = interval_seconds
+        self.batch_size = batch_size
+        self.gap_seconds = gap_seconds
+        self.max_gaps = max_gaps
+        self.last_id = 0
+        self.synced = 0
+        # Skipped id -> when it was first found missing
+        self._gaps: Dict[int, float] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    async def sync(self) -> int:
+        """Apply revocations added since the last call, late commits included; returns how many were applied."""
+        applied = 0
+        async with self.session_factory() as session:
+            if self._gaps:
+                applied += await self._fill_gaps(session)
+            while True:
+                result = await session.execute(
+                    select(RevokedToken.id, RevokedToken.key, RevokedToken.issued_before, RevokedToken.expires_at)
+                    .where(RevokedToken.id > self.last_id, RevokedToken.expires_at > datetime.now(timezone.utc))
+                    .order_by(RevokedToken.id)
+                    .limit(self.batch_size)
+                )
+                rows = result.all()
+                for row in rows:
+                    self._skip_to(row.id)
+                    apply_revocation(row.key, row.issued_before, row.expires_at)
+                    self.last_id = row.id
+                applied += len(rows)
+                if len(rows) < self.batch_size:
+                    break
+        self.synced += applied
+        return applied
+
+    def _skip_to(self, row_id: int):
+        """Remember the ids between the last row seen and `row_id` as gaps."""
+        now = time.monotonic()
+        for gap_id in range(max(self.last_id + 1, row_id - self.max_gaps), row_id):
+            self._gaps[gap_id] = now
+        if len(self._gaps) > self.max_gaps:
+            for gap_id in sorted(self._gaps)[:len(self._gaps) - self.max_gaps]:
+                del self._gaps[gap_id]
+
+    async def _fill_gaps(self, session: AsyncSession) -> int:
+        now = time.monotonic()
+        self._gaps = {gap_id: seen for gap_id, seen in self._gaps.items() if now - seen < self.gap_seconds}
+        if not self._gaps:
+            return 0
+        result = await session.execute(
+            select(RevokedToken.id, RevokedToken.key, RevokedToken.issued_before, RevokedToken.expires_at)
+            .where(RevokedToken.id.in_(list(self._gaps)), RevokedToken.expires_at > datetime.now(timezone.utc))
+        )
+        rows = result.all()
+        for row in rows:
+            apply_revocation(row.key, row.issued_before, row.expires_at)
+            del self._gaps[row.id]
+        return len(rows)
+
+    def start(self):
+        self._task = asyncio.create_task(self._run(), name="token-revocation-sync")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.sync()
+            except Exception as e:
+                logger.error(f"Syncing token revocations failed: {e}")
+            await asyncio.sleep(self.interval_seconds)
+
+    def stats(self) -> dict:
+        return {"last_id": self.last_id, "synced": self.synced, "gaps": len(self._gaps)}
+
+
+_table: Optional[SharedRevocationTable] = None
+_configured = False
+_syncer: Optional[RevocationSyncer] = None
+
+def configure_revocation_table(config: Settings = settings) -> Optional[SharedRevocationTable]:
+    """Map the host's shared revocation table; `token_revocation_capacity = 0` turns revocation checks off."""
+    global _table, _configured
+    if _table is not None:
+        _table.close()
+    _table = None
+    if config.token_revocation_capacity > 0:
+        _table = SharedRevocationTable(config.token_revocation_path or default_revocation_path(), config.token_revocation_capacity)
+    _configured = True
+    return _table
+
+def get_revocation_table() -> Optional[SharedRevocationTable]:
+    if not _configured:
+        configure_revocation_table()
+    return _table
+
+def start_revocation_sync(session_factory: Callable[[], AsyncSession], config: Settings = settings) -> Optional[RevocationSyncer]:
+    global _syncer
+    if get_revocation_table() is None:
+        return None
+    _syncer = RevocationSyncer(session_factory, config.token_revocation_sync_seconds)
+    _syncer.start()
+    return _syncer
+
+async def stop_revocation_sync():
+    global _syncer
+    if _syncer is not None:
+        await _syncer.stop()
+        _syncer = None
+
+def get_revocation_syncer() -> Optional[RevocationSyncer]:
+    return _syncer
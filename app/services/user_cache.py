@@ -0,0 +1,126 @@
+from builtins import any, dict, float, int, len, round, set, str
+from typing import Any, Optional
+from uuid import UUID
+from sqlalchemy import event, inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.database import REPLICA_SESSION
+from app.models.user_model import User
+from app.utils.ttl_cache import TTLCache
+from settings.config import Settings, settings
+
+# Never copied into the cache; lookups that need them go to the database
+SECRET_FIELDS = frozenset({"hashed_password", "verification_token"})
+CACHED_FIELDS = tuple(column.key for column in User.__table__.columns if column.key not in SECRET_FIELDS)
+LOOKUP_FIELDS = ("id", "email", "nickname")
+
+# session.info key holding user ids written in the current transaction
+_PENDING_INVALIDATIONS = "user_cache_invalidations"
+
+class UserCache:
+    """
+    Read-through cache of user rows for `UserService` lookups by id, email and nickname.
+
+    Entries are plain column snapshots without `SECRET_FIELDS`, held for `ttl_seconds` in a bounded LRU.
+    Email and nickname keys point at the id entry and are checked against it on every hit, so dropping the id
+    entry is enough to invalidate a user. Writes from other processes become visible when the TTL runs out.
+    """
+    def __init__(self, maxsize: int, ttl_seconds: float):
+        self._entries = TTLCache(maxsize * len(LOOKUP_FIELDS), ttl_seconds)
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, field: str, value: Any) -> Optional[dict]:
+        if field == "id":
+            snapshot = self._entries.get(("id", value))
+        else:
+            user_id = self._entries.get((field, value))
+            snapshot = self._entries.get(("id", user_id)) if user_id is not None else None
+            if snapshot is not None and snapshot[field] != value:
+                snapshot = None
+        if snapshot is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return snapshot
+
+    def put(self, user: User):
+        loaded = inspect(user).dict
+        if any(field not in loaded for field in CACHED_FIELDS):
+            # Partially loaded (or itself built from the cache); not a complete copy of the row
+            return
+        snapshot = {field: loaded[field] for field in CACHED_FIELDS}
+        self._entries.set(("id", user.id), snapshot)
+        self._entries.set(("email", user.email), user.id)
+        self._entries.set(("nickname", user.nickname), user.id)
+
+    def invalidate(self, user_id: UUID):
+        self._entries.pop(("id", user_id))
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        entries = self._entries.stats()
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries["size"],
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": entries["evictions"],
+            "expirations": entries["expirations"],
+        }
+
+
+_user_cache: Optional[UserCache] = None
+_configured = False
+
+def configure_user_cache(config: Settings = settings) -> Optional[UserCache]:
+    """Build the process's user cache from the settings; `user_cache_size = 0` turns caching off."""
+    global _user_cache, _configured
+    _user_cache = UserCache(config.user_cache_size, config.user_cache_ttl_seconds) if config.user_cache_size > 0 else None
+    _configured = True
+    return _user_cache
+
+def get_user_cache() -> Optional[UserCache]:
+    if not _configured:
+        configure_user_cache()
+    return _user_cache
+
+def invalidate_user(session: AsyncSession, user_id: UUID):
+    """
+    Drop a user that `session` is changing, now and again once the transaction ends.
+
+    The second pass covers a concurrent request that re-read (and re-cached) the old row before the commit.
+    Until then this session does not cache the user, so its own uncommitted changes never reach the cache.
+    """
+    cache = get_user_cache()
+    if cache is None:
+        return
+    cache.invalidate(user_id)
+    session.info.setdefault(_PENDING_INVALIDATIONS, set()).add(user_id)
+
+def remember_user(session: AsyncSession, user: User):
+    """
+    Cache a user just read through `session`, unless this transaction is changing it.
+
+    Rows read on a replica are never cached: a lagging replica can still return the row a write on the
+    primary just invalidated, and caching it would serve that stale copy for the whole TTL.
+    """
+    cache = get_user_cache()
+    if cache is None or REPLICA_SESSION in session.info:
+        return
+    if user.id not in session.info.get(_PENDING_INVALIDATIONS, ()):
+        cache.put(user)
+
+@event.listens_for(Session, "after_commit")
+@event.listens_for(Session, "after_rollback")
+def _invalidate_written_users(session: Session):
+    user_ids = session.info.pop(_PENDING_INVALIDATIONS, None)
+    cache = get_user_cache()
+    if user_ids and cache is not None:
+        for user_id in user_ids:
+            cache.invalidate(user_id)
@@ -0,0 +1,113 @@
+from builtins import ValueError, bool, float, int
+import time
+from typing import NamedTuple, Optional
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.user_model import User
+from settings.config import Settings, settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+class UserCount(NamedTuple):
+    """Total number of users and whether it is exact or an estimate."""
+    total: int
+    exact: bool
+
+
+class ExactCountStrategy:
+    """Runs `SELECT count(*) FROM users` every time."""
+    name = "exact"
+
+    async def count(self, session: AsyncSession) -> UserCount:
+        result = await session.execute(select(func.count()).select_from(User))
+        return UserCount(result.scalar(), True)
+
+    def invalidate(self):
+        pass
+
+
+class CachedCountStrategy(ExactCountStrategy):
+    """
+    Serves an exact count from process memory for `ttl_seconds`.
+
+    Writes in this process call `invalidate()`; writes from other workers become visible when the TTL expires,
+    so the total is reported as exact only while it is fresh from the database.
+    """
+    name = "cached"
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._value: Optional[int] = None
+        self._expires_at = 0.0
+
+    async def count(self, session: AsyncSession) -> UserCount:
+        if self._value is not None and time.monotonic() < self._expires_at:
+            return UserCount(self._value, False)
+        counted = await super().count(session)
+        self._value = counted.total
+        self._expires_at = time.monotonic() + self.ttl_seconds
+        return counted
+
+    def invalidate(self):
+        self._value = None
+
+
+class EstimatedCountStrategy(ExactCountStrategy):
+    """
+    Uses the planner's row estimate from `pg_class.reltuples` for large tables.
+
+    Below `threshold` rows (or on databases other than PostgreSQL, or before the table was ever analyzed)
+    an exact count is cheap enough and is used instead.
+    """
+    name = "estimate"
+
+    def __init__(self, threshold: int):
+        self.threshold = threshold
+
+    async def count(self, session: AsyncSession) -> UserCount:
+        if session.get_bind().dialect.name == "postgresql":
+            result = await session.execute(
+                text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:table)"),
+                {"table": User.__tablename__},
+            )
+            estimate = result.scalar()
+            if estimate is not None and estimate >= self.threshold:
+                return UserCount(estimate, False)
+        return await super().count(session)
+
+
+class WindowCountStrategy(ExactCountStrategy):
+    """
+    Marker strategy: skip-mode listings take the total from `count(*) OVER ()` on the page query itself
+    (see `UserService.list_users_with_total`). Standalone counts, e.g. for cursor pages, stay exact.
+    """
+    name = "window"
+
+
+_strategy: Optional[ExactCountStrategy] = None
+
+def configure_user_count_strategy(config: Settings = settings) -> ExactCountStrategy:
+    """Builds the count strategy selected by `Settings.user_count_strategy`."""
+    global _strategy
+    name = config.user_count_strategy
+    if name == CachedCountStrategy.name:
+        _strategy = CachedCountStrategy(config.user_count_cache_ttl_seconds)
+    elif name == EstimatedCountStrategy.name:
+        _strategy = EstimatedCountStrategy(config.user_count_estimate_threshold)
+    elif name == WindowCountStrategy.name:
+        _strategy = WindowCountStrategy()
+    elif name == ExactCountStrategy.name:
+        _strategy = ExactCountStrategy()
+    else:
+        raise ValueError(f"Unknown user count strategy '{name}'")
+    return _strategy
+
+def get_user_count_strategy() -> ExactCountStrategy:
+    if _strategy is None:
+        return configure_user_count_strategy()
+    return _strategy
+
+def invalidate_user_count():
+    """Drops any cached total; call after inserting or deleting users."""
+    get_user_count_strategy().invalidate()
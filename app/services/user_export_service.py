@@ -0,0 +1,88 @@
+from builtins import bool, classmethod, dict, int, isinstance, len, str, tuple, zip
+import csv
+import io
+import json
+from datetime import datetime
+from enum import Enum
+from typing import AsyncIterator, Callable, Optional
+from uuid import UUID
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.user_model import User, UserRole
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Columns included in exports; credentials and verification tokens are never exported.
+EXPORT_COLUMNS = (
+    User.id, User.nickname, User.email, User.first_name, User.last_name, User.bio,
+    User.profile_picture_url, User.linkedin_profile_url, User.github_profile_url, User.role,
+    User.is_professional, User.email_verified, User.is_locked, User.failed_login_attempts,
+    User.last_login_at, User.created_at, User.updated_at,
+)
+EXPORT_FIELDS = tuple(column.key for column in EXPORT_COLUMNS)
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+def _export_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, UUID):
+        return str(value)
+    if isinstance(value, Enum):
+        return value.value
+    return value
+
+class UserExportService:
+    @classmethod
+    def build_query(cls, role: Optional[UserRole] = None, email_verified: Optional[bool] = None, is_locked: Optional[bool] = None,
+                    created_after: Optional[datetime] = None, created_before: Optional[datetime] = None):
+        """Select export columns (not ORM entities, so nothing accumulates in the identity map) with optional filters."""
+        query = select(*EXPORT_COLUMNS)
+        if role is not None:
+            query = query.where(User.role == role)
+        if email_verified is not None:
+            query = query.where(User.email_verified == email_verified)
+        if is_locked is not None:
+            query = query.where(User.is_locked == is_locked)
+        if created_after is not None:
+            query = query.where(User.created_at >= created_after)
+        if created_before is not None:
+            query = query.where(User.created_at < created_before)
+        return query.order_by(User.created_at, User.id)
+
+    @classmethod
+    async def stream(cls, session_factory: Callable[[], AsyncSession], query, export_format: str, batch_size: int = 1000) -> AsyncIterator[bytes]:
+        """
+        Stream the query result as NDJSON or CSV, one chunk per fetched batch.
+
+        Rows are read through a server-side cursor `batch_size` at a time and serialized as they arrive,
+        so memory use is bounded by one batch no matter how large the table is. The session is owned by the
+        generator because the response body is produced after request dependencies have been torn down.
+        """
+        buffer = io.StringIO()
+        writer = None
+        if export_format == "csv":
+            writer = csv.writer(buffer)
+            writer.writerow(EXPORT_FIELDS)
+        exported = 0
+        async with session_factory() as session:
+            result = await session.stream(query.execution_options(yield_per=batch_size))
+            async for rows in result.partitions():
+                for row in rows:
+                    values = [_export_value(value) for value in row]
+                    if writer is not None:
+                        writer.writerow(values)
+                    else:
+                        buffer.write(json.dumps(dict(zip(EXPORT_FIELDS, values)), separators=(",", ":")))
+                        buffer.write("\n")
+                exported += len(rows)
+                yield buffer.getvalue().encode("utf-8")
+                buffer.seek(0)
+                buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue().encode("utf-8")
+        logger.info(f"Exported {exported} users as {export_format}")
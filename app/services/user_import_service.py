@@ -0,0 +1,176 @@
+from builtins import Exception, TypeError, ValueError, classmethod, dict, int, isinstance, len, list, max, min, next, range, set, str, zip
+import codecs
+import csv
+import json
+import uuid
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from pydantic import ValidationError
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.user_model import User
+from app.schemas.user_schemas import UserCreate, UserImportError, UserImportResponse
+from app.services.email_outbox_service import EmailOutboxService
+from app.services.nickname_service import NicknameService
+from app.services.user_count_service import invalidate_user_count
+from app.utils.nickname_gen import get_nickname_generator
+from app.utils.security import generate_verification_token, hash_passwords_async
+from settings.config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+IMPORT_FORMATS = ("ndjson", "csv")
+# asyncpg allows at most 32767 bind parameters per statement; a multi-row insert binds up to one per column per row
+MAX_BATCH_SIZE = 32767 // len(User.__table__.columns)
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Split a streamed UTF-8 body into lines without buffering the whole body."""
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending.rstrip("\r")
+
+class UserImportService:
+    @classmethod
+    async def import_users(cls, session: AsyncSession, lines: AsyncIterator[str], import_format: str, batch_size: int = 1000) -> Tuple[UserImportResponse, List[User]]:
+        """
+        Create users from NDJSON objects or CSV rows (header first) in batches.
+
+        Batches are capped at `MAX_BATCH_SIZE` rows to stay within the driver's bind parameter limit.
+        Every batch costs one email lookup, one parallel hashing pass and one multi-row
+        `INSERT ... ON CONFLICT DO NOTHING RETURNING`, then commits. Rows that fail validation or
+        collide with existing emails are reported by their 1-based data row number; the rest are created.
+        CSV fields may not contain embedded newlines.
+
+        Verification emails are queued in the outbox within each batch's transaction when the outbox is enabled.
+
+        :return: The import summary plus the created users (not attached to the session) for follow-up work
+                 such as verification emails when the outbox is disabled.
+        """
+        batch_size = max(1, min(batch_size, MAX_BATCH_SIZE))
+        report = UserImportResponse(total_rows=0, created=0, failed=0, errors=[])
+        created_users: List[User] = []
+        seen_emails = set()
+        header: Optional[List[str]] = None
+        batch: List[Tuple[int, dict]] = []
+
+        async for line in lines:
+            if not line.strip():
+                continue
+            if import_format == "csv" and header is None:
+                header = next(csv.reader([line]))
+                continue
+            report.total_rows += 1
+            row_number = report.total_rows
+            try:
+                if import_format == "csv":
+                    values = next(csv.reader([line]))
+                    raw = {key: value for key, value in zip(header, values) if value != ""}
+                else:
+                    raw = json.loads(line)
+                validated = UserCreate(**raw).model_dump()
+            except (ValueError, TypeError, ValidationError) as e:
+                cls._fail(report, row_number, None, cls._describe(e))
+                continue
+            if validated["email"] in seen_emails:
+                cls._fail(report, row_number, validated["email"], "Duplicate email in import")
+                continue
+            seen_emails.add(validated["email"])
+            batch.append((row_number, validated))
+            if len(batch) >= batch_size:
+                created_users.extend(await cls._insert_batch(session, batch, report))
+                batch = []
+
+        if batch:
+            created_users.extend(await cls._insert_batch(session, batch, report))
+        if created_users:
+            invalidate_user_count()
+        logger.info(f"Imported {report.created} of {report.total_rows} users ({report.failed} failed)")
+        return report, created_users
+
+    @classmethod
+    async def _insert_batch(cls, session: AsyncSession, batch: List[Tuple[int, dict]], report: UserImportResponse) -> List[User]:
+        existing = await cls._existing_emails(session, [data["email"] for _, data in batch])
+        pending: List[Tuple[int, dict]] = []
+        for row_number, data in batch:
+            if data["email"] in existing:
+                cls._fail(report, row_number, data["email"], "Email already exists")
+            else:
+                pending.append((row_number, data))
+        if not pending:
+            return []
+
+        hashed = await hash_passwords_async([data.pop("password") for _, data in pending])
+        rows: Dict[str, Tuple[int, dict]] = {}
+        for (row_number, data), hashed_password in zip(pending, hashed):
+            if isinstance(hashed_password, Exception):
+                cls._fail(report, row_number, data["email"], str(hashed_password))
+                continue
+            data.update(
+                id=uuid.uuid4(),
+                hashed_password=hashed_password,
+                verification_token=generate_verification_token(),
+            )
+            rows[data["email"]] = (row_number, data)
+
+        created: List[User] = []
+        if not rows:
+            return created
+        generator = get_nickname_generator()
+        for _ in range(settings.nickname_max_queries):
+            for (_, data), nickname in zip(rows.values(), generator.candidates(len(rows))):
+                data["nickname"] = nickname
+            attempted = len(rows)
+            statement = (
+                insert(User).values([data for _, data in rows.values()])
+                .on_conflict_do_nothing()
+                .returning(User.id, User.email, User.first_name, User.verification_token)
+            )
+            result = await session.execute(statement)
+            for row in result.all():
+                rows.pop(row.email)
+                # Transient objects carrying just what follow-up work needs; nothing piles up in the session
+                created.append(User(id=row.id, email=row.email, first_name=row.first_name, verification_token=row.verification_token))
+            if not rows:
+                NicknameService.record(attempted, 0)
+                break
+            # Skipped rows hit a unique index: either the email was registered concurrently or the
+            # generated nickname collided. Report the former and retry the latter with new nicknames.
+            taken = await cls._existing_emails(session, list(rows))
+            for email in taken:
+                row_number, _ = rows.pop(email)
+                cls._fail(report, row_number, email, "Email already exists")
+            NicknameService.record(attempted, len(rows))
+        for email, (row_number, _) in rows.items():
+            cls._fail(report, row_number, email, "Could not allocate a unique nickname")
+
+        if settings.email_outbox_enabled:
+            await EmailOutboxService.enqueue_verification_emails(session, created)
+        await session.commit()
+        report.created += len(created)
+        return created
+
+    @classmethod
+    async def _existing_emails(cls, session: AsyncSession, emails: List[str]) -> set:
+        if not emails:
+            return set()
+        result = await session.execute(select(User.email).where(User.email.in_(emails)))
+        return set(result.scalars().all())
+
+    @classmethod
+    def _fail(cls, report: UserImportResponse, row_number: int, email: Optional[str], error: str):
+        report.failed += 1
+        report.errors.append(UserImportError(row=row_number, email=email, error=error))
+
+    @classmethod
+    def _describe(cls, error: Exception) -> str:
+        if isinstance(error, ValidationError):
+            return "; ".join(f"{'.'.join(str(part) for part in item['loc'])}: {item['msg']}" for item in error.errors())
+        return str(error)
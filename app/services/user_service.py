@@ -1,17 +1,30 @@
-from builtins import Exception, bool, classmethod, int, str
+from builtins import Exception, bool, classmethod, int, isinstance, len, list, str
 from datetime import datetime, timezone
+from enum import Enum
 import secrets
-from typing import Optional, Dict, List
+from typing import Optional, Dict, List, Tuple
 from pydantic import ValidationError
-from sqlalchemy import func, null, update, select
-from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy import func, inspect, null, or_, update, select, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.orm.util import identity_key
 from app.dependencies import get_email_service, get_settings
 from app.models.user_model import User
 from app.schemas.user_schemas import UserCreate, UserUpdate
-from app.utils.nickname_gen import generate_nickname
-from app.utils.security import generate_verification_token, hash_password, verify_password
-from uuid import UUID
+from app.services.email_outbox_service import EmailOutboxService
+from app.services.login_activity_service import get_last_login_recorder
+from app.services.nickname_service import NicknameService
+from app.services.user_cache import get_user_cache, invalidate_user, remember_user
+from app.services.user_count_service import (
+    ExactCountStrategy, UserCount, WindowCountStrategy, get_user_count_strategy, invalidate_user_count
+)
+from app.utils.cursor import NEXT, PREV, decode_cursor, encode_cursor
+from app.utils.nickname_gen import get_nickname_generator
+from app.utils.security import generate_verification_token, hash_password_async, password_needs_rehash, verify_password_async
+from uuid import UUID, uuid4
 from app.services.email_service import EmailService
 from app.models.user_model import UserRole
 import logging
@@ -19,100 +32,198 @@ import logging
 settings = get_settings()
 logger = logging.getLogger(__name__)
 
+class DuplicateEmailError(Exception):
+    """Raised when creating a user whose email is already registered."""
+    def __init__(self, email: str):
+        super().__init__(f"User with email {email} already exists")
+        self.email = email
+
+class UniqueFieldConflictError(Exception):
+    """Raised when an update would give a user an email or nickname another user already has."""
+    def __init__(self, fields: List[str]):
+        super().__init__(f"{' or '.join(fields).capitalize()} already in use by another user")
+        self.fields = fields
+
+class VersionConflictError(Exception):
+    """Raised when a conditional update targets a version of the user that is no longer current."""
+    def __init__(self, user_id: UUID, current_version: int):
+        super().__init__(f"User {user_id} is at version {current_version}")
+        self.current_version = current_version
+
+class LoginOutcome(Enum):
+    SUCCESS = "success"
+    INVALID = "invalid"
+    LOCKED = "locked"
+
 class UserService:
+    """
+    User persistence and account workflows.
+
+    Methods run inside the caller's transaction and flush rather than commit; the request's unit of work
+    (`get_db`) commits once at the end. Exceptions are noted where a method has to commit on its own.
+    """
     @classmethod
     async def _execute_query(cls, session: AsyncSession, query):
-        try:
-            result = await session.execute(query)
-            await session.commit()
-            return result
-        except SQLAlchemyError as e:
-            logger.error(f"Database error: {e}")
-            await session.rollback()
-            return None
+        # Database errors propagate: rolling back here would silently discard the request's earlier writes,
+        # so `get_db` rolls back the whole unit of work and answers 500 instead
+        return await session.execute(query)
 
     @classmethod
-    async def _fetch_user(cls, session: AsyncSession, **filters) -> Optional[User]:
+    async def _fetch_user(cls, session: AsyncSession, cached: bool = True, **filters) -> Optional[User]:
+        """
+        Load one user by a single column, through the user cache unless `cached` is False.
+
+        Users served from the cache are attached to `session` without a query and lack `SECRET_FIELDS`;
+        uncached reads refresh any instance the session already holds.
+        """
+        cache = get_user_cache()
+        (field, value), = filters.items()
+        if cached and cache is not None:
+            snapshot = cache.get(field, value)
+            if snapshot is not None:
+                return await cls._attach_cached(session, snapshot)
         query = select(User).filter_by(**filters)
+        if not cached:
+            query = query.execution_options(populate_existing=True)
         result = await cls._execute_query(session, query)
-        return result.scalars().first() if result else None
+        user = result.scalars().first()
+        if user is not None:
+            remember_user(session, user)
+        return user
+
+    @classmethod
+    async def _attach_cached(cls, session: AsyncSession, snapshot: Dict) -> User:
+        key = identity_key(User, snapshot["id"])
+        existing = session.identity_map.get(key)
+        if existing is not None:
+            # Already loaded (and maybe changed) in this transaction; it wins over the cached copy
+            if inspect(existing).expired_attributes:
+                # Expired instances would lazy-load on attribute access, which async sessions cannot do
+                await session.refresh(existing)
+            return existing
+        user = User(**snapshot)
+        make_transient_to_detached(user)
+        return await session.merge(user, load=False)
+
+    @classmethod
+    async def get_by_id(cls, session: AsyncSession, user_id: UUID, with_secrets: bool = False) -> Optional[User]:
+        return await cls._fetch_user(session, cached=not with_secrets, id=user_id)
 
     @classmethod
-    async def get_by_id(cls, session: AsyncSession, user_id: UUID) -> Optional[User]:
-        return await cls._fetch_user(session, id=user_id)
+    async def get_validators(cls, session: AsyncSession, user_id: UUID) -> Optional[Tuple[int, datetime]]:
+        """(version, updated_at) of a user, for answering conditional requests without loading the row."""
+        result = await session.execute(select(User.version, User.updated_at).where(User.id == user_id))
+        row = result.first()
+        return (row.version, row.updated_at) if row else None
 
     @classmethod
     async def get_by_nickname(cls, session: AsyncSession, nickname: str) -> Optional[User]:
         return await cls._fetch_user(session, nickname=nickname)
 
     @classmethod
-    async def get_by_email(cls, session: AsyncSession, email: str) -> Optional[User]:
-        return await cls._fetch_user(session, email=email)
+    async def get_by_email(cls, session: AsyncSession, email: str, with_secrets: bool = False) -> Optional[User]:
+        return await cls._fetch_user(session, cached=not with_secrets, email=email)
 
     @classmethod
     async def create(cls, session: AsyncSession, user_data: Dict[str, str], email_service: EmailService) -> Optional[User]:
+        """
+        Insert a new user, relying on the unique indexes instead of checking for an existing user first.
+
+        The row is inserted with a nickname generated in memory, using `ON CONFLICT DO NOTHING ... RETURNING`, so
+        a conflict neither raises nor aborts the request's transaction. Only then is the email looked up, to tell
+        a duplicate email (raised as `DuplicateEmailError`) from a taken nickname (retried with a fresh one, up
+        to `nickname_max_queries` inserts). Creating a user is one statement unless something collides.
+
+        Raises:
+            DuplicateEmailError: If a user with this email already exists.
+            NicknameExhaustedError: If no unique nickname could be allocated.
+        """
         try:
             validated_data = UserCreate(**user_data).model_dump()
-            existing_user = await cls.get_by_email(session, validated_data['email'])
-            if existing_user:
-                logger.error("User with given email already exists.")
-                return None
-            validated_data['hashed_password'] = hash_password(validated_data.pop('password'))
-            new_user = User(**validated_data)
-            new_user.verification_token = generate_verification_token()
-            new_nickname = generate_nickname()
-            while await cls.get_by_nickname(session, new_nickname):
-                new_nickname = generate_nickname()
-            new_user.nickname = new_nickname
-            session.add(new_user)
-            await session.commit()
-            await email_service.send_verification_email(new_user)
-            
-            return new_user
         except ValidationError as e:
             logger.error(f"Validation error during user creation: {e}")
             return None
+        validated_data['hashed_password'] = await hash_password_async(validated_data.pop('password'))
+        validated_data.update(id=uuid4(), verification_token=generate_verification_token())
+        generator = get_nickname_generator()
+        for _ in range(settings.nickname_max_queries):
+            validated_data['nickname'] = generator.generate()
+            result = await session.execute(
+                insert(User).values(**validated_data).on_conflict_do_nothing().returning(User)
+            )
+            new_user = result.scalar_one_or_none()
+            if new_user is not None:
+                NicknameService.record(1, 0, allocated=1)
+                break
+            if await cls._fetch_user(session, cached=False, email=validated_data['email']):
+                raise DuplicateEmailError(validated_data['email'])
+            # The email is free, so the unique index rejected the nickname
+            NicknameService.record(1, 1)
+        else:
+            raise NicknameService.exhausted_error(settings.nickname_max_queries)
+
+        if settings.email_outbox_enabled:
+            # Queued in the same transaction: the email exists if and only if the user does
+            EmailOutboxService.enqueue_verification_email(session, new_user)
+        else:
+            # Without the outbox the email goes out right away, so the user must be committed first
+            await session.commit()
+            await email_service.send_verification_email(new_user)
+        invalidate_user_count()
+        return new_user
 
     @classmethod
-    async def update(cls, session: AsyncSession, user_id: UUID, update_data: Dict[str, str]) -> Optional[User]:
+    async def update(cls, session: AsyncSession, user_id: UUID, update_data: Dict[str, str], expected_versions: Optional[List[int]] = None) -> Optional[User]:
+        """
+        Apply `update_data` with a single `UPDATE ... RETURNING` that also bumps `version`.
+
+        With `expected_versions` (from `If-Match`) the row is only written while its version is one of them,
+        and `VersionConflictError` is raised otherwise. Values equal to the stored ones are not written: the
+        statement only matches if at least one column would change, and when nothing would the current row
+        is returned unchanged. A new email or nickname is not checked first: the unique indexes reject one that
+        is taken, raised as `UniqueFieldConflictError`.
+        """
         try:
+            validated_data = UserUpdate(**update_data).dict(exclude_unset=True)
+        except ValidationError as e:
+            logger.error(f"Validation error during user update: {e}")
+            return None
+
+        # Explicitly check password complexity if password is present
+        if 'password' in update_data and update_data['password'] is not None:
             try:
-                validated_data = UserUpdate(**update_data).dict(exclude_unset=True)
-            except ValidationError as e:
-                logger.error(f"Validation error during user update: {e}")
+                UserUpdate.validate_password(update_data['password'])
+            except ValueError as e:
+                logger.error(f"Password validation failed: {e}")
                 return None
 
-            # Explicitly check password complexity if password is present
-            if 'password' in update_data and update_data['password'] is not None:
-                try:
-                    UserUpdate.validate_password(update_data['password'])
-                except ValueError as e:
-                    logger.error(f"Password validation failed: {e}")
-                    return None
-
-            # Enforce nickname uniqueness if updating nickname
-            if 'nickname' in validated_data:
-                new_nickname = validated_data['nickname']
-                existing_user = await cls.get_by_nickname(session, new_nickname)
-                if existing_user and str(existing_user.id) != str(user_id):
-                    logger.error(f"Nickname '{new_nickname}' already exists for another user.")
-                    return None
-
-            if 'password' in validated_data:
-                validated_data['hashed_password'] = hash_password(validated_data.pop('password'))
-            query = update(User).where(User.id == user_id).values(**validated_data).execution_options(synchronize_session="fetch")
-            await cls._execute_query(session, query)
-            updated_user = await cls.get_by_id(session, user_id)
+        if 'password' in validated_data:
+            validated_data['hashed_password'] = await hash_password_async(validated_data.pop('password'))
+        conditions = [User.id == user_id]
+        if expected_versions is not None:
+            conditions.append(User.version.in_(expected_versions))
+        if validated_data:
+            conditions.append(or_(*(getattr(User, key).is_distinct_from(value) for key, value in validated_data.items())))
+            statement = update(User).where(*conditions).values(**validated_data).returning(User)
+            # populate_existing refreshes the instance if this session has already loaded the user
+            query = select(User).from_statement(statement).execution_options(populate_existing=True)
+            try:
+                updated_user = (await session.execute(query)).scalar_one_or_none()
+            except IntegrityError:
+                raise UniqueFieldConflictError([field for field in ("email", "nickname") if field in validated_data])
             if updated_user:
-                session.refresh(updated_user)  # Explicitly refresh the updated user object
+                invalidate_user(session, user_id)
                 logger.info(f"User {user_id} updated successfully.")
                 return updated_user
-            else:
-                logger.error(f"User {user_id} not found after update attempt.")
-            return None
-        except Exception as e:  # Broad exception handling for debugging
-            logger.error(f"Error during user update: {e}")
+
+        # Nothing written: the user is missing, was changed since the client read it, or already matches
+        current_user = await cls._fetch_user(session, cached=False, id=user_id)
+        if current_user is None:
+            logger.error(f"User {user_id} not found after update attempt.")
             return None
+        if expected_versions is not None and current_user.version not in expected_versions:
+            raise VersionConflictError(user_id, current_user.version)
+        return current_user
 
     @classmethod
     async def delete(cls, session: AsyncSession, user_id: UUID) -> bool:
@@ -120,71 +231,193 @@ class UserService:
         if not user:
             logger.info(f"User with ID {user_id} not found.")
             return False
+        invalidate_user(session, user.id)
         await session.delete(user)
-        await session.commit()
+        await session.flush()
+        invalidate_user_count()
         return True
 
     @classmethod
     async def list_users(cls, session: AsyncSession, skip: int = 0, limit: int = 10) -> List[User]:
         query = select(User).offset(skip).limit(limit)
         result = await cls._execute_query(session, query)
-        return result.scalars().all() if result else []
+        return result.scalars().all()
+
+    @classmethod
+    async def list_users_with_total(cls, session: AsyncSession, skip: int = 0, limit: int = 10) -> Tuple[List[User], UserCount]:
+        """
+        List a page of users and take the total from the same query via `count(*) OVER ()`.
+
+        When the page is empty (skip past the end) there is no row to carry the total, so an exact count is run.
+        """
+        query = select(User, func.count().over().label("total")).offset(skip).limit(limit)
+        result = await cls._execute_query(session, query)
+        rows = result.all()
+        if not rows:
+            return [], await ExactCountStrategy().count(session)
+        return [row[0] for row in rows], UserCount(rows[0][1], True)
+
+    @classmethod
+    async def list_users_page(cls, session: AsyncSession, skip: int = 0, limit: int = 10) -> Tuple[List[User], UserCount]:
+        """List a skip/limit page plus the total, using the configured count strategy."""
+        if isinstance(get_user_count_strategy(), WindowCountStrategy):
+            return await cls.list_users_with_total(session, skip, limit)
+        user_count = await cls.count_for_listing(session)
+        return await cls.list_users(session, skip, limit), user_count
+
+    @classmethod
+    async def count_for_listing(cls, session: AsyncSession) -> UserCount:
+        """Count users with the configured strategy, which may trade exactness for speed."""
+        return await get_user_count_strategy().count(session)
+
+    @classmethod
+    async def list_users_keyset(cls, session: AsyncSession, limit: int = 10, cursor: Optional[str] = None) -> Tuple[List[User], Optional[str], Optional[str]]:
+        """
+        List users ordered by (created_at, id) starting from an opaque cursor.
+
+        Each page is a single index range scan, so deep pages cost the same as the first one.
+
+        :param session: The AsyncSession instance for database access.
+        :param limit: Maximum number of users to return.
+        :param cursor: Token from a previous page's `next_cursor`/`prev_cursor`; None or empty for the first page.
+        :return: The page of users plus the next and previous cursors (None when there is no such page).
+        :raises ValueError: If the cursor is malformed.
+        """
+        position = decode_cursor(cursor) if cursor else None
+        key = tuple_(User.created_at, User.id)
+        query = select(User)
+        if position is not None and position.direction == PREV:
+            query = query.where(key < tuple_(position.created_at, position.id)).order_by(User.created_at.desc(), User.id.desc())
+        else:
+            if position is not None:
+                query = query.where(key > tuple_(position.created_at, position.id))
+            query = query.order_by(User.created_at, User.id)
+        # Fetch one extra row to learn whether another page exists in the direction of travel
+        result = await cls._execute_query(session, query.limit(limit + 1))
+        users = list(result.scalars().all())
+        has_more = len(users) > limit
+        users = users[:limit]
+
+        if position is not None and position.direction == PREV:
+            users.reverse()
+            has_next, has_prev = True, has_more
+        else:
+            has_next, has_prev = has_more, position is not None
+        next_cursor = encode_cursor(users[-1].created_at, users[-1].id, NEXT) if users and has_next else None
+        prev_cursor = encode_cursor(users[0].created_at, users[0].id, PREV) if users and has_prev else None
+        return users, next_cursor, prev_cursor
 
     @classmethod
     async def register_user(cls, session: AsyncSession, user_data: Dict[str, str], get_email_service) -> Optional[User]:
         return await cls.create(session, user_data, get_email_service)
     
 
+    @classmethod
+    async def authenticate(cls, session: AsyncSession, email: str, password: str) -> Tuple[LoginOutcome, Optional[User]]:
+        """
+        Check credentials with one read of the user row and no write on a routine success.
+
+        Failures are counted with an atomic `UPDATE ... RETURNING` that also sets the lock once
+        `max_login_attempts` is reached, so concurrent attempts never lose an increment and a burst gets at most
+        that many wrong guesses recorded before the account locks; every attempt that starts afterwards is
+        refused. A success only writes the row when it has to reset earlier failures or upgrade the password
+        hash, guarded by `NOT is_locked`; `last_login_at` is handed to the write-behind recorder.
+        """
+        user = await cls.get_by_email(session, email, with_secrets=True)
+        if user is None:
+            return LoginOutcome.INVALID, None
+        if user.is_locked:
+            return LoginOutcome.LOCKED, None
+        if user.email_verified is False:
+            return LoginOutcome.INVALID, None
+
+        if not await verify_password_async(password, user.hashed_password):
+            result = await session.execute(
+                update(User)
+                .where(User.id == user.id, User.is_locked.is_(False))
+                .values(
+                    failed_login_attempts=User.failed_login_attempts + 1,
+                    is_locked=User.failed_login_attempts + 1 >= settings.max_login_attempts,
+                    # Not a profile change: the ETag clients hold stays valid
+                    version=User.version,
+                )
+                .returning(User.failed_login_attempts, User.is_locked)
+                .execution_options(synchronize_session=False)
+            )
+            row = result.first()
+            invalidate_user(session, user.id)
+            if row is not None:
+                set_committed_value(user, "failed_login_attempts", row.failed_login_attempts)
+                set_committed_value(user, "is_locked", row.is_locked)
+            # Committed here because the request fails afterwards and its unit of work is rolled back
+            await session.commit()
+            return LoginOutcome.INVALID, None
+
+        values = {}
+        if user.failed_login_attempts:
+            values["failed_login_attempts"] = 0
+        if password_needs_rehash(user.hashed_password):
+            # Transparently migrate to the current scheme/cost while we hold the plain password
+            values["hashed_password"] = await hash_password_async(password)
+        if values:
+            result = await session.execute(
+                update(User).where(User.id == user.id, User.is_locked.is_(False)).values(**values, version=User.version)
+                .returning(User.id).execution_options(synchronize_session=False)
+            )
+            if result.first() is None:
+                # Locked by concurrent failures while this password was being checked
+                return LoginOutcome.LOCKED, None
+            invalidate_user(session, user.id)
+            for key, value in values.items():
+                set_committed_value(user, key, value)
+
+        logged_in_at = datetime.now(timezone.utc)
+        recorder = get_last_login_recorder()
+        if recorder is not None:
+            recorder.record(user.id, logged_in_at)
+            set_committed_value(user, "last_login_at", logged_in_at)
+        else:
+            await session.execute(
+                update(User).where(User.id == user.id).values(last_login_at=logged_in_at, version=User.version)
+                .execution_options(synchronize_session=False)
+            )
+            invalidate_user(session, user.id)
+            set_committed_value(user, "last_login_at", logged_in_at)
+        return LoginOutcome.SUCCESS, user
+
     @classmethod
     async def login_user(cls, session: AsyncSession, email: str, password: str) -> Optional[User]:
-        user = await cls.get_by_email(session, email)
-        if user:
-            if user.email_verified is False:
-                return None
-            if user.is_locked:
-                return None
-            if verify_password(password, user.hashed_password):
-                user.failed_login_attempts = 0
-                user.last_login_at = datetime.now(timezone.utc)
-                session.add(user)
-                await session.commit()
-                return user
-            else:
-                user.failed_login_attempts += 1
-                if user.failed_login_attempts >= settings.max_login_attempts:
-                    user.is_locked = True
-                session.add(user)
-                await session.commit()
-        return None
+        outcome, user = await cls.authenticate(session, email, password)
+        return user if outcome is LoginOutcome.SUCCESS else None
 
     @classmethod
     async def is_account_locked(cls, session: AsyncSession, email: str) -> bool:
-        user = await cls.get_by_email(session, email)
+        user = await cls._fetch_user(session, cached=False, email=email)
         return user.is_locked if user else False
 
 
     @classmethod
     async def reset_password(cls, session: AsyncSession, user_id: UUID, new_password: str) -> bool:
-        hashed_password = hash_password(new_password)
+        hashed_password = await hash_password_async(new_password)
         user = await cls.get_by_id(session, user_id)
         if user:
+            invalidate_user(session, user.id)
             user.hashed_password = hashed_password
             user.failed_login_attempts = 0  # Resetting failed login attempts
             user.is_locked = False  # Unlocking the user account, if locked
             session.add(user)
-            await session.commit()
             return True
         return False
 
     @classmethod
     async def verify_email_with_token(cls, session: AsyncSession, user_id: UUID, token: str) -> bool:
-        user = await cls.get_by_id(session, user_id)
+        user = await cls.get_by_id(session, user_id, with_secrets=True)
         if user and user.verification_token == token:
+            invalidate_user(session, user.id)
             user.email_verified = True
             user.verification_token = None  # Clear the token once used
             user.role = UserRole.AUTHENTICATED
             session.add(user)
-            await session.commit()
             return True
         return False
 
@@ -201,13 +434,22 @@ class UserService:
         count = result.scalar()
         return count
     
+    @classmethod
+    async def lock_user_account(cls, session: AsyncSession, user_id: UUID) -> Optional[User]:
+        user = await cls._fetch_user(session, cached=False, id=user_id)
+        if user:
+            invalidate_user(session, user.id)
+            user.is_locked = True
+            session.add(user)
+        return user
+
     @classmethod
     async def unlock_user_account(cls, session: AsyncSession, user_id: UUID) -> bool:
-        user = await cls.get_by_id(session, user_id)
+        user = await cls._fetch_user(session, cached=False, id=user_id)
         if user and user.is_locked:
+            invalidate_user(session, user.id)
             user.is_locked = False
             user.failed_login_attempts = 0  # Optionally reset failed login attempts
             session.add(user)
-            await session.commit()
             return True
         return False
@@ -0,0 +1,178 @@
+from builtins import BaseException, Exception, ValueError, dict, float, int, isinstance, len, max, min, round, str
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+import time
+from typing import AsyncIterator, Callable, Deque, Dict, Optional
+from settings.config import Settings, settings
+
+AUTH = "auth"
+WRITE = "write"
+READ = "read"
+LANES = (AUTH, WRITE, READ)
+# Password-hashing endpoints get a lane of their own so a login storm cannot starve other traffic
+AUTH_PATHS = frozenset({"/login/", "/register/", "/token/refresh"})
+READ_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+
+class LoadSheddingError(Exception):
+    """Raised when a lane is at its concurrency limit and its wait queue is full or the wait timed out."""
+
+
+def request_lane(method: str, path: str) -> str:
+    if path in AUTH_PATHS:
+        return AUTH
+    return READ if method in READ_METHODS else WRITE
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    Caps the requests of one lane in flight at a limit that adapts to observed latency (AIMD).
+
+    The limiter tracks the lane's no-load latency as a slowly rising minimum. A request that takes more than
+    `latency_tolerance` times that (plus `latency_slack_seconds`, so fast endpoints are not judged on
+    jitter) means requests are queueing somewhere, and the limit is cut by `backoff`, at most once per such
+    request's duration. Requests finishing on time while the limit was fully used raise it by about one per
+    round trip. Requests over the limit wait in a FIFO queue of `queue_size` for at most
+    `queue_timeout_seconds`; beyond that they are rejected with `LoadSheddingError` straight away, so an
+    overloaded lane answers 503 quickly instead of timing out slowly.
+    """
+    # Share of the gap a sample above the baseline moves it up, so a permanently slower server is relearned
+    BASELINE_DRIFT = 0.01
+
+    def __init__(self, name: str, initial_limit: int, min_limit: int, max_limit: int, queue_size: int,
+                 queue_timeout_seconds: float, latency_tolerance: float = 2.0, latency_slack_seconds: float = 0.05,
+                 backoff: float = 0.9, clock: Callable[[], float] = time.monotonic):
+        if not 1 <= min_limit <= initial_limit <= max_limit:
+            raise ValueError(f"{name} lane needs 1 <= min_limit <= initial_limit <= max_limit")
+        self.name = name
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.queue_size = max(0, queue_size)
+        self.queue_timeout_seconds = queue_timeout_seconds
+        self.latency_tolerance = latency_tolerance
+        self.latency_slack_seconds = latency_slack_seconds
+        self.backoff = backoff
+        self.clock = clock
+        self.in_flight = 0
+        self.baseline: Optional[float] = None
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._last_decrease = float("-inf")
+        self.admitted = 0
+        self.queued = 0
+        self.rejected_queue_full = 0
+        self.rejected_timeout = 0
+        self.decreases = 0
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[None]:
+        """Hold a slot in this lane for the duration of the block; raises `LoadSheddingError` if none is free in time."""
+        await self._enter()
+        started = self.clock()
+        try:
+            yield
+        finally:
+            self._exit(self.clock() - started)
+
+    async def _enter(self):
+        if self.in_flight < int(self.limit) and not self._waiters:
+            self.in_flight += 1
+            self.admitted += 1
+            return
+        if len(self._waiters) >= self.queue_size:
+            self.rejected_queue_full += 1
+            raise LoadSheddingError(f"{self.name} lane is at its limit of {int(self.limit)} and its queue is full")
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self.queued += 1
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout_seconds)
+        except BaseException as e:
+            if waiter.done() and not waiter.cancelled():
+                # Granted a slot just as we gave up; hand it on
+                self._release()
+            else:
+                waiter.cancel()
+                # A release may already have popped it while wait_for was cancelling it
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+            if isinstance(e, asyncio.TimeoutError):
+                self.rejected_timeout += 1
+                raise LoadSheddingError(f"{self.name} lane had no free slot within {self.queue_timeout_seconds}s")
+            raise
+        self.admitted += 1
+
+    def _exit(self, latency: float):
+        saturated = self.in_flight >= int(self.limit)
+        self._adjust(latency, saturated)
+        self._release()
+
+    def _adjust(self, latency: float, saturated: bool):
+        if self.baseline is None or latency < self.baseline:
+            self.baseline = latency
+        else:
+            self.baseline += (latency - self.baseline) * self.BASELINE_DRIFT
+        now = self.clock()
+        if latency > self.baseline * self.latency_tolerance + self.latency_slack_seconds:
+            # One cut per round trip: the requests finishing late together all saw the same congestion
+            if now - self._last_decrease >= latency:
+                self.limit = max(float(self.min_limit), self.limit * self.backoff)
+                self._last_decrease = now
+                self.decreases += 1
+        elif saturated:
+            self.limit = min(float(self.max_limit), self.limit + 1 / self.limit)
+
+    def _release(self):
+        self.in_flight -= 1
+        while self._waiters and self.in_flight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                self.in_flight += 1
+
+    def stats(self) -> dict:
+        return {
+            "limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "waiting": len(self._waiters),
+            "baseline_latency_ms": round(self.baseline * 1000, 2) if self.baseline is not None else None,
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "rejected_queue_full": self.rejected_queue_full,
+            "rejected_timeout": self.rejected_timeout,
+            "limit_decreases": self.decreases,
+        }
+
+
+_lanes: Dict[str, AdaptiveConcurrencyLimiter] = {}
+_configured = False
+
+def configure_concurrency_limits(config: Settings = settings) -> Dict[str, AdaptiveConcurrencyLimiter]:
+    """Build one limiter per lane from `Settings.concurrency_lanes`; none when `concurrency_limit_enabled` is off."""
+    global _lanes, _configured
+    _lanes = {}
+    if config.concurrency_limit_enabled:
+        for lane in LANES:
+            options = config.concurrency_lanes[lane]
+            _lanes[lane] = AdaptiveConcurrencyLimiter(
+                lane,
+                initial_limit=int(options["initial_limit"]),
+                min_limit=int(options["min_limit"]),
+                max_limit=int(options["max_limit"]),
+                queue_size=int(options["queue_size"]),
+                queue_timeout_seconds=float(options["queue_timeout_seconds"]),
+                latency_tolerance=config.concurrency_latency_tolerance,
+            )
+    _configured = True
+    return _lanes
+
+def get_concurrency_limiter(lane: str) -> Optional[AdaptiveConcurrencyLimiter]:
+    if not _configured:
+        configure_concurrency_limits()
+    return _lanes.get(lane)
+
+def concurrency_stats() -> Optional[dict]:
+    if not _configured:
+        configure_concurrency_limits()
+    return {lane: limiter.stats() for lane, limiter in _lanes.items()} or None
@@ -0,0 +1,36 @@
+from builtins import Exception, ValueError, len, str
+import base64
+import json
+from datetime import datetime
+from typing import NamedTuple
+from uuid import UUID
+
+NEXT = "next"
+PREV = "prev"
+
+class Cursor(NamedTuple):
+    """Position in a `(created_at, id)` ordered listing plus the direction to read from it."""
+    created_at: datetime
+    id: UUID
+    direction: str = NEXT
+
+def encode_cursor(created_at: datetime, id: UUID, direction: str = NEXT) -> str:
+    """Encode a keyset position as an opaque, URL-safe token."""
+    payload = json.dumps([created_at.isoformat(), str(id), direction], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(token: str) -> Cursor:
+    """
+    Decode a token produced by `encode_cursor`.
+
+    Raises:
+        ValueError: If the token is malformed.
+    """
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        created_at, id, direction = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if direction not in (NEXT, PREV):
+            raise ValueError(f"Unknown cursor direction '{direction}'")
+        return Cursor(datetime.fromisoformat(created_at), UUID(id), direction)
+    except Exception as e:
+        raise ValueError("Invalid pagination cursor") from e
@@ -0,0 +1,52 @@
+from builtins import TypeError, ValueError, any, bool, int, str
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import List, Optional
+
+ANY = "*"
+
+
+def version_etag(version: int) -> str:
+    """Strong ETag for a row version."""
+    return f'"{version}"'
+
+
+def parse_if_match(header: Optional[str]) -> Optional[List[int]]:
+    """
+    Versions accepted by an `If-Match` header.
+
+    Returns None when the header is absent or `*` (any current version will do). Weak and foreign tags can
+    never match under the strong comparison `If-Match` requires, so they are dropped; a header made only of
+    those yields an empty list, which no version satisfies.
+    """
+    if header is None or header.strip() == ANY:
+        return None
+    versions = []
+    for tag in header.split(","):
+        tag = tag.strip()
+        if tag.startswith('"') and tag.endswith('"') and tag[1:-1].isdigit():
+            versions.append(int(tag[1:-1]))
+    return versions
+
+
+def none_match(header: str, etag: str) -> bool:
+    """True if `If-None-Match` names `etag` (weak comparison, as RFC 9110 requires for this header) or is `*`."""
+    if header.strip() == ANY:
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in header.split(","))
+
+
+def http_date(moment: datetime) -> str:
+    """Format a timestamp for `Last-Modified`."""
+    return format_datetime(moment.astimezone(timezone.utc), usegmt=True)
+
+
+def not_modified_since(header: str, moment: datetime) -> bool:
+    """True if `moment` is no later than an `If-Modified-Since` date; HTTP dates only carry whole seconds."""
+    try:
+        since = parsedate_to_datetime(header)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return moment.replace(microsecond=0) <= since
@@ -0,0 +1,17 @@
+from builtins import bytes, isinstance
+from typing import Any
+from fastapi.responses import JSONResponse
+
+
+class PreserializedJSONResponse(JSONResponse):
+    """
+    A JSON response whose body was already serialized to bytes, e.g. by a pydantic `TypeAdapter.dump_json`.
+
+    Returning a `Response` from a route skips FastAPI's response_model validation and `jsonable_encoder`
+    pass, so the body is sent as is; the route's `response_model` still documents it. Anything other than
+    bytes is encoded like a plain `JSONResponse`.
+    """
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return super().render(content)
@@ -1,5 +1,5 @@
 from builtins import dict, int, max, str
-from typing import List, Callable
+from typing import List, Callable, Optional
 from urllib.parse import urlencode
 from uuid import UUID
 
@@ -30,8 +30,12 @@ def create_user_links(user_id: UUID, request: Request) -> List[Link]:
         for rel, action, method, action_desc in actions
     ]
 
+def _base_url(request: Request) -> str:
+    # Drop the incoming query string; pagination links rebuild their own parameters
+    return str(request.url).split("?", 1)[0]
+
 def generate_pagination_links(request: Request, skip: int, limit: int, total_items: int) -> List[PaginationLink]:
-    base_url = str(request.url)
+    base_url = _base_url(request)
     total_pages = (total_items + limit - 1) // limit
     links = [
         create_pagination_link("self", base_url, {'skip': skip, 'limit': limit}),
@@ -46,3 +50,21 @@ def generate_pagination_links(request: Request, skip: int, limit: int, total_ite
         links.append(create_pagination_link("prev", base_url, {'skip': max(skip - limit, 0), 'limit': limit}))
 
     return links
+
+def create_cursor_pagination_link(rel: str, base_url: str, cursor: str, limit: int) -> PaginationLink:
+    return PaginationLink(rel=rel, href=f"{base_url}?{urlencode({'cursor': cursor, 'limit': limit})}")
+
+def generate_cursor_pagination_links(request: Request, limit: int, cursor: Optional[str], next_cursor: Optional[str], prev_cursor: Optional[str]) -> List[PaginationLink]:
+    """
+    Generate keyset pagination links; `next`/`prev` are only present when such a page exists.
+    """
+    base_url = _base_url(request)
+    links = [
+        create_cursor_pagination_link("self", base_url, cursor or "", limit),
+        create_cursor_pagination_link("first", base_url, "", limit),
+    ]
+    if next_cursor:
+        links.append(create_cursor_pagination_link("next", base_url, next_cursor, limit))
+    if prev_cursor:
+        links.append(create_cursor_pagination_link("prev", base_url, prev_cursor, limit))
+    return links
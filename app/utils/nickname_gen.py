@@ -1,10 +1,67 @@
-from builtins import str
+from builtins import ValueError, int, len, min, open, set, str
 import random
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+# Word lists ship next to the email templates, one word per line
+DEFAULT_WORDS_DIR = Path(__file__).resolve().parent.parent.parent / 'nickname_words'
+
+
+def _load_words(path: Path) -> Tuple[str, ...]:
+    with open(path, 'r', encoding='utf-8') as file:
+        words = {line.strip().lower() for line in file}
+    return tuple(sorted(word for word in words if word and not word.startswith('#')))
+
+
+class NicknameGenerator:
+    """
+    Draws `<adjective>_<animal>_<number>` nicknames from word lists in `words_dir`.
+
+    The space is len(adjectives) * len(animals) * (number_max + 1) names; with the bundled lists and the
+    default range that is over 600 million, so random candidates rarely collide even with millions of users.
+    """
+    def __init__(self, words_dir: Optional[Path] = None, number_max: int = 9999):
+        words_dir = Path(words_dir) if words_dir else DEFAULT_WORDS_DIR
+        self.adjectives = _load_words(words_dir / 'adjectives.txt')
+        self.animals = _load_words(words_dir / 'animals.txt')
+        if not self.adjectives or not self.animals:
+            raise ValueError(f"Nickname word lists in {words_dir} are empty")
+        self.number_max = number_max
+        self._random = random.SystemRandom()
+
+    @property
+    def size(self) -> int:
+        return len(self.adjectives) * len(self.animals) * (self.number_max + 1)
+
+    def generate(self) -> str:
+        """Generate a URL-safe nickname using adjectives and animal names."""
+        number = self._random.randint(0, self.number_max)
+        return f"{self._random.choice(self.adjectives)}_{self._random.choice(self.animals)}_{number}"
+
+    def candidates(self, count: int) -> List[str]:
+        """Return `count` distinct nicknames (fewer only if the whole space is smaller)."""
+        count = min(count, self.size)
+        names = set()
+        while len(names) < count:
+            names.add(self.generate())
+        return list(names)
+
+
+_generator: Optional[NicknameGenerator] = None
+
+def configure_nickname_generator(config) -> NicknameGenerator:
+    """Load the word lists named by the settings; called once at startup."""
+    global _generator
+    _generator = NicknameGenerator(config.nickname_words_dir, config.nickname_number_max)
+    return _generator
+
+def get_nickname_generator() -> NicknameGenerator:
+    global _generator
+    if _generator is None:
+        _generator = NicknameGenerator()
+    return _generator
 
 
 def generate_nickname() -> str:
     """Generate a URL-safe nickname using adjectives and animal names."""
-    adjectives = ["clever", "jolly", "brave", "sly", "gentle"]
-    animals = ["panda", "fox", "raccoon", "koala", "lion"]
-    number = random.randint(0, 999)
-    return f"{random.choice(adjectives)}_{random.choice(animals)}_{number}"
+    return get_nickname_generator().generate()
@@ -0,0 +1,176 @@
+# app/utils/password_hashers.py
+from builtins import KeyError, NotImplementedError, ValueError, bool, classmethod, dict, float, int, min, range, sorted, str, type
+import time
+from logging import getLogger
+from typing import Dict, Optional, Type
+import bcrypt
+from passlib.hash import argon2
+
+logger = getLogger(__name__)
+
+class PasswordHasher:
+    """
+    Base class for a password hashing scheme with a single tunable cost parameter.
+
+    Subclasses are registered with `register_hasher` and selected by `scheme` name from settings.
+    Instances are plain picklable objects so they can be shipped to a process pool.
+
+    Attributes:
+        scheme (str): Registry name of the scheme.
+        default_cost (int): Cost used when none is configured.
+        min_cost (int): Lowest cost calibration may choose.
+        max_cost (int): Highest cost calibration may try.
+    """
+    scheme: str = ""
+    default_cost: int = 0
+    min_cost: int = 0
+    max_cost: int = 0
+
+    def __init__(self, cost: Optional[int] = None):
+        self.cost = self.default_cost if cost is None else cost
+
+    def with_cost(self, cost: int) -> "PasswordHasher":
+        """Returns a copy of this hasher using a different cost."""
+        return type(self)(cost)
+
+    @classmethod
+    def identify(cls, hashed_password: str) -> bool:
+        """Returns True if the hash was produced by this scheme."""
+        raise NotImplementedError
+
+    def hash(self, password: str) -> str:
+        raise NotImplementedError
+
+    def verify(self, password: str, hashed_password: str) -> bool:
+        raise NotImplementedError
+
+    def needs_rehash(self, hashed_password: str) -> bool:
+        """
+        Returns True if the hash uses another scheme or a lower cost than this hasher.
+
+        Only weaker hashes are flagged: workers calibrate independently and may settle on different costs,
+        and a hash must not be rewritten back and forth as a user logs in through one worker, then another.
+        """
+        raise NotImplementedError
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__} cost={self.cost}>"
+
+
+class BcryptHasher(PasswordHasher):
+    """bcrypt, where the cost is the log2 number of rounds."""
+    scheme = "bcrypt"
+    default_cost = 12
+    # Never calibrate below the fixed cost used before calibration existed
+    min_cost = 12
+    max_cost = 16
+    prefixes = ("$2a$", "$2b$", "$2y$")
+
+    @classmethod
+    def identify(cls, hashed_password: str) -> bool:
+        return hashed_password.startswith(cls.prefixes)
+
+    def hash(self, password: str) -> str:
+        salt = bcrypt.gensalt(rounds=self.cost)
+        return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
+
+    def verify(self, password: str, hashed_password: str) -> bool:
+        return bcrypt.checkpw(password.encode('utf-8'), hashed_password.encode('utf-8'))
+
+    def needs_rehash(self, hashed_password: str) -> bool:
+        if not self.identify(hashed_password):
+            return True
+        # Hash layout is $2b$<rounds>$<salt+checksum>
+        return int(hashed_password[4:6]) < self.cost
+
+
+class Argon2idHasher(PasswordHasher):
+    """argon2id through passlib, where the cost is the number of passes (time_cost)."""
+    scheme = "argon2id"
+    default_cost = 3
+    min_cost = 2
+    max_cost = 12
+
+    def __init__(self, cost: Optional[int] = None, memory_cost: int = 19456, parallelism: int = 1):
+        super().__init__(cost)
+        self.memory_cost = memory_cost
+        self.parallelism = parallelism
+        self._handler = argon2.using(type="ID", time_cost=self.cost, memory_cost=memory_cost, parallelism=parallelism)
+
+    def __reduce__(self):
+        # passlib builds handler classes on the fly, so pickle the parameters instead.
+        return (type(self), (self.cost, self.memory_cost, self.parallelism))
+
+    def with_cost(self, cost: int) -> "Argon2idHasher":
+        return type(self)(cost, self.memory_cost, self.parallelism)
+
+    @classmethod
+    def identify(cls, hashed_password: str) -> bool:
+        return hashed_password.startswith("$argon2id$")
+
+    def hash(self, password: str) -> str:
+        return self._handler.hash(password)
+
+    def verify(self, password: str, hashed_password: str) -> bool:
+        return self._handler.verify(password, hashed_password)
+
+    def needs_rehash(self, hashed_password: str) -> bool:
+        if not self.identify(hashed_password):
+            return True
+        parsed = argon2.from_string(hashed_password)
+        return parsed.rounds < self.cost or parsed.memory_cost < self.memory_cost
+
+
+PASSWORD_HASHERS: Dict[str, Type[PasswordHasher]] = {}
+
+def register_hasher(hasher_cls: Type[PasswordHasher]) -> Type[PasswordHasher]:
+    """Adds a hasher class to the registry under its `scheme` name."""
+    PASSWORD_HASHERS[hasher_cls.scheme] = hasher_cls
+    return hasher_cls
+
+register_hasher(BcryptHasher)
+register_hasher(Argon2idHasher)
+
+def get_hasher_class(scheme: str) -> Type[PasswordHasher]:
+    try:
+        return PASSWORD_HASHERS[scheme]
+    except KeyError:
+        raise ValueError(f"Unknown password hasher '{scheme}', expected one of {sorted(PASSWORD_HASHERS)}") from None
+
+def identify_hasher(hashed_password: str) -> Optional[Type[PasswordHasher]]:
+    """Returns the registered hasher class that produced the hash, or None if it is not recognised."""
+    for hasher_cls in PASSWORD_HASHERS.values():
+        if hasher_cls.identify(hashed_password):
+            return hasher_cls
+    return None
+
+def calibrate_hasher(hasher: PasswordHasher, target_ms: float, samples: int = 2) -> PasswordHasher:
+    """
+    Picks the highest cost whose hash time stays within `target_ms` on this machine.
+
+    Costs are tried upwards from the hasher's `min_cost`; the minimum is kept even if it is
+    slower than the budget so calibration can never weaken hashes below the floor.
+
+    Args:
+        hasher (PasswordHasher): Hasher whose scheme and non-cost parameters are kept.
+        target_ms (float): Latency budget for a single hash in milliseconds.
+        samples (int): Hashes timed per cost; the fastest is used to filter out scheduler noise.
+
+    Returns:
+        PasswordHasher: A hasher configured with the chosen cost.
+    """
+    chosen = None
+    for cost in range(hasher.min_cost, hasher.max_cost + 1):
+        candidate = hasher.with_cost(cost)
+        elapsed_ms = min(_time_hash(candidate) for _ in range(samples))
+        logger.debug("Calibration: %s cost %d took %.1f ms", hasher.scheme, cost, elapsed_ms)
+        if chosen is not None and elapsed_ms > target_ms:
+            break
+        chosen = candidate
+    logger.info("Calibrated %s to cost %d for a %.0f ms budget", hasher.scheme, chosen.cost, target_ms)
+    return chosen
+
+def _time_hash(hasher: PasswordHasher) -> float:
+    started = time.perf_counter()
+    hasher.hash("calibration-probe")
+    return (time.perf_counter() - started) * 1000
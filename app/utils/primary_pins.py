@@ -0,0 +1,46 @@
+from builtins import bool, float, int, str
+import math
+import time
+from typing import Optional
+from app.utils.revocation_table import SharedRevocationTable, shared_memory_path
+from settings.config import Settings, settings
+
+# Read-your-writes pins: after a subject writes, its reads go to the primary until the pin expires. Pins live
+# in a shared-memory table keyed by the token subject, so they hold across every worker on the host and need
+# no cooperation from the client. Entries only ever hold an expiry, so the revocation table's layout fits.
+
+_table: Optional[SharedRevocationTable] = None
+_configured = False
+
+def default_pin_path() -> str:
+    return shared_memory_path("user_api_primary_pins")
+
+def configure_primary_pins(config: Settings = settings) -> Optional[SharedRevocationTable]:
+    """Map the host's pin table; `read_your_writes_pin_capacity = 0` leaves only the cookie fallback."""
+    global _table, _configured
+    if _table is not None:
+        _table.close()
+    _table = None
+    if config.read_your_writes_pin_capacity > 0:
+        _table = SharedRevocationTable(config.read_your_writes_pin_path or default_pin_path(), config.read_your_writes_pin_capacity)
+    _configured = True
+    return _table
+
+def get_primary_pins() -> Optional[SharedRevocationTable]:
+    if not _configured:
+        configure_primary_pins()
+    return _table
+
+def pin_subject(subject: str, seconds: float, now: Optional[float] = None):
+    """Send `subject`'s reads to the primary for the next `seconds` (rounded up to a whole second)."""
+    table = get_primary_pins()
+    if table is not None:
+        now = time.time() if now is None else now
+        table.revoke(f"pin:{subject}", 0, int(math.ceil(now + seconds)))
+
+def subject_pinned(subject: str, now: Optional[float] = None) -> bool:
+    table = get_primary_pins()
+    if table is None:
+        return False
+    entry = table.lookup(f"pin:{subject}")
+    return entry is not None and entry[1] > (time.time() if now is None else now)
@@ -0,0 +1,140 @@
+from builtins import ValueError, bool, dict, float, int, len, max, min, str
+import math
+import threading
+import time
+from typing import Callable, NamedTuple, Optional, Tuple
+from app.utils.ttl_cache import TTLCache
+
+TOKEN_BUCKET = "token_bucket"
+SLIDING_WINDOW = "sliding_window"
+ALGORITHMS = (TOKEN_BUCKET, SLIDING_WINDOW)
+# What a limit counts requests by: client address, the account named in the request, or the token's subject
+KEY_TYPES = ("ip", "email", "subject")
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+
+class RateLimit(NamedTuple):
+    """`limit` requests per `period_seconds` for each distinct `key`, enforced with `algorithm`."""
+    key: str
+    limit: int
+    period_seconds: float
+    algorithm: str
+
+    @classmethod
+    def parse(cls, rule: str) -> "RateLimit":
+        """
+        Parse `<key>:<limit>/<period>[:<algorithm>]`, e.g. `ip:20/minute` or `email:5/300:token_bucket`.
+
+        The period is a number of seconds or second/minute/hour/day; the algorithm defaults to sliding_window.
+        """
+        parts = rule.strip().split(":")
+        try:
+            key, amount = parts[0], parts[1]
+            limit, period = amount.split("/")
+            rate_limit = cls(key, int(limit), float(PERIODS.get(period, period)), parts[2] if len(parts) > 2 else SLIDING_WINDOW)
+        except (IndexError, ValueError):
+            raise ValueError(f"Invalid rate limit '{rule}', expected '<key>:<limit>/<period>[:<algorithm>]'")
+        if len(parts) > 3 or rate_limit.key not in KEY_TYPES or rate_limit.algorithm not in ALGORITHMS:
+            raise ValueError(f"Invalid rate limit '{rule}': key must be one of {KEY_TYPES}, algorithm one of {ALGORITHMS}")
+        if rate_limit.limit < 1 or rate_limit.period_seconds <= 0:
+            raise ValueError(f"Invalid rate limit '{rule}': limit and period must be positive")
+        return rate_limit
+
+    def __str__(self) -> str:
+        return f"{self.key}:{self.limit}/{self.period_seconds:g}:{self.algorithm}"
+
+
+class RateLimitDecision(NamedTuple):
+    allowed: bool
+    retry_after: float  # seconds until a request would be allowed again; 0 when allowed
+
+
+def retry_after_header(seconds: float) -> str:
+    return str(max(1, int(math.ceil(seconds))))
+
+
+# Token bucket: holds up to `limit` tokens, refilled continuously at limit / period; a request takes one.
+TokenBucketState = Tuple[float, float]  # tokens, updated_at
+
+def token_bucket(state: Optional[TokenBucketState], rate_limit: RateLimit, now: float) -> Tuple[TokenBucketState, RateLimitDecision]:
+    rate = rate_limit.limit / rate_limit.period_seconds
+    if state is None:
+        tokens = float(rate_limit.limit)
+    else:
+        tokens = min(float(rate_limit.limit), state[0] + max(0.0, now - state[1]) * rate)
+    if tokens >= 1:
+        return (tokens - 1, now), RateLimitDecision(True, 0.0)
+    return (tokens, now), RateLimitDecision(False, (1 - tokens) / rate)
+
+def token_bucket_expiry(state: TokenBucketState, rate_limit: RateLimit) -> float:
+    """When the bucket is full again, i.e. indistinguishable from a fresh one."""
+    return state[1] + (rate_limit.limit - state[0]) * rate_limit.period_seconds / rate_limit.limit
+
+
+# Sliding window counter: the previous fixed window's count, weighted by how much of it still overlaps the
+# sliding window, plus the current window's count. Rejected requests are not counted.
+SlidingWindowState = Tuple[float, int, int]  # window_start, count, previous_count
+
+def sliding_window(state: Optional[SlidingWindowState], rate_limit: RateLimit, now: float) -> Tuple[SlidingWindowState, RateLimitDecision]:
+    period = rate_limit.period_seconds
+    window_start = math.floor(now / period) * period
+    count, previous_count = 0, 0
+    if state is not None:
+        if state[0] == window_start:
+            count, previous_count = state[1], state[2]
+        elif state[0] == window_start - period:
+            previous_count = state[1]
+    estimate = previous_count * (1 - (now - window_start) / period) + count
+    if estimate + 1 <= rate_limit.limit:
+        return (window_start, count + 1, previous_count), RateLimitDecision(True, 0.0)
+    retry_after = sliding_window_retry_after(rate_limit, window_start, count, previous_count, now)
+    return (window_start, count, previous_count), RateLimitDecision(False, retry_after)
+
+def sliding_window_retry_after(rate_limit: RateLimit, window_start: float, count: int, previous_count: int, now: float) -> float:
+    """Seconds until the weighted count leaves room for one more request."""
+    period, room = rate_limit.period_seconds, rate_limit.limit - 1
+    if count <= room:
+        # The previous window's share decays enough before this window ends
+        allowed_at = window_start + period * (1 - (room - count) / previous_count) if previous_count else now
+    else:
+        # Only once this window has become the previous one and decayed
+        allowed_at = window_start + period + period * (1 - room / count)
+    return max(0.0, allowed_at - now)
+
+def sliding_window_expiry(state: SlidingWindowState, rate_limit: RateLimit) -> float:
+    """When the state's windows no longer overlap the sliding window."""
+    return state[0] + 2 * rate_limit.period_seconds
+
+
+class MemoryRateLimitBackend:
+    """
+    Keeps rate limit state in this worker's memory.
+
+    Limits are per worker process, so the effective limit is multiplied by the number of workers. State is
+    held in a bounded LRU; buckets are dropped once they are equivalent to fresh ones.
+    """
+    name = "memory"
+
+    def __init__(self, maxsize: int, clock: Callable[[], float] = time.time):
+        self.clock = clock
+        self._buckets = TTLCache(maxsize, ttl_seconds=0, clock=clock)
+        self._lock = threading.Lock()
+
+    async def hit(self, bucket: str, rate_limit: RateLimit) -> RateLimitDecision:
+        now = self.clock()
+        with self._lock:
+            state = self._buckets.get(bucket)
+            if rate_limit.algorithm == TOKEN_BUCKET:
+                state, decision = token_bucket(state, rate_limit, now)
+                expires_at = token_bucket_expiry(state, rate_limit)
+            else:
+                state, decision = sliding_window(state, rate_limit, now)
+                expires_at = sliding_window_expiry(state, rate_limit)
+            self._buckets.set(bucket, state, expires_at=expires_at)
+        return decision
+
+    def clear(self):
+        self._buckets.clear()
+
+    def stats(self) -> dict:
+        return {"buckets": len(self._buckets)}
@@ -0,0 +1,231 @@
+from builtins import BaseException, bool, bytearray, dict, int, len, max, open, range, str
+from contextlib import contextmanager
+import fcntl
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from typing import Iterator, List, Optional, Tuple
+
+# magic, capacity (slots, a power of two), used slots, retired flag
+_HEADER = struct.Struct("<8sQQQ")
+# key fingerprint, issued_before, expires_at (Unix seconds)
+_SLOT = struct.Struct("<QQQ")
+_MAGIC = b"REVOKE01"
+_USED_OFFSET = 16
+_RETIRED_OFFSET = 24
+_EMPTY = 0
+# Slots are rebuilt into a fresh table once this share of them is used
+MAX_LOAD = 0.5
+# `issued_before` for entries that revoke every token with their key
+ALL_TOKENS = 2 ** 63 - 1
+
+def shared_memory_path(name: str) -> str:
+    """A file in shared memory where the host has it, so tables mapped from it never touch disk."""
+    directory = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return os.path.join(directory, name)
+
+def fingerprint(key: str) -> int:
+    value = int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "little")
+    return value or 1
+
+def _power_of_two(n: int) -> int:
+    capacity = 8
+    while capacity < n:
+        capacity *= 2
+    return capacity
+
+
+class SharedRevocationTable:
+    """
+    Open-addressing hash table of revoked token keys in a memory-mapped file, shared by every process on a host.
+
+    Each slot holds a 64-bit fingerprint of a key (`jti:<id>`, `sub:<email>`), the newest `iat` it revokes
+    and when the entry stops mattering. Lookups read the mapping directly without locks or syscalls; writers
+    serialise on an `flock` and publish a slot by writing its fingerprint last. Entries are never deleted in
+    place: when the used slots pass `MAX_LOAD` a writer copies the unexpired entries into a new file, renames
+    it over the old one and marks the old one retired, and every process switches over on its next lookup.
+    """
+    def __init__(self, path: str, capacity: int):
+        self.path = path
+        self.min_capacity = _power_of_two(capacity)
+        self._thread_lock = threading.Lock()
+        self.lookups = 0
+        self.revoked_hits = 0
+        self.rebuilds = 0
+        self._fd, self._mm = self._open()
+
+    def _open(self) -> Tuple[int, mmap.mmap]:
+        while True:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                size = os.fstat(fd).st_size
+                header = os.pread(fd, _HEADER.size, 0)
+                valid = len(header) == _HEADER.size and header[:8] == _MAGIC
+                if valid:
+                    _, capacity, _, retired = _HEADER.unpack(header)
+                    valid = size == _HEADER.size + capacity * _SLOT.size
+                if not valid:
+                    capacity, retired = self.min_capacity, 0
+                    self._initialise(fd, capacity)
+                if retired:
+                    # Replaced between our open and lock; the path now names its successor
+                    os.close(fd)
+                    continue
+                mm = mmap.mmap(fd, _HEADER.size + capacity * _SLOT.size)
+                fcntl.flock(fd, fcntl.LOCK_UN)
+                return fd, mm
+            except BaseException:
+                os.close(fd)
+                raise
+
+    @staticmethod
+    def _initialise(fd: int, capacity: int):
+        os.ftruncate(fd, 0)
+        os.ftruncate(fd, _HEADER.size + capacity * _SLOT.size)
+        os.pwrite(fd, _HEADER.pack(_MAGIC, capacity, 0, 0), 0)
+
+    def _current(self) -> mmap.mmap:
+        mm = self._mm
+        if struct.unpack_from("<Q", mm, _RETIRED_OFFSET)[0]:
+            with self._thread_lock:
+                if self._mm is mm:
+                    self._reopen()
+            mm = self._mm
+        return mm
+
+    def _reopen(self):
+        # The old mapping is left to the garbage collector: other threads may still be reading it
+        old_fd = self._fd
+        self._fd, self._mm = self._open()
+        os.close(old_fd)
+
+    @staticmethod
+    def _probe(mm: mmap.mmap, key_fp: int) -> Iterator[Tuple[int, int]]:
+        """Yield (offset, fingerprint) of the slots on `key_fp`'s probe path, up to its first empty slot."""
+        capacity = _HEADER.unpack_from(mm, 0)[1]
+        mask = capacity - 1
+        index = key_fp & mask
+        for _ in range(capacity):
+            offset = _HEADER.size + index * _SLOT.size
+            slot_fp = struct.unpack_from("<Q", mm, offset)[0]
+            yield offset, slot_fp
+            if slot_fp == _EMPTY:
+                return
+            index = (index + 1) & mask
+
+    def lookup(self, key: str) -> Optional[Tuple[int, int]]:
+        """(issued_before, expires_at) stored for `key`, or None."""
+        mm = self._current()
+        key_fp = fingerprint(key)
+        for offset, slot_fp in self._probe(mm, key_fp):
+            if slot_fp == key_fp:
+                _, issued_before, expires_at = _SLOT.unpack_from(mm, offset)
+                return issued_before, expires_at
+        return None
+
+    def is_revoked(self, key: str, issued_at: int, now: Optional[float] = None) -> bool:
+        """True if a token with `key` issued at `issued_at` has been revoked and the revocation still applies."""
+        self.lookups += 1
+        entry = self.lookup(key)
+        if entry is None:
+            return False
+        issued_before, expires_at = entry
+        revoked = expires_at > (time.time() if now is None else now) and issued_at <= issued_before
+        if revoked:
+            self.revoked_hits += 1
+        return revoked
+
+    def revoke(self, key: str, issued_before: int, expires_at: int):
+        """Revoke tokens with `key` issued at or before `issued_before` until `expires_at`; entries only widen."""
+        with self._write_lock() as mm:
+            key_fp = fingerprint(key)
+            for offset, slot_fp in self._probe(mm, key_fp):
+                if slot_fp == key_fp:
+                    _, old_issued_before, old_expires_at = _SLOT.unpack_from(mm, offset)
+                    struct.pack_into("<QQ", mm, offset + 8, max(issued_before, old_issued_before), max(expires_at, old_expires_at))
+                    return
+                if slot_fp == _EMPTY:
+                    used = struct.unpack_from("<Q", mm, _USED_OFFSET)[0]
+                    if used + 1 > _HEADER.unpack_from(mm, 0)[1] * MAX_LOAD:
+                        break
+                    # Values first: a reader that sees the fingerprint always sees them too
+                    struct.pack_into("<QQ", mm, offset + 8, issued_before, expires_at)
+                    struct.pack_into("<Q", mm, offset, key_fp)
+                    struct.pack_into("<Q", mm, _USED_OFFSET, used + 1)
+                    return
+            self._rebuild(mm, [(key_fp, issued_before, expires_at)])
+        self._reopen_if_retired()
+
+    def _entries(self, mm: mmap.mmap) -> List[Tuple[int, int, int]]:
+        capacity = _HEADER.unpack_from(mm, 0)[1]
+        return [
+            entry for entry in _SLOT.iter_unpack(mm[_HEADER.size:_HEADER.size + capacity * _SLOT.size])
+            if entry[0] != _EMPTY
+        ]
+
+    def _rebuild(self, mm: mmap.mmap, extra: List[Tuple[int, int, int]]):
+        """Write the unexpired entries plus `extra` to a new file and swap it in; called under the write lock."""
+        now = int(time.time())
+        live = {}
+        for key_fp, issued_before, expires_at in self._entries(mm) + extra:
+            if expires_at > now:
+                old = live.get(key_fp, (0, 0))
+                live[key_fp] = (max(issued_before, old[0]), max(expires_at, old[1]))
+        capacity = self.min_capacity
+        while len(live) + 1 > capacity * MAX_LOAD:
+            capacity *= 2
+        buffer = bytearray(_HEADER.size + capacity * _SLOT.size)
+        _HEADER.pack_into(buffer, 0, _MAGIC, capacity, len(live), 0)
+        mask = capacity - 1
+        for key_fp, (issued_before, expires_at) in live.items():
+            index = key_fp & mask
+            while struct.unpack_from("<Q", buffer, _HEADER.size + index * _SLOT.size)[0] != _EMPTY:
+                index = (index + 1) & mask
+            _SLOT.pack_into(buffer, _HEADER.size + index * _SLOT.size, key_fp, issued_before, expires_at)
+        tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as tmp:
+            tmp.write(buffer)
+        os.chmod(tmp_path, 0o600)
+        os.replace(tmp_path, self.path)
+        struct.pack_into("<Q", mm, _RETIRED_OFFSET, 1)
+        self.rebuilds += 1
+
+    @contextmanager
+    def _write_lock(self) -> Iterator[mmap.mmap]:
+        with self._thread_lock:
+            while True:
+                fd, mm = self._fd, self._mm
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                if not struct.unpack_from("<Q", mm, _RETIRED_OFFSET)[0]:
+                    break
+                fcntl.flock(fd, fcntl.LOCK_UN)
+                self._reopen()
+            try:
+                yield mm
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+
+    def _reopen_if_retired(self):
+        with self._thread_lock:
+            if struct.unpack_from("<Q", self._mm, _RETIRED_OFFSET)[0]:
+                self._reopen()
+
+    def stats(self) -> dict:
+        capacity, used = _HEADER.unpack_from(self._mm, 0)[1:3]
+        return {
+            "capacity": capacity,
+            "used_slots": used,
+            "lookups": self.lookups,
+            "revoked_hits": self.revoked_hits,
+            "rebuilds": self.rebuilds,
+        }
+
+    def close(self):
+        with self._thread_lock:
+            self._mm.close()
+            os.close(self._fd)
@@ -1,19 +1,28 @@
 # app/security.py
-from builtins import Exception, ValueError, bool, int, str
+from builtins import BaseException, Exception, ValueError, bool, int, isinstance, str
+import asyncio
 import secrets
-import bcrypt
+from typing import List, Optional, Union
 from logging import getLogger
+from app.utils.password_hashers import (
+    Argon2idHasher, BcryptHasher, PasswordHasher, calibrate_hasher, get_hasher_class, identify_hasher
+)
+from app.utils.worker_pool import BoundedWorkerPool
+from settings.config import Settings, settings
 
 # Set up logging
 logger = getLogger(__name__)
 
-def hash_password(password: str, rounds: int = 12) -> str:
+_hashing_pool: Optional[BoundedWorkerPool] = None
+_password_hasher: Optional[PasswordHasher] = None
+
+def hash_password(password: str, rounds: Optional[int] = None) -> str:
     """
-    Hashes a password using bcrypt with a specified cost factor.
+    Hashes a password with the active hasher, or with bcrypt at a specific cost factor.
     
     Args:
         password (str): The plain text password to hash.
-        rounds (int): The cost factor that determines the computational cost of hashing.
+        rounds (Optional[int]): bcrypt cost factor; when omitted the configured hasher and cost are used.
 
     Returns:
         str: The hashed password.
@@ -21,10 +30,12 @@ def hash_password(password: str, rounds: int = 12) -> str:
     Raises:
         ValueError: If hashing the password fails.
     """
+    hasher = get_password_hasher() if rounds is None else BcryptHasher(rounds)
+    return _hash_with(hasher, password)
+
+def _hash_with(hasher: PasswordHasher, password: str) -> str:
     try:
-        salt = bcrypt.gensalt(rounds=rounds)
-        hashed_password = bcrypt.hashpw(password.encode('utf-8'), salt)
-        return hashed_password.decode('utf-8')
+        return hasher.hash(password)
     except Exception as e:
         logger.error("Failed to hash password: %s", e)
         raise ValueError("Failed to hash password") from e
@@ -32,10 +43,12 @@ def hash_password(password: str, rounds: int = 12) -> str:
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """
     Verifies a plain text password against a hashed password.
+
+    The scheme is detected from the hash, so hashes from a previously configured hasher keep working.
     
     Args:
         plain_password (str): The plain text password to verify.
-        hashed_password (str): The bcrypt hashed password.
+        hashed_password (str): The hashed password produced by any registered hasher.
 
     Returns:
         bool: True if the password is correct, False otherwise.
@@ -44,10 +57,125 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
         ValueError: If the hashed password format is incorrect or the function fails to verify.
     """
     try:
-        return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
+        hasher_cls = identify_hasher(hashed_password)
+        if hasher_cls is None:
+            raise ValueError("Unrecognised password hash format")
+        hasher = get_password_hasher()
+        if not isinstance(hasher, hasher_cls):
+            hasher = hasher_cls()
+        return hasher.verify(plain_password, hashed_password)
     except Exception as e:
         logger.error("Error verifying password: %s", e)
         raise ValueError("Authentication process encountered an unexpected error") from e
 
+def password_needs_rehash(hashed_password: str) -> bool:
+    """Returns True if the hash was made with a different scheme or a lower cost than the active hasher."""
+    return get_password_hasher().needs_rehash(hashed_password)
+
+def configure_password_hasher(config: Settings = settings) -> PasswordHasher:
+    """
+    Selects the hasher for new hashes from settings, calibrating its cost unless one is fixed.
+
+    Args:
+        config (Settings): Settings providing the scheme, cost and calibration budget.
+
+    Returns:
+        PasswordHasher: The active hasher.
+    """
+    global _password_hasher
+    hasher_cls = get_hasher_class(config.password_hasher)
+    if hasher_cls is Argon2idHasher:
+        hasher = Argon2idHasher(config.password_hash_cost, config.argon2_memory_cost, config.argon2_parallelism)
+    else:
+        hasher = hasher_cls(config.password_hash_cost)
+    if config.password_hash_cost is None and config.password_hash_calibrate:
+        hasher = calibrate_hasher(hasher, config.password_hash_target_ms)
+    _password_hasher = hasher
+    return hasher
+
+def get_password_hasher() -> PasswordHasher:
+    """Returns the hasher used for new hashes; bcrypt at its default cost until configured."""
+    global _password_hasher
+    if _password_hasher is None:
+        _password_hasher = BcryptHasher()
+    return _password_hasher
+
 def generate_verification_token():
-    return secrets.token_urlsafe(16)  # Generates a secure 16-byte URL-safe token
\ No newline at end of file
+    return secrets.token_urlsafe(16)  # Generates a secure 16-byte URL-safe token
+
+def configure_hashing_pool(config: Settings = settings) -> BoundedWorkerPool:
+    """
+    (Re)creates the worker pool used by the async hashing helpers from application settings.
+
+    Args:
+        config (Settings): Settings providing the executor type, worker count and queue size.
+
+    Returns:
+        BoundedWorkerPool: The newly configured pool.
+    """
+    global _hashing_pool
+    shutdown_hashing_pool()
+    _hashing_pool = BoundedWorkerPool(
+        name="password-hashing",
+        max_workers=config.password_hash_workers,
+        queue_size=config.password_hash_queue_size,
+        executor_type=config.password_hash_executor,
+    )
+    return _hashing_pool
+
+def get_hashing_pool() -> BoundedWorkerPool:
+    """Returns the password hashing pool, creating it from the default settings on first use."""
+    if _hashing_pool is None:
+        return configure_hashing_pool()
+    return _hashing_pool
+
+def shutdown_hashing_pool():
+    """Stops the password hashing pool, waiting for in-flight jobs to finish."""
+    global _hashing_pool
+    if _hashing_pool is not None:
+        _hashing_pool.shutdown()
+        _hashing_pool = None
+
+async def hash_password_async(password: str, rounds: Optional[int] = None) -> str:
+    """
+    Hashes a password on the hashing pool so the event loop is not blocked by the hasher.
+
+    Raises:
+        WorkerPoolSaturatedError: If the hashing pool and its wait queue are full.
+        ValueError: If hashing the password fails.
+    """
+    # Ship the hasher itself so process workers use the calibrated cost, not their own defaults.
+    hasher = get_password_hasher() if rounds is None else BcryptHasher(rounds)
+    return await get_hashing_pool().run(_hash_with, hasher, password)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """
+    Verifies a password on the hashing pool so the event loop is not blocked by the hasher.
+
+    Raises:
+        WorkerPoolSaturatedError: If the hashing pool and its wait queue are full.
+        ValueError: If the hashed password format is incorrect or the function fails to verify.
+    """
+    return await get_hashing_pool().run(verify_password, plain_password, hashed_password)
+
+async def hash_passwords_async(passwords: List[str]) -> List[Union[str, Exception]]:
+    """
+    Hashes many passwords in parallel for bulk jobs.
+
+    At most one job per worker is submitted at a time, so a bulk job keeps every core busy without
+    filling the pool's wait queue and starving interactive logins into 503s. A password that fails to
+    hash yields its exception in place of the hash, so one bad row does not fail the whole job.
+    """
+    pool = get_hashing_pool()
+    hasher = get_password_hasher()
+    semaphore = asyncio.Semaphore(pool.max_workers)
+
+    async def hash_one(password: str) -> str:
+        async with semaphore:
+            return await pool.run(_hash_with, hasher, password)
+
+    results = await asyncio.gather(*(hash_one(password) for password in passwords), return_exceptions=True)
+    for result in results:
+        if isinstance(result, BaseException) and not isinstance(result, Exception):
+            raise result
+    return results
@@ -1,31 +1,145 @@
 # smtp_client.py
-from builtins import Exception, int, str
-import smtplib
+from builtins import BaseException, ConnectionError, Exception, OSError, bool, float, int, len, list, range, str
+import asyncio
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
+from typing import List, Optional
+import aiosmtplib
 from settings.config import settings
 import logging
 
+logger = logging.getLogger(__name__)
+
+class _PooledConnection:
+    def __init__(self, smtp: aiosmtplib.SMTP):
+        self.smtp = smtp
+        self.sent = 0
+
 class SMTPClient:
-    def __init__(self, server: str, port: int, username: str, password: str):
+    """
+    asyncio SMTP client that keeps a small pool of authenticated connections open.
+
+    The TCP + STARTTLS + AUTH handshake is paid once per pooled connection instead of once per email,
+    and each connection carries up to `max_messages_per_connection` messages before being recycled.
+    A connection that turns out to be stale is dropped and the message retried once on a fresh one.
+    """
+    def __init__(self, server: str, port: int, username: str, password: str, pool_size: int = None,
+                 timeout: float = None, start_tls: bool = None, max_messages_per_connection: int = None):
         self.server = server
         self.port = port
         self.username = username
         self.password = password
+        self.pool_size = pool_size or settings.smtp_pool_size
+        self.timeout = timeout or settings.smtp_timeout_seconds
+        self.start_tls = settings.smtp_use_starttls if start_tls is None else start_tls
+        self.max_messages_per_connection = max_messages_per_connection or settings.smtp_max_messages_per_connection
+        self._idle: List[_PooledConnection] = []
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _build_message(self, subject: str, html_content: str, recipient: str) -> MIMEMultipart:
+        message = MIMEMultipart('alternative')
+        message['Subject'] = subject
+        message['From'] = self.username
+        message['To'] = recipient
+        message.attach(MIMEText(html_content, 'html'))
+        return message
+
+    def _bind_loop(self):
+        # asyncio primitives and sockets belong to one event loop; start a fresh pool if the loop changed
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._idle = []
+            self._slots = asyncio.Semaphore(self.pool_size)
+
+    async def _connect(self) -> _PooledConnection:
+        smtp = aiosmtplib.SMTP(hostname=self.server, port=self.port, timeout=self.timeout, start_tls=self.start_tls)
+        await smtp.connect()
+        connection = _PooledConnection(smtp)
+        if self.username and self.password:
+            try:
+                await smtp.login(self.username, self.password)
+            except BaseException:
+                # Rejected credentials must not leave the socket open
+                await self._discard(connection, quit=True)
+                raise
+        return connection
+
+    async def _acquire(self) -> _PooledConnection:
+        while self._idle:
+            connection = self._idle.pop()
+            if connection.smtp.is_connected:
+                return connection
+        return await self._connect()
+
+    async def _release(self, connection: _PooledConnection):
+        if connection.sent >= self.max_messages_per_connection:
+            await self._discard(connection, quit=True)
+        else:
+            self._idle.append(connection)
 
-    def send_email(self, subject: str, html_content: str, recipient: str):
+    async def _discard(self, connection: _PooledConnection, quit: bool = False):
         try:
-            message = MIMEMultipart('alternative')
-            message['Subject'] = subject
-            message['From'] = self.username
-            message['To'] = recipient
-            message.attach(MIMEText(html_content, 'html'))
-
-            with smtplib.SMTP(self.server, self.port) as server:
-                server.starttls()  # Use TLS
-                server.login(self.username, self.password)
-                server.sendmail(self.username, recipient, message.as_string())
+            if quit and connection.smtp.is_connected:
+                await asyncio.wait_for(connection.smtp.quit(), self.timeout)
+        except Exception:
+            pass
+        finally:
+            connection.smtp.close()
+
+    async def send_message(self, message: MIMEMultipart):
+        """
+        Sends a prepared message over a pooled connection, waiting for a free slot if the pool is busy.
+
+        Raises:
+            aiosmtplib.SMTPException, OSError, asyncio.TimeoutError: If delivery fails.
+        """
+        self._bind_loop()
+        async with self._slots:
+            for attempt in range(2):
+                connection = await self._acquire()
+                reused = connection.sent > 0
+                try:
+                    await asyncio.wait_for(connection.smtp.send_message(message), self.timeout)
+                except (aiosmtplib.SMTPServerDisconnected, ConnectionError) as e:
+                    await self._discard(connection)
+                    if reused and attempt == 0:
+                        logger.info(f"Pooled SMTP connection went stale, reconnecting: {e}")
+                        continue
+                    raise
+                except (aiosmtplib.SMTPException, OSError, asyncio.TimeoutError):
+                    await self._discard(connection)
+                    raise
+                connection.sent += 1
+                await self._release(connection)
+                return
+
+    async def send_email(self, subject: str, html_content: str, recipient: str):
+        try:
+            await self.send_message(self._build_message(subject, html_content, recipient))
             logging.info(f"Email sent to {recipient}")
         except Exception as e:
             logging.error(f"Failed to send email: {str(e)}")
             raise
+
+    async def close(self):
+        """Quits every idle connection; call on application shutdown."""
+        idle, self._idle = self._idle, []
+        for connection in idle:
+            await self._discard(connection, quit=True)
+
+
+_smtp_client: Optional[SMTPClient] = None
+
+def get_smtp_client() -> SMTPClient:
+    """Returns the process-wide SMTP client so every EmailService shares one connection pool."""
+    global _smtp_client
+    if _smtp_client is None:
+        _smtp_client = SMTPClient(
+            server=settings.smtp_server,
+            port=settings.smtp_port,
+            username=settings.smtp_username,
+            password=settings.smtp_password,
+        )
+    return _smtp_client
@@ -0,0 +1,118 @@
+# smtp_sink.py
+from builtins import ConnectionError, bytes, int, list, str
+import asyncio
+import base64
+from dataclasses import dataclass, field
+from typing import List, Optional, Set
+import logging
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class SinkMessage:
+    mail_from: str
+    recipients: List[str]
+    data: bytes
+
+@dataclass
+class SMTPSink:
+    """
+    Minimal in-process SMTP server that accepts everything and keeps messages in memory.
+
+    Speaks just enough ESMTP (EHLO, AUTH PLAIN/LOGIN, MAIL, RCPT, DATA, RSET, NOOP, QUIT) for the
+    application's SMTP client, so tests and benchmarks can exercise real sockets without a mail provider.
+    STARTTLS is not offered; point clients at it with STARTTLS disabled.
+    """
+    host: str = "127.0.0.1"
+    port: int = 0
+    messages: List[SinkMessage] = field(default_factory=list)
+    connections: int = 0
+    logins: int = 0
+    _server: Optional[asyncio.AbstractServer] = None
+    _writers: Set[asyncio.StreamWriter] = field(default_factory=set)
+
+    async def start(self) -> "SMTPSink":
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            # Drop open sessions too, like a restarting mail server would
+            for writer in list(self._writers):
+                writer.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def __aenter__(self) -> "SMTPSink":
+        return await self.start()
+
+    async def __aexit__(self, *exc_info):
+        await self.stop()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        self._writers.add(writer)
+        mail_from, recipients = "", []
+
+        async def reply(line: str):
+            writer.write(line.encode("ascii") + b"\r\n")
+            await writer.drain()
+
+        try:
+            await reply("220 smtp-sink ESMTP ready")
+            while True:
+                raw = await reader.readline()
+                if not raw:
+                    break
+                command, _, argument = raw.decode("utf-8", "replace").rstrip("\r\n").partition(" ")
+                verb = command.upper()
+                if verb == "EHLO":
+                    await reply("250-smtp-sink")
+                    await reply("250-8BITMIME")
+                    await reply("250 AUTH PLAIN LOGIN")
+                elif verb == "HELO":
+                    await reply("250 smtp-sink")
+                elif verb == "AUTH":
+                    mechanism, _, initial = argument.partition(" ")
+                    if mechanism.upper() == "LOGIN":
+                        await reply("334 " + base64.b64encode(b"Username:").decode())
+                        await reader.readline()
+                        await reply("334 " + base64.b64encode(b"Password:").decode())
+                        await reader.readline()
+                    elif not initial:
+                        await reply("334 ")
+                        await reader.readline()
+                    self.logins += 1
+                    await reply("235 Authentication successful")
+                elif verb == "MAIL":
+                    mail_from, recipients = argument.partition(":")[2].strip(" <>"), []
+                    await reply("250 OK")
+                elif verb == "RCPT":
+                    recipients.append(argument.partition(":")[2].strip(" <>"))
+                    await reply("250 OK")
+                elif verb == "DATA":
+                    await reply("354 End data with <CR><LF>.<CR><LF>")
+                    lines = []
+                    while True:
+                        line = await reader.readline()
+                        if line in (b".\r\n", b".\n", b""):
+                            break
+                        lines.append(line[1:] if line.startswith(b"..") else line)
+                    self.messages.append(SinkMessage(mail_from, recipients, b"".join(lines)))
+                    await reply("250 OK queued")
+                elif verb in ("RSET", "NOOP"):
+                    if verb == "RSET":
+                        mail_from, recipients = "", []
+                    await reply("250 OK")
+                elif verb == "QUIT":
+                    await reply("221 Bye")
+                    break
+                else:
+                    await reply("502 Command not implemented")
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._writers.discard(writer)
+            writer.close()
@@ -1,7 +1,49 @@
+import html
+import os
+import re
+import threading
 import markdown2
 from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+# Stand-ins for template fields while the markdown is compiled; plain alphanumerics so markdown leaves them alone
+_SLOT = "TMPLSLOT{}X"
+_SLOT_PATTERN = re.compile(r"TMPLSLOT(\d+)X")
+
+class _SlotRecorder(dict):
+    """format_map() mapping that swaps every field for a numbered slot marker and remembers its name."""
+    def __init__(self):
+        super().__init__()
+        self.names: List[str] = []
+
+    def __missing__(self, key: str) -> str:
+        self.names.append(key)
+        return _SLOT.format(len(self.names) - 1)
+
+class CompiledTemplate(NamedTuple):
+    """Styled HTML split around its fields: parts[0], field_names[0], parts[1], ... parts[-1]."""
+    parts: Tuple[str, ...]
+    field_names: Tuple[str, ...]
+    mtimes: Tuple[Optional[float], ...]
+
+    def render(self, context: dict) -> str:
+        pieces = [self.parts[0]]
+        for name, part in zip(self.field_names, self.parts[1:]):
+            pieces.append(html.escape(str(context[name])))
+            pieces.append(part)
+        return "".join(pieces)
 
 class TemplateManager:
+    """
+    Renders markdown email templates to inline-styled HTML.
+
+    Each template (with the shared header and footer) is run through markdown2 and styled once, with its
+    `{field}` placeholders turned into slots; rendering then only fills the slots with HTML-escaped values.
+    Compiled templates are shared by all instances and recompiled when any of their files' mtime changes.
+    """
+    _compiled: Dict[Tuple[Path, str], CompiledTemplate] = {}
+    _lock = threading.Lock()
+
     def __init__(self):
         # Dynamically determine the root path of the project
         self.root_dir = Path(__file__).resolve().parent.parent.parent  # Adjust this depending on the structure
@@ -32,15 +74,54 @@ class TemplateManager:
                 styled_html = styled_html.replace(f'<{tag}>', f'<{tag} style="{style}">')
         return styled_html
 
-    def render_template(self, template_name: str, **context) -> str:
-        """Render a markdown template with given context, applying advanced email styles."""
+    def _source_files(self, template_name: str) -> Tuple[str, ...]:
+        return ('header.md', 'footer.md', f'{template_name}.md')
+
+    def _mtimes(self, template_name: str) -> Tuple[Optional[float], ...]:
+        mtimes = []
+        for filename in self._source_files(template_name):
+            try:
+                mtimes.append(os.stat(self.templates_dir / filename).st_mtime)
+            except OSError:
+                mtimes.append(None)
+        return tuple(mtimes)
+
+    def compile_template(self, template_name: str) -> CompiledTemplate:
+        """Compile header + template + footer into styled HTML with slots for the template's fields."""
+        mtimes = self._mtimes(template_name)
         header = self._read_template('header.md')
         footer = self._read_template('footer.md')
-
-        # Read main template and format it with provided context
         main_template = self._read_template(f'{template_name}.md')
-        main_content = main_template.format(**context)
 
+        slots = _SlotRecorder()
+        main_content = main_template.format_map(slots)
         full_markdown = f"{header}\n{main_content}\n{footer}"
-        html_content = markdown2.markdown(full_markdown)
-        return self._apply_email_styles(html_content)
+        styled_html = self._apply_email_styles(markdown2.markdown(full_markdown))
+
+        pieces = _SLOT_PATTERN.split(styled_html)
+        parts = tuple(pieces[0::2])
+        field_names = tuple(slots.names[int(index)] for index in pieces[1::2])
+        return CompiledTemplate(parts, field_names, mtimes)
+
+    def get_compiled_template(self, template_name: str) -> CompiledTemplate:
+        key = (self.templates_dir, template_name)
+        compiled = self._compiled.get(key)
+        if compiled is None or compiled.mtimes != self._mtimes(template_name):
+            with self._lock:
+                compiled = self.compile_template(template_name)
+                self._compiled[key] = compiled
+        return compiled
+
+    def warm(self) -> List[str]:
+        """Compile every template in the templates directory ahead of the first email; returns their names."""
+        names = sorted(
+            path.stem for path in self.templates_dir.glob('*.md')
+            if path.name not in ('header.md', 'footer.md')
+        )
+        for name in names:
+            self.get_compiled_template(name)
+        return names
+
+    def render_template(self, template_name: str, **context) -> str:
+        """Render a markdown template with given context, applying advanced email styles."""
+        return self.get_compiled_template(template_name).render(context)
@@ -0,0 +1,147 @@
+# app/utils/worker_pool.py
+from builtins import Exception, RuntimeError, ValueError, bool, dict, float, int, max, str
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from logging import getLogger
+from typing import Any, Callable, Optional, Tuple
+
+logger = getLogger(__name__)
+
+
+class WorkerPoolSaturatedError(Exception):
+    """Raised when a job is submitted while every worker is busy and the wait queue is full."""
+
+
+def _timed_call(fn: Callable, *args) -> Tuple[float, float, Any]:
+    """
+    Runs `fn` inside the worker and reports when it started and how long it took.
+
+    Lives at module level so it can be pickled into a process pool.
+    `time.monotonic` is system-wide on the platforms we deploy to, so the start
+    timestamp is comparable with the submit timestamp taken in the parent process.
+    """
+    started = time.monotonic()
+    result = fn(*args)
+    return started, time.monotonic() - started, result
+
+
+class BoundedWorkerPool:
+    """
+    Runs blocking callables on a thread or process pool without blocking the event loop.
+
+    The pool admits at most `max_workers + queue_size` jobs at once; anything beyond
+    that is rejected immediately with `WorkerPoolSaturatedError` so callers can shed
+    load instead of piling up behind CPU-bound work.
+
+    Attributes:
+        name (str): Label used in logs and stats.
+        executor_type (str): Either "thread" or "process".
+        max_workers (int): Number of workers running jobs concurrently.
+        queue_size (int): Number of jobs allowed to wait for a free worker.
+    """
+
+    EXECUTOR_TYPES = ("thread", "process")
+
+    def __init__(self, name: str, max_workers: Optional[int] = None, queue_size: int = 64, executor_type: str = "thread"):
+        if executor_type not in self.EXECUTOR_TYPES:
+            raise ValueError(f"Unknown executor type '{executor_type}', expected one of {self.EXECUTOR_TYPES}")
+        self.name = name
+        self.executor_type = executor_type
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.queue_size = max(0, queue_size)
+        self._executor: Optional[Executor] = None
+        self._closed = False
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._completed = 0
+        self._rejected = 0
+        self._failed = 0
+        self._queue_wait_total = 0.0
+        self._queue_wait_max = 0.0
+        self._compute_total = 0.0
+        self._compute_max = 0.0
+
+    @property
+    def capacity(self) -> int:
+        return self.max_workers + self.queue_size
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.executor_type == "process":
+                # Spawned children do not inherit the event loop or open sockets from the parent.
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=self.name)
+        return self._executor
+
+    def _acquire_slot(self):
+        with self._lock:
+            if self._in_flight >= self.capacity:
+                self._rejected += 1
+                raise WorkerPoolSaturatedError(f"{self.name} pool is saturated ({self._in_flight} jobs in flight)")
+            self._in_flight += 1
+
+    def _release_slot(self, queue_wait: Optional[float], compute: Optional[float]):
+        with self._lock:
+            self._in_flight -= 1
+            if queue_wait is None:
+                self._failed += 1
+                return
+            self._completed += 1
+            self._queue_wait_total += queue_wait
+            self._queue_wait_max = max(self._queue_wait_max, queue_wait)
+            self._compute_total += compute
+            self._compute_max = max(self._compute_max, compute)
+
+    async def run(self, fn: Callable, *args) -> Any:
+        """
+        Runs `fn(*args)` on the pool and returns its result.
+
+        Raises:
+            WorkerPoolSaturatedError: If the pool and its wait queue are full.
+            RuntimeError: If the pool has been shut down.
+        """
+        if self._closed:
+            raise RuntimeError(f"{self.name} pool has been shut down")
+        self._acquire_slot()
+        queue_wait = compute = None
+        try:
+            loop = asyncio.get_running_loop()
+            submitted = time.monotonic()
+            started, compute, result = await loop.run_in_executor(self._get_executor(), _timed_call, fn, *args)
+            queue_wait = max(0.0, started - submitted)
+            logger.debug("%s job waited %.1f ms, ran %.1f ms", self.name, queue_wait * 1000, compute * 1000)
+            return result
+        finally:
+            self._release_slot(queue_wait, compute)
+
+    def stats(self) -> dict:
+        """Returns a snapshot of pool occupancy and queue-wait/compute timings in milliseconds."""
+        with self._lock:
+            completed = self._completed
+            return {
+                "executor": self.executor_type,
+                "max_workers": self.max_workers,
+                "queue_size": self.queue_size,
+                "in_flight": self._in_flight,
+                "completed": completed,
+                "failed": self._failed,
+                "rejected": self._rejected,
+                "queue_wait_avg_ms": (self._queue_wait_total / completed * 1000) if completed else 0.0,
+                "queue_wait_max_ms": self._queue_wait_max * 1000,
+                "compute_avg_ms": (self._compute_total / completed * 1000) if completed else 0.0,
+                "compute_max_ms": self._compute_max * 1000,
+            }
+
+    def shutdown(self, wait: bool = True):
+        """Stops the underlying executor; pending jobs are allowed to finish when `wait` is True."""
+        self._closed = True
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
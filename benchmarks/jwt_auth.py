@@ -0,0 +1,50 @@
+"""
+Cost of the auth dependency (`get_current_user`) for a bearer token presented again and again.
+
+Compares the previous implementation (jwt.decode with the raw secret on every call), verification with the
+prepared key but no cache, and the verified-claims cache.
+
+Usage (from the project root):
+    python -m benchmarks.jwt_auth [--seconds 2]
+"""
+import argparse
+import time
+import jwt
+from app.dependencies import get_current_user
+from app.services import jwt_service
+from app.services.jwt_service import TokenVerifier, create_access_token
+from settings.config import settings
+
+class PerCallDecode:
+    """What decode_token did before: look up the secret and run the full decode for every request."""
+    def decode(self, token: str):
+        try:
+            return jwt.decode(token, settings.jwt_secret_key, algorithms=[settings.jwt_algorithm])
+        except jwt.PyJWTError:
+            return None
+
+def measure(verifier, token: str, seconds: float) -> float:
+    jwt_service._verifier = verifier
+    calls = 0
+    started = time.perf_counter()
+    deadline = started + seconds
+    while time.perf_counter() < deadline:
+        get_current_user(token)
+        calls += 1
+    return calls / (time.perf_counter() - started)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=2.0, help="Time spent on each variant")
+    args = parser.parse_args()
+
+    token = create_access_token(data={"sub": "5b3c1c1e-2f7a-4a8e-9d6b-0c1f2e3d4a5b", "role": "ADMIN"})
+    baseline = measure(PerCallDecode(), token, args.seconds)
+    prepared = measure(TokenVerifier(settings.jwt_secret_key, settings.jwt_algorithm, cache_size=0), token, args.seconds)
+    cached = measure(TokenVerifier(settings.jwt_secret_key, settings.jwt_algorithm, settings.jwt_cache_size), token, args.seconds)
+    print(f"jwt.decode per request:  {baseline:>12,.0f} calls/s ({1e6 / baseline:.1f} us)")
+    print(f"prepared key, no cache:  {prepared:>12,.0f} calls/s ({1e6 / prepared:.1f} us)")
+    print(f"verified-claims cache:   {cached:>12,.0f} calls/s ({1e6 / cached:.1f} us, {cached / baseline:.1f}x)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""
+Email template rendering throughput: compiled TemplateManager vs. re-reading and re-running markdown per email.
+
+Usage (from the project root):
+    python -m benchmarks.template_render [--seconds 2]
+"""
+import argparse
+import time
+import markdown2
+from app.utils.template_manager import TemplateManager
+
+CONTEXT = {"name": "Ann", "verification_url": "http://localhost/verify-email/1/abc"}
+
+def render_uncached(manager: TemplateManager) -> str:
+    header = manager._read_template('header.md')
+    footer = manager._read_template('footer.md')
+    main_content = manager._read_template('email_verification.md').format(**CONTEXT)
+    return manager._apply_email_styles(markdown2.markdown(f"{header}\n{main_content}\n{footer}"))
+
+def render_compiled(manager: TemplateManager) -> str:
+    return manager.render_template('email_verification', **CONTEXT)
+
+def measure(render, manager: TemplateManager, seconds: float) -> float:
+    renders = 0
+    started = time.perf_counter()
+    deadline = started + seconds
+    while time.perf_counter() < deadline:
+        render(manager)
+        renders += 1
+    return renders / (time.perf_counter() - started)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=2.0, help="Time spent on each variant")
+    args = parser.parse_args()
+
+    manager = TemplateManager()
+    manager.warm()
+    uncached = measure(render_uncached, manager, args.seconds)
+    compiled = measure(render_compiled, manager, args.seconds)
+    print(f"uncached markdown render: {uncached:>12,.0f} renders/s")
+    print(f"compiled template render: {compiled:>12,.0f} renders/s ({compiled / uncached:.0f}x)")
+
+if __name__ == "__main__":
+    main()
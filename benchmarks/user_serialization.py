@@ -0,0 +1,76 @@
+"""
+Serialization cost of one `GET /users/` page: the previous path vs. the prebuilt TypeAdapters.
+
+The previous path validated every ORM row into a `UserResponse`, built a `UserListResponse`, then let FastAPI
+re-validate it against the response_model, encode it to plain Python and `json.dumps` it. The new path turns
+rows into dicts and writes JSON bytes in one `TypeAdapter.dump_json` call.
+
+Usage (from the project root):
+    python -m benchmarks.user_serialization [--seconds 2] [--page-size 100]
+"""
+import argparse
+import asyncio
+import time
+import uuid
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from app.models.user_model import User, UserRole
+from app.schemas.pagination_schema import PaginationLink
+from app.schemas.user_schemas import UserListResponse, UserResponse
+from app.schemas.user_serialization import dump_user_list
+
+RESPONSE_FIELD = create_response_field(name="Response_list_users", type_=UserListResponse)
+
+def make_users(count: int):
+    return [
+        User(
+            id=uuid.uuid4(), email=f"user{i}@example.com", nickname=f"user_{i}", first_name="Ann", last_name="Lee",
+            bio="Experienced software developer specializing in web applications.",
+            profile_picture_url="https://example.com/profiles/ann.jpg", linkedin_profile_url="https://linkedin.com/in/ann",
+            github_profile_url=None, role=UserRole.AUTHENTICATED, is_professional=False,
+        )
+        for i in range(count)
+    ]
+
+def make_links(page_size: int):
+    return [
+        PaginationLink(rel=rel, href=f"http://localhost/users/?skip={skip}&limit={page_size}")
+        for rel, skip in (("self", 0), ("first", 0), ("last", 900), ("next", page_size))
+    ]
+
+async def serialize_previous(users, page_size: int) -> bytes:
+    items = [UserResponse.model_validate(user) for user in users]
+    content = UserListResponse(items=items, total=1000, total_is_exact=True, page=1, size=len(items), links=make_links(page_size))
+    encoded = await serialize_response(field=RESPONSE_FIELD, response_content=content)
+    return JSONResponse(encoded).body
+
+async def serialize_adapter(users, page_size: int) -> bytes:
+    return dump_user_list(users, total=1000, total_is_exact=True, page=1, links=make_links(page_size))
+
+async def measure(serialize, users, page_size: int, seconds: float) -> float:
+    pages = 0
+    started = time.perf_counter()
+    deadline = started + seconds
+    while time.perf_counter() < deadline:
+        await serialize(users, page_size)
+        pages += 1
+    return (time.perf_counter() - started) / pages
+
+async def run(seconds: float, page_size: int):
+    users = make_users(page_size)
+    previous = await measure(serialize_previous, users, page_size, seconds)
+    adapter = await measure(serialize_adapter, users, page_size, seconds)
+    print(f"{page_size}-user page")
+    print(f"model_validate + response_model: {previous * 1e6:>10,.0f} us/page")
+    print(f"TypeAdapter.dump_json:           {adapter * 1e6:>10,.0f} us/page ({previous / adapter:.1f}x)")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=2.0, help="Time spent on each variant")
+    parser.add_argument("--page-size", type=int, default=100, help="Users per page")
+    args = parser.parse_args()
+    asyncio.run(run(args.seconds, args.page_size))
+
+if __name__ == "__main__":
+    main()
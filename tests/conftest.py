@@ -31,10 +31,15 @@ from faker import Faker
 from app.main import app
 from app.database import Base, Database
 from app.models.user_model import User, UserRole
-from app.dependencies import get_db, get_settings
+from app.dependencies import get_db, get_read_db, get_read_session_factory, get_session_factory, get_settings
 from app.utils.security import hash_password
 from app.utils.template_manager import TemplateManager
 from app.services.email_service import EmailService
+from app.services.rate_limit_service import configure_rate_limiter
+from app.services.token_revocation_service import configure_revocation_table
+from app.services.user_cache import get_user_cache
+from app.utils.concurrency_limit import configure_concurrency_limits
+from app.utils.primary_pins import configure_primary_pins
 from unittest.mock import AsyncMock, patch
 from app.services.jwt_service import create_access_token
 
@@ -60,6 +65,9 @@ def email_service():
 async def async_client(db_session):
     async with AsyncClient(app=app, base_url="http://testserver") as client:
         app.dependency_overrides[get_db] = lambda: db_session
+        app.dependency_overrides[get_session_factory] = lambda: AsyncTestingSessionLocal
+        app.dependency_overrides[get_read_db] = lambda: db_session
+        app.dependency_overrides[get_read_session_factory] = lambda: AsyncTestingSessionLocal
         try:
             yield client
         finally:
@@ -166,10 +174,10 @@ async def users_with_same_role_50_users(db_session):
     users = []
     for _ in range(50):
         user_data = {
-            "nickname": fake.user_name(),
+            "nickname": fake.unique.user_name(),
             "first_name": fake.first_name(),
             "last_name": fake.last_name(),
-            "email": fake.email(),
+            "email": fake.unique.email(),
             "hashed_password": fake.password(),
             "role": UserRole.AUTHENTICATED,
             "email_verified": False,
@@ -242,6 +250,32 @@ def patch_email(monkeypatch):
 
     yield
 
+# Tables are recreated for every test, so cached users from an earlier test must not leak into the next one
+@pytest.fixture(autouse=True)
+def clear_user_cache():
+    cache = get_user_cache()
+    if cache is not None:
+        cache.clear()
+    yield
+
+# Each test gets an empty revocation table of its own instead of the host-wide one in /dev/shm
+@pytest.fixture(autouse=True)
+def revocation_table(tmp_path):
+    yield configure_revocation_table(settings.model_copy(update={"token_revocation_path": str(tmp_path / "revocations")}))
+
+# Likewise for read-your-writes pins
+@pytest.fixture(autouse=True)
+def primary_pins(tmp_path):
+    yield configure_primary_pins(settings.model_copy(update={"read_your_writes_pin_path": str(tmp_path / "pins")}))
+
+# Rate limit buckets and adaptive concurrency limits start fresh in every test, so the suite's many requests
+# from one client do not add up
+@pytest.fixture(autouse=True)
+def reset_request_limits():
+    configure_rate_limiter(settings)
+    configure_concurrency_limits(settings)
+    yield
+
 @pytest.fixture
 def user_base_data():
     return {
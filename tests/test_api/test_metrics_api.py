@@ -0,0 +1,90 @@
+import pytest
+from httpx import AsyncClient
+from app.database import Database
+from app.main import app
+from app.utils.worker_pool import WorkerPoolSaturatedError
+
+
+@pytest.mark.asyncio
+async def test_metrics_as_admin(async_client, admin_token):
+    response = await async_client.get("/metrics/", headers={"Authorization": f"Bearer {admin_token}"})
+    assert response.status_code == 200
+    assert "queue_wait_avg_ms" in response.json()["password_hashing"]
+    assert response.json()["email_outbox"]["pending"] == 0
+
+
+@pytest.mark.asyncio
+async def test_metrics_forbidden_for_manager(async_client, manager_token):
+    response = await async_client.get("/metrics/", headers={"Authorization": f"Bearer {manager_token}"})
+    assert response.status_code == 403
+
+
+@pytest.mark.asyncio
+async def test_login_returns_503_when_hashing_pool_saturated(async_client, verified_user, monkeypatch):
+    async def saturated(*args, **kwargs):
+        raise WorkerPoolSaturatedError("busy")
+    monkeypatch.setattr("app.services.user_service.verify_password_async", saturated)
+    form_data = {"username": verified_user.email, "password": "MySuperPassword$1234"}
+    response = await async_client.post("/login/", data=form_data)
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+
+
+@pytest.mark.asyncio
+async def test_register_returns_503_through_the_real_unit_of_work(db_session, monkeypatch):
+    async def saturated(*args, **kwargs):
+        raise WorkerPoolSaturatedError("busy")
+    monkeypatch.setattr("app.services.user_service.hash_password_async", saturated)
+    # No dependency overrides: the request runs through the application's own get_db
+    try:
+        async with AsyncClient(app=app, base_url="http://testserver") as client:
+            response = await client.post("/register/", json={"email": "busy@example.com", "password": "ValidPassword123!"})
+    finally:
+        await Database._engine.dispose()
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+
+
+@pytest.mark.asyncio
+async def test_metrics_include_database_pool(async_client, admin_token):
+    response = await async_client.get("/metrics/", headers={"Authorization": f"Bearer {admin_token}"})
+    pool = response.json()["database_pool"]
+    assert pool["pool_class"] == "InstrumentedAsyncPool"
+    assert {"size", "checked_out", "wait_avg_ms", "hold_max_ms", "timeouts", "leak_warnings"} <= set(pool)
+
+
+@pytest.mark.asyncio
+async def test_metrics_include_nickname_allocation(async_client, admin_token):
+    response = await async_client.get("/metrics/", headers={"Authorization": f"Bearer {admin_token}"})
+    nicknames = response.json()["nicknames"]
+    assert {"allocations", "candidates_checked", "collisions", "collision_rate", "exhausted"} <= set(nicknames)
+    assert nicknames["space"] > 100_000_000
+
+
+@pytest.mark.asyncio
+async def test_metrics_include_user_cache(async_client, admin_user, admin_token):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    await async_client.get(f"/users/{admin_user.id}", headers=headers)
+    await async_client.get(f"/users/{admin_user.id}", headers=headers)
+    cache = (await async_client.get("/metrics/", headers=headers)).json()["user_cache"]
+    assert cache["hits"] >= 1
+    assert {"misses", "hit_rate", "entries", "evictions", "expirations"} <= set(cache)
+
+
+@pytest.mark.asyncio
+async def test_metrics_include_token_revocations(async_client, admin_token):
+    response = await async_client.get("/metrics/", headers={"Authorization": f"Bearer {admin_token}"})
+    revocations = response.json()["token_revocations"]
+    # The admin's own token was checked against the table on the way in
+    assert revocations["lookups"] >= 1
+    assert {"capacity", "used_slots", "revoked_hits", "rebuilds", "sync"} <= set(revocations)
+
+
+@pytest.mark.asyncio
+async def test_metrics_include_rate_limits(async_client, admin_token):
+    response = await async_client.get("/metrics/", headers={"Authorization": f"Bearer {admin_token}"})
+    rate_limits = response.json()["rate_limits"]
+    assert rate_limits["backend"] == "memory"
+    # The metrics request itself went through the admin's api limit
+    assert rate_limits["policies"]["api"]["allowed"] >= 1
+    assert {"login", "register", "refresh"} <= set(rate_limits["policies"])
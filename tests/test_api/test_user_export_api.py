@@ -0,0 +1,39 @@
+import csv
+import io
+import json
+import pytest
+
+
+@pytest.mark.asyncio
+async def test_export_ndjson(async_client, admin_user, admin_token, users_with_same_role_50_users):
+    response = await async_client.get("/users/export", headers={"Authorization": f"Bearer {admin_token}"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert len(rows) == 51
+    assert "hashed_password" not in rows[0]
+    assert {row["email"] for row in rows} >= {admin_user.email}
+
+
+@pytest.mark.asyncio
+async def test_export_csv_with_filter(async_client, admin_user, admin_token, users_with_same_role_50_users):
+    response = await async_client.get(
+        "/users/export", params={"format": "csv", "role": "ADMIN"}, headers={"Authorization": f"Bearer {admin_token}"}
+    )
+    assert response.status_code == 200
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert len(rows) == 1
+    assert rows[0]["email"] == admin_user.email
+    assert rows[0]["role"] == "ADMIN"
+
+
+@pytest.mark.asyncio
+async def test_export_forbidden_for_manager(async_client, manager_token):
+    response = await async_client.get("/users/export", headers={"Authorization": f"Bearer {manager_token}"})
+    assert response.status_code == 403
+
+
+@pytest.mark.asyncio
+async def test_export_rejects_unknown_format(async_client, admin_token):
+    response = await async_client.get("/users/export", params={"format": "xml"}, headers={"Authorization": f"Bearer {admin_token}"})
+    assert response.status_code == 422
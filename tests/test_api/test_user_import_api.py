@@ -0,0 +1,126 @@
+import json
+import pytest
+from sqlalchemy import select
+from app.models.user_model import User
+from app.services.user_import_service import iter_lines
+
+
+def ndjson(*rows):
+    return "\n".join(json.dumps(row) for row in rows) + "\n"
+
+
+@pytest.mark.asyncio
+async def test_import_ndjson_reports_per_row_errors(async_client, db_session, admin_user, admin_token):
+    body = ndjson(
+        {"email": "first@example.com", "password": "ValidPassword123!", "first_name": "First"},
+        {"email": "not-an-email", "password": "ValidPassword123!"},
+        {"email": admin_user.email, "password": "ValidPassword123!"},
+        {"email": "first@example.com", "password": "ValidPassword123!"},
+        {"email": "second@example.com", "password": "ValidPassword123!"},
+    )
+    response = await async_client.post(
+        "/users/import", content=body,
+        headers={"Authorization": f"Bearer {admin_token}", "Content-Type": "application/x-ndjson"},
+    )
+    assert response.status_code == 200
+    report = response.json()
+    assert (report["total_rows"], report["created"], report["failed"]) == (5, 2, 3)
+    errors = {error["row"]: error["error"] for error in report["errors"]}
+    assert errors[2].startswith("email")
+    assert errors[3] == "Email already exists"
+    assert errors[4] == "Duplicate email in import"
+
+    result = await db_session.execute(select(User).where(User.email == "first@example.com"))
+    created = result.scalars().one()
+    assert created.first_name == "First"
+    assert created.nickname and created.verification_token
+    assert created.email_verified is False
+
+
+@pytest.mark.asyncio
+async def test_import_csv_in_batches(async_client, db_session, admin_token, monkeypatch):
+    monkeypatch.setattr("app.routers.user_routes.settings.user_import_batch_size", 2)
+    lines = ["email,password,last_name"] + [f"user{i}@example.com,ValidPassword123!,Row{i}" for i in range(5)]
+    response = await async_client.post(
+        "/users/import", content="\r\n".join(lines),
+        headers={"Authorization": f"Bearer {admin_token}", "Content-Type": "text/csv"},
+    )
+    assert response.json()["created"] == 5
+    result = await db_session.execute(select(User.last_name).where(User.email == "user4@example.com"))
+    assert result.scalar() == "Row4"
+
+
+@pytest.mark.asyncio
+async def test_import_rejects_unknown_content_type(async_client, admin_token):
+    response = await async_client.post(
+        "/users/import", content="<users/>",
+        headers={"Authorization": f"Bearer {admin_token}", "Content-Type": "application/xml"},
+    )
+    assert response.status_code == 415
+
+
+@pytest.mark.asyncio
+async def test_import_forbidden_for_regular_user(async_client, user_token):
+    response = await async_client.post("/users/import", content="", headers={"Authorization": f"Bearer {user_token}"})
+    assert response.status_code == 403
+
+
+async def test_iter_lines_handles_split_chunks():
+    async def chunks():
+        for chunk in [b"a,b\r\n\xc3", b"\xa9,d\nlast"]:
+            yield chunk
+    assert [line async for line in iter_lines(chunks())] == ["a,b", "é,d", "last"]
+
+
+@pytest.mark.asyncio
+async def test_import_queues_verification_emails(async_client, db_session, admin_token):
+    from app.models.email_outbox_model import EmailOutbox
+    body = ndjson(
+        {"email": "queued1@example.com", "password": "ValidPassword123!"},
+        {"email": "queued2@example.com", "password": "ValidPassword123!"},
+    )
+    response = await async_client.post(
+        "/users/import", content=body,
+        headers={"Authorization": f"Bearer {admin_token}", "Content-Type": "application/x-ndjson"},
+    )
+    assert response.json()["created"] == 2
+    result = await db_session.execute(select(EmailOutbox.recipient).order_by(EmailOutbox.recipient))
+    assert result.scalars().all() == ["queued1@example.com", "queued2@example.com"]
+
+
+@pytest.mark.asyncio
+async def test_import_reports_rows_that_fail_to_hash(async_client, admin_token, monkeypatch):
+    async def flaky_hash(passwords):
+        return [ValueError("Failed to hash password") if password == "Unhashable123!" else f"hash-{password}" for password in passwords]
+    monkeypatch.setattr("app.services.user_import_service.hash_passwords_async", flaky_hash)
+    body = ndjson(
+        {"email": "hashed@example.com", "password": "ValidPassword123!"},
+        {"email": "unhashable@example.com", "password": "Unhashable123!"},
+    )
+    response = await async_client.post(
+        "/users/import", content=body,
+        headers={"Authorization": f"Bearer {admin_token}", "Content-Type": "application/x-ndjson"},
+    )
+    report = response.json()
+    assert (report["created"], report["failed"]) == (1, 1)
+    assert report["errors"] == [{"row": 2, "email": "unhashable@example.com", "error": "Failed to hash password"}]
+
+
+@pytest.mark.asyncio
+async def test_import_batches_stay_under_the_bind_parameter_limit(async_client, db_session, admin_token, monkeypatch):
+    from app.services import user_import_service
+    batch_sizes = []
+    insert_batch = user_import_service.UserImportService._insert_batch.__func__
+    async def recording_insert_batch(cls, session, batch, report):
+        batch_sizes.append(len(batch))
+        return await insert_batch(cls, session, batch, report)
+    monkeypatch.setattr(user_import_service.UserImportService, "_insert_batch", classmethod(recording_insert_batch))
+    monkeypatch.setattr(user_import_service, "MAX_BATCH_SIZE", 2)
+    monkeypatch.setattr("app.routers.user_routes.settings.user_import_batch_size", 100000)
+    body = ndjson(*({"email": f"capped{i}@example.com", "password": "ValidPassword123!"} for i in range(5)))
+    response = await async_client.post(
+        "/users/import", content=body,
+        headers={"Authorization": f"Bearer {admin_token}", "Content-Type": "application/x-ndjson"},
+    )
+    assert response.json()["created"] == 5
+    assert batch_sizes == [2, 2, 1]
@@ -1,4 +1,5 @@
 from builtins import str
+import time
 import pytest
 from httpx import AsyncClient
 from app.main import app
@@ -6,6 +7,9 @@ from app.models.user_model import User
 from app.utils.nickname_gen import generate_nickname
 from app.utils.security import hash_password
 from app.services.jwt_service import decode_token  # Import your FastAPI app
+from app.services.rate_limit_service import configure_rate_limiter
+from app.utils.primary_pins import pin_subject, subject_pinned
+from settings.config import settings
 
 # Example of a test function using the async_client fixture
 @pytest.mark.asyncio
@@ -189,3 +193,334 @@ async def test_list_users_unauthorized(async_client, user_token):
         headers={"Authorization": f"Bearer {user_token}"}
     )
     assert response.status_code == 403  # Forbidden, as expected for regular user
+
+@pytest.mark.asyncio
+async def test_list_users_cursor_mode(async_client, admin_user, admin_token, users_with_same_role_50_users):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    response = await async_client.get("/users/", params={"cursor": "", "limit": 20}, headers=headers)
+    assert response.status_code == 200
+    body = response.json()
+    assert body["size"] == 20
+    assert body["page"] is None
+    assert body["prev_cursor"] is None
+    rels = {link["rel"]: link["href"] for link in body["links"]}
+    assert "next" in rels and "prev" not in rels
+
+    response = await async_client.get(rels["next"], headers=headers)
+    assert response.status_code == 200
+    second = response.json()
+    assert second["prev_cursor"] is not None
+    assert not {u["id"] for u in body["items"]} & {u["id"] for u in second["items"]}
+
+@pytest.mark.asyncio
+async def test_list_users_invalid_cursor(async_client, admin_token):
+    response = await async_client.get("/users/", params={"cursor": "garbage"}, headers={"Authorization": f"Bearer {admin_token}"})
+    assert response.status_code == 400
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("params", [{"limit": 0}, {"limit": -5}, {"limit": 101}, {"skip": -1}, {"cursor": "", "limit": 0}])
+async def test_list_users_rejects_bad_paging(async_client, admin_token, params):
+    response = await async_client.get("/users/", params=params, headers={"Authorization": f"Bearer {admin_token}"})
+    assert response.status_code == 422
+
+@pytest.mark.asyncio
+async def test_list_users_skip_mode_links(async_client, admin_token, users_with_same_role_50_users):
+    response = await async_client.get("/users/", params={"skip": 10, "limit": 10}, headers={"Authorization": f"Bearer {admin_token}"})
+    body = response.json()
+    assert body["page"] == 2
+    rels = {link["rel"]: link["href"] for link in body["links"]}
+    assert rels["next"].endswith("/users/?skip=20&limit=10")
+
+@pytest.mark.asyncio
+async def test_list_users_reports_exact_total(async_client, admin_token, users_with_same_role_50_users):
+    response = await async_client.get("/users/", headers={"Authorization": f"Bearer {admin_token}"})
+    body = response.json()
+    assert body["total"] == 51
+    assert body["total_is_exact"] is True
+
+
+@pytest.mark.asyncio
+async def test_write_pins_reads_to_primary_when_replicas_configured(async_client, admin_token, monkeypatch):
+    from app.database import Database
+    from app.dependencies import PRIMARY_PIN_COOKIE
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    user_data = {"email": "pinned@example.com", "password": "sS#fdasrongPassword123!"}
+
+    response = await async_client.post("/users/", json=user_data, headers=headers)
+    assert response.status_code == 201
+    assert PRIMARY_PIN_COOKIE not in response.cookies
+
+    monkeypatch.setattr(Database, "_replicas", [object()])
+    response = await async_client.post("/users/", json={**user_data, "email": "pinned2@example.com"}, headers=headers)
+    assert response.status_code == 201
+    assert float(response.cookies[PRIMARY_PIN_COOKIE]) > time.time()
+    # Bearer clients are pinned server-side by subject, cookie or not
+    assert subject_pinned(decode_token(admin_token)["sub"])
+
+
+def test_reads_pinned_to_primary_by_token_subject(admin_token):
+    from starlette.requests import Request
+    from app.dependencies import reads_pinned_to_primary
+    request = Request({"type": "http", "headers": [(b"authorization", f"Bearer {admin_token}".encode())]})
+    assert not reads_pinned_to_primary(request)
+    pin_subject(decode_token(admin_token)["sub"], 5)
+    assert reads_pinned_to_primary(request)
+    assert not subject_pinned(decode_token(admin_token)["sub"], now=time.time() + 10)
+
+
+def test_reads_pinned_to_primary_follows_cookie():
+    from starlette.requests import Request
+    from app.dependencies import PRIMARY_PIN_COOKIE, reads_pinned_to_primary
+    def request_with(cookie):
+        return Request({"type": "http", "headers": [(b"cookie", f"{PRIMARY_PIN_COOKIE}={cookie}".encode())]})
+    assert reads_pinned_to_primary(request_with(time.time() + 5))
+    assert not reads_pinned_to_primary(request_with(time.time() - 5))
+    assert not reads_pinned_to_primary(request_with("garbage"))
+    # A client-made cookie cannot pin for longer than one window
+    assert not reads_pinned_to_primary(request_with(time.time() + 3600))
+
+
+@pytest.mark.asyncio
+async def test_debug_headers_report_round_trips(async_client, admin_user, admin_token, monkeypatch):
+    from app.dependencies import get_settings
+    monkeypatch.setattr(get_settings(), "debug", True)
+    response = await async_client.get(f"/users/{admin_user.id}", headers={"Authorization": f"Bearer {admin_token}"})
+    assert response.status_code == 200
+    # A single SELECT; reads no longer commit after every statement
+    assert (response.headers["X-DB-Queries"], response.headers["X-DB-Commits"]) == ("1", "0")
+
+async def test_login_is_a_single_round_trip(async_client, verified_user, monkeypatch):
+    from app.dependencies import get_settings
+    from app.services.login_activity_service import start_last_login_recorder, stop_last_login_recorder
+    from tests.conftest import AsyncTestingSessionLocal
+    monkeypatch.setattr(get_settings(), "debug", True)
+    start_last_login_recorder(AsyncTestingSessionLocal, get_settings())
+    try:
+        form_data = {"username": verified_user.email, "password": "MySuperPassword$1234"}
+        response = await async_client.post("/login/", data=urlencode(form_data), headers={"Content-Type": "application/x-www-form-urlencoded"})
+    finally:
+        await stop_last_login_recorder()
+    assert response.status_code == 200
+    # The user SELECT only: last_login_at is written behind and there were no failures to reset
+    assert response.headers["X-DB-Queries"] == "1"
+
+async def test_admin_create_user_duplicate_email(async_client, admin_user, admin_token):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    response = await async_client.post("/users/", json={"email": admin_user.email, "password": "AnotherPassword123!"}, headers=headers)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Email already exists"
+
+async def test_register_when_nicknames_run_out(async_client, verified_user, monkeypatch):
+    from app.utils.nickname_gen import NicknameGenerator
+    # Every generated nickname is already taken
+    monkeypatch.setattr(NicknameGenerator, "generate", lambda self: verified_user.nickname)
+    response = await async_client.post("/register/", json={"email": "no_nickname@example.com", "password": "AnotherPassword123!"})
+    assert response.status_code == 409
+
+async def test_update_user_with_current_etag(async_client, admin_user, admin_token, monkeypatch):
+    from app.dependencies import get_settings
+    monkeypatch.setattr(get_settings(), "debug", True)
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    etag = (await async_client.get(f"/users/{admin_user.id}", headers=headers)).headers["ETag"]
+    response = await async_client.put(f"/users/{admin_user.id}", json={"first_name": "Renamed"}, headers={**headers, "If-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    # A single UPDATE ... RETURNING, no read before or after it
+    assert response.headers["X-DB-Queries"] == "1"
+
+async def test_update_user_with_stale_etag(async_client, admin_user, admin_token):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    stale = (await async_client.get(f"/users/{admin_user.id}", headers=headers)).headers["ETag"]
+    first = await async_client.put(f"/users/{admin_user.id}", json={"first_name": "First"}, headers={**headers, "If-Match": stale})
+    assert first.status_code == 200
+    second = await async_client.put(f"/users/{admin_user.id}", json={"first_name": "Second"}, headers={**headers, "If-Match": stale})
+    assert second.status_code == 412
+    assert second.headers["ETag"] == first.headers["ETag"]
+    current = await async_client.get(f"/users/{admin_user.id}", headers=headers)
+    assert current.json()["first_name"] == "First"
+
+async def test_get_user_not_modified(async_client, admin_user, admin_token, monkeypatch):
+    from app.dependencies import get_settings
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    first = await async_client.get(f"/users/{admin_user.id}", headers=headers)
+    assert first.headers["Cache-Control"] == "private, no-cache"
+    monkeypatch.setattr(get_settings(), "debug", True)
+    response = await async_client.get(f"/users/{admin_user.id}", headers={**headers, "If-None-Match": first.headers["ETag"]})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["ETag"] == first.headers["ETag"]
+    # Only the version/timestamp probe ran
+    assert response.headers["X-DB-Queries"] == "1"
+
+    by_date = await async_client.get(f"/users/{admin_user.id}", headers={**headers, "If-Modified-Since": first.headers["Last-Modified"]})
+    assert by_date.status_code == 304
+
+async def test_get_user_modified_since_etag(async_client, admin_user, admin_token):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    etag = (await async_client.get(f"/users/{admin_user.id}", headers=headers)).headers["ETag"]
+    await async_client.put(f"/users/{admin_user.id}", json={"first_name": "Changed"}, headers=headers)
+    response = await async_client.get(f"/users/{admin_user.id}", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["first_name"] == "Changed"
+    assert response.headers["ETag"] != etag
+
+async def login_tokens(async_client, email):
+    form_data = {"username": email, "password": "MySuperPassword$1234"}
+    response = await async_client.post("/login/", data=urlencode(form_data), headers={"Content-Type": "application/x-www-form-urlencoded"})
+    assert response.status_code == 200
+    return response.json()
+
+async def test_refresh_rotates_tokens_without_hashing(async_client, verified_user, monkeypatch):
+    tokens = await login_tokens(async_client, verified_user.email)
+    assert tokens["refresh_token"]
+    async def no_hashing(*args, **kwargs):
+        raise AssertionError("refresh must not hash a password")
+    monkeypatch.setattr("app.services.user_service.verify_password_async", no_hashing)
+    monkeypatch.setattr("app.services.user_service.hash_password_async", no_hashing)
+    response = await async_client.post("/token/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["refresh_token"] != tokens["refresh_token"]
+    claims = decode_token(data["access_token"])
+    assert claims["sub"] == verified_user.email
+    assert claims["role"] == "AUTHENTICATED"
+
+async def test_refresh_token_reuse_is_rejected(async_client, verified_user):
+    tokens = await login_tokens(async_client, verified_user.email)
+    first = await async_client.post("/token/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert first.status_code == 200
+    replay = await async_client.post("/token/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert replay.status_code == 401
+    successor = await async_client.post("/token/refresh", json={"refresh_token": first.json()["refresh_token"]})
+    assert successor.status_code == 401
+
+async def test_refresh_with_unknown_token(async_client):
+    response = await async_client.post("/token/refresh", json={"refresh_token": "not-a-token"})
+    assert response.status_code == 401
+    assert response.json()["detail"] == "Invalid or expired refresh token."
+
+async def test_logout_revokes_the_access_token(async_client, admin_user, admin_token):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    assert (await async_client.get(f"/users/{admin_user.id}", headers=headers)).status_code == 200
+    response = await async_client.post("/logout/", headers=headers)
+    assert response.status_code == 204
+    assert (await async_client.get(f"/users/{admin_user.id}", headers=headers)).status_code == 401
+    assert (await async_client.post("/logout/", headers=headers)).status_code == 401
+
+async def test_logout_revokes_the_refresh_token(async_client, verified_user):
+    tokens = await login_tokens(async_client, verified_user.email)
+    response = await async_client.post("/logout/", json={"refresh_token": tokens["refresh_token"]}, headers={"Authorization": f"Bearer {tokens['access_token']}"})
+    assert response.status_code == 204
+    assert (await async_client.post("/token/refresh", json={"refresh_token": tokens["refresh_token"]})).status_code == 401
+
+async def test_admin_lock_signs_the_user_out(async_client, admin_user, admin_token, manager_user, manager_token):
+    manager_headers = {"Authorization": f"Bearer {manager_token}"}
+    assert (await async_client.get(f"/users/{admin_user.id}", headers=manager_headers)).status_code == 200
+    response = await async_client.post(f"/users/{manager_user.id}/lock", headers={"Authorization": f"Bearer {admin_token}"})
+    assert response.status_code == 204
+    assert (await async_client.get(f"/users/{admin_user.id}", headers=manager_headers)).status_code == 401
+    # The admin's own token is untouched
+    assert (await async_client.get(f"/users/{admin_user.id}", headers={"Authorization": f"Bearer {admin_token}"})).status_code == 200
+
+async def test_admin_lock_revokes_refresh_tokens(async_client, verified_user, admin_token):
+    tokens = await login_tokens(async_client, verified_user.email)
+    response = await async_client.post(f"/users/{verified_user.id}/lock", headers={"Authorization": f"Bearer {admin_token}"})
+    assert response.status_code == 204
+    assert (await async_client.post("/token/refresh", json={"refresh_token": tokens["refresh_token"]})).status_code == 401
+    form_data = {"username": verified_user.email, "password": "MySuperPassword$1234"}
+    response = await async_client.post("/login/", data=urlencode(form_data), headers={"Content-Type": "application/x-www-form-urlencoded"})
+    assert response.status_code == 400
+
+async def test_lock_and_unlock_require_admin(async_client, verified_user, manager_token, admin_token):
+    assert (await async_client.post(f"/users/{verified_user.id}/lock", headers={"Authorization": f"Bearer {manager_token}"})).status_code == 403
+    from uuid import uuid4
+    assert (await async_client.post(f"/users/{uuid4()}/lock", headers={"Authorization": f"Bearer {admin_token}"})).status_code == 404
+    assert (await async_client.post(f"/users/{verified_user.id}/unlock", headers={"Authorization": f"Bearer {admin_token}"})).status_code == 204
+
+def limit_policy(monkeypatch, policy, rules):
+    monkeypatch.setitem(settings.rate_limits, policy, rules)
+    configure_rate_limiter(settings)
+
+async def test_login_rate_limit_rejects_before_hashing(async_client, verified_user, monkeypatch):
+    limit_policy(monkeypatch, "login", ["email:2/minute:token_bucket"])
+    form_data = urlencode({"username": verified_user.email, "password": "WrongPassword123!"})
+    headers = {"Content-Type": "application/x-www-form-urlencoded"}
+    for _ in range(2):
+        assert (await async_client.post("/login/", data=form_data, headers=headers)).status_code == 401
+    async def no_hashing(*args, **kwargs):
+        raise AssertionError("rate limited logins must not hash")
+    monkeypatch.setattr("app.services.user_service.verify_password_async", no_hashing)
+    # Case and whitespace do not make a new account key
+    form_data = urlencode({"username": f" {verified_user.email.upper()} ", "password": "WrongPassword123!"})
+    response = await async_client.post("/login/", data=form_data, headers=headers)
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "30"
+
+async def test_login_rate_limit_is_per_client_address(async_client, monkeypatch):
+    limit_policy(monkeypatch, "login", ["ip:1/minute"])
+    form_data = urlencode({"username": "nobody@example.com", "password": "WrongPassword123!"})
+    def headers(address):
+        return {"Content-Type": "application/x-www-form-urlencoded", "X-Forwarded-For": address}
+    assert (await async_client.post("/login/", data=form_data, headers=headers("198.51.100.1"))).status_code == 401
+    assert (await async_client.post("/login/", data=form_data, headers=headers("198.51.100.1"))).status_code == 429
+    # A spoofed first entry does not escape the limit; the proxy's entry is what counts
+    assert (await async_client.post("/login/", data=form_data, headers=headers("10.1.1.1, 198.51.100.1"))).status_code == 429
+    assert (await async_client.post("/login/", data=form_data, headers=headers("198.51.100.2"))).status_code == 401
+
+async def test_register_rate_limit(async_client, monkeypatch):
+    limit_policy(monkeypatch, "register", ["ip:1/hour"])
+    assert (await async_client.post("/register/", json={"email": "first@example.com", "password": "AnotherPassword123!"})).status_code == 200
+    response = await async_client.post("/register/", json={"email": "second@example.com", "password": "AnotherPassword123!"})
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) > 0
+
+async def test_api_rate_limit_is_per_token_subject(async_client, admin_user, admin_token, manager_token, monkeypatch):
+    limit_policy(monkeypatch, "api", ["subject:2/minute:token_bucket"])
+    admin_headers = {"Authorization": f"Bearer {admin_token}"}
+    for _ in range(2):
+        assert (await async_client.get(f"/users/{admin_user.id}", headers=admin_headers)).status_code == 200
+    assert (await async_client.get(f"/users/{admin_user.id}", headers=admin_headers)).status_code == 429
+    assert (await async_client.get(f"/users/{admin_user.id}", headers={"Authorization": f"Bearer {manager_token}"})).status_code == 200
+
+async def test_login_storm_is_shed_while_reads_continue(async_client, verified_user, monkeypatch):
+    import asyncio
+    from app.utils.concurrency_limit import get_concurrency_limiter
+    auth = get_concurrency_limiter("auth")
+    monkeypatch.setattr(auth, "limit", 1.0)
+    monkeypatch.setattr(auth, "queue_size", 0)
+    entered, release = asyncio.Event(), asyncio.Event()
+    async def slow_verify(*args, **kwargs):
+        entered.set()
+        await release.wait()
+        return True
+    monkeypatch.setattr("app.services.user_service.verify_password_async", slow_verify)
+    form_data = urlencode({"username": verified_user.email, "password": "MySuperPassword$1234"})
+    headers = {"Content-Type": "application/x-www-form-urlencoded"}
+    first = asyncio.create_task(async_client.post("/login/", data=form_data, headers=headers))
+    await entered.wait()
+    shed = await async_client.post("/login/", data=form_data, headers=headers)
+    assert shed.status_code == 503
+    assert shed.headers["Retry-After"] == "1"
+    # The read lane is unaffected by the saturated auth lane
+    assert (await async_client.get("/openapi.json")).status_code == 200
+    release.set()
+    assert (await first).status_code == 200
+    assert auth.stats()["rejected_queue_full"] == 1
+
+@pytest.mark.asyncio
+async def test_update_and_get_user_report_the_stored_role(async_client, admin_user, admin_token):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    response = await async_client.put(f"/users/{admin_user.id}", json={"bio": "Runs the place"}, headers=headers)
+    assert response.status_code == 200
+    assert response.json()["role"] == "ADMIN"
+    assert response.headers["content-type"] == "application/json"
+    response = await async_client.get(f"/users/{admin_user.id}", headers=headers)
+    assert response.json()["role"] == "ADMIN"
+    assert response.json()["bio"] == "Runs the place"
+
+@pytest.mark.asyncio
+async def test_update_user_to_a_taken_nickname_conflicts(async_client, admin_user, verified_user, admin_token):
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    response = await async_client.put(f"/users/{admin_user.id}", json={"nickname": verified_user.nickname}, headers=headers)
+    assert response.status_code == 409
+    assert response.json()["detail"] == "Nickname already in use by another user"
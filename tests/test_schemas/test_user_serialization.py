@@ -0,0 +1,46 @@
+from builtins import list
+import json
+import uuid
+from app.models.user_model import User, UserRole
+from app.schemas.pagination_schema import PaginationLink
+from app.schemas.user_schemas import UserListResponse, UserResponse
+from app.schemas.user_serialization import UserListPayload, UserPayload, dump_user, dump_user_list
+from app.utils.json_response import PreserializedJSONResponse
+
+def make_user(**overrides) -> User:
+    fields = dict(
+        id=uuid.uuid4(), email="john.doe@example.com", nickname="john_doe", first_name="John", last_name="Doe",
+        bio=None, profile_picture_url="https://example.com/john.jpg", linkedin_profile_url=None,
+        github_profile_url="https://github.com/johndoe", role=UserRole.MANAGER, is_professional=True,
+    )
+    fields.update(overrides)
+    return User(**fields)
+
+def test_payloads_mirror_the_response_models():
+    assert list(UserPayload.__annotations__) == list(UserResponse.model_fields)
+    assert list(UserListPayload.__annotations__) == list(UserListResponse.model_fields)
+
+def test_dump_user_matches_the_response_model():
+    user = make_user()
+    assert json.loads(dump_user(user)) == json.loads(UserResponse.model_validate(user).model_dump_json())
+    assert dump_user(user).startswith(b'{"email":"john.doe@example.com","nickname":"john_doe"')
+
+def test_dump_user_list_matches_the_response_model():
+    users = [make_user(email=f"user{i}@example.com", nickname=f"user_{i}", role=UserRole.AUTHENTICATED) for i in range(3)]
+    links = [PaginationLink(rel="self", href="http://testserver/users/?skip=0&limit=3")]
+    expected = UserListResponse(
+        items=[UserResponse.model_validate(user) for user in users], total=7, total_is_exact=False, page=1, size=3, links=links,
+    )
+    body = dump_user_list(users, total=7, total_is_exact=False, page=1, links=links)
+    assert json.loads(body) == json.loads(expected.model_dump_json())
+
+def test_dump_user_list_of_an_empty_page():
+    body = json.loads(dump_user_list([], total=0, total_is_exact=True, links=[], next_cursor="abc"))
+    assert body["items"] == [] and body["size"] == 0 and body["page"] is None and body["next_cursor"] == "abc"
+
+def test_preserialized_response_sends_bytes_as_is():
+    response = PreserializedJSONResponse(b'{"a":1}', headers={"ETag": '"1"'})
+    assert response.body == b'{"a":1}'
+    assert response.headers["content-type"] == "application/json"
+    assert response.headers["etag"] == '"1"'
+    assert PreserializedJSONResponse({"a": 1}).body == b'{"a":1}'
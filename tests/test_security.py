@@ -1,7 +1,8 @@
 # test_security.py
 from builtins import RuntimeError, ValueError, isinstance, str
 import pytest
-from app.utils.security import hash_password, verify_password
+import bcrypt
+from app.utils.security import get_hashing_pool, hash_password, hash_password_async, hash_passwords_async, verify_password, verify_password_async
 
 def test_hash_password():
     """Test that hashing password returns a bcrypt hashed string."""
@@ -65,3 +66,32 @@ def test_hash_password_internal_error(monkeypatch):
     with pytest.raises(ValueError):
         hash_password("test")
 
+
+@pytest.mark.asyncio
+async def test_hash_and_verify_password_async():
+    """Test the pooled hashing helpers round-trip a password."""
+    hashed = await hash_password_async("secure_password", 4)
+    assert hashed.startswith('$2b$04$')
+    assert await verify_password_async("secure_password", hashed) is True
+    assert await verify_password_async("wrong_password", hashed) is False
+    assert get_hashing_pool().stats()["completed"] >= 3
+
+@pytest.mark.asyncio
+async def test_verify_password_async_invalid_hash():
+    """Test errors raised inside the pool surface to the caller."""
+    with pytest.raises(ValueError):
+        await verify_password_async("secure_password", "invalid_hash_format")
+
+@pytest.mark.asyncio
+async def test_hash_passwords_async_returns_failures_in_place(monkeypatch):
+    """Test one password failing to hash does not fail the others in a bulk job."""
+    hashpw = bcrypt.hashpw
+    def flaky_hashpw(password, salt):
+        if password == b"bad":
+            raise RuntimeError("Simulated internal error")
+        return hashpw(password, salt)
+
+    monkeypatch.setattr("bcrypt.hashpw", flaky_hashpw)
+    first, failed, last = await hash_passwords_async(["good", "bad", "fine"])
+    assert verify_password("good", first) and verify_password("fine", last)
+    assert isinstance(failed, ValueError)
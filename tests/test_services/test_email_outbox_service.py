@@ -0,0 +1,133 @@
+from builtins import range
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock
+import asyncio
+import pytest
+from sqlalchemy import select
+from app.models.email_outbox_model import EmailOutbox
+from app.services.email_outbox_service import EmailOutboxService, EmailOutboxWorker
+from app.services.user_service import UserService
+from settings.config import settings
+from tests.conftest import AsyncTestingSessionLocal
+
+pytestmark = pytest.mark.asyncio
+
+
+async def queue_messages(db_session, count):
+    for i in range(count):
+        EmailOutboxService.enqueue(db_session, "email_verification", {"name": "N", "verification_url": "http://x", "email": f"to{i}@example.com"})
+    await db_session.commit()
+
+
+async def outbox_rows(db_session):
+    db_session.expire_all()
+    result = await db_session.execute(select(EmailOutbox).order_by(EmailOutbox.recipient))
+    return result.scalars().all()
+
+
+async def test_create_user_queues_verification_email(db_session, email_service):
+    email_service.send_verification_email = AsyncMock()
+    user = await UserService.create(db_session, {"email": "outbox@example.com", "password": "ValidPassword123!"}, email_service)
+    assert user is not None
+    email_service.send_verification_email.assert_not_awaited()
+    expected_url_suffix = f"{user.id}/{user.verification_token}"
+    rows = await outbox_rows(db_session)
+    assert len(rows) == 1
+    assert rows[0].recipient == "outbox@example.com"
+    assert rows[0].payload["verification_url"].endswith(expected_url_suffix)
+    assert rows[0].status == EmailOutbox.PENDING
+
+
+async def test_create_user_sends_inline_when_outbox_disabled(db_session, email_service, monkeypatch):
+    monkeypatch.setattr("app.services.user_service.settings.email_outbox_enabled", False)
+    email_service.send_verification_email = AsyncMock()
+    user = await UserService.create(db_session, {"email": "inline@example.com", "password": "ValidPassword123!"}, email_service)
+    email_service.send_verification_email.assert_awaited_once_with(user)
+    assert await outbox_rows(db_session) == []
+
+
+async def test_deliver_batch_marks_messages_sent(db_session):
+    await queue_messages(db_session, 3)
+    email_service = AsyncMock()
+    claimed = await EmailOutboxService.deliver_batch(AsyncTestingSessionLocal, email_service)
+    assert claimed == 3
+    assert email_service.send_user_email.await_count == 3
+    rows = await outbox_rows(db_session)
+    assert {row.status for row in rows} == {EmailOutbox.SENT}
+    assert all(row.sent_at is not None and row.attempts == 1 for row in rows)
+    # The verification link is not kept once delivered
+    assert all(row.payload == {} for row in rows)
+    assert await EmailOutboxService.deliver_batch(AsyncTestingSessionLocal, email_service) == 0
+
+
+async def test_failed_delivery_is_retried_with_backoff(db_session, monkeypatch):
+    monkeypatch.setattr(settings, "email_outbox_max_attempts", 2)
+    await queue_messages(db_session, 1)
+    email_service = AsyncMock()
+    email_service.send_user_email.side_effect = ConnectionError("smtp down")
+
+    await EmailOutboxService.deliver_batch(AsyncTestingSessionLocal, email_service)
+    [row] = await outbox_rows(db_session)
+    assert (row.status, row.attempts, row.last_error) == (EmailOutbox.PENDING, 1, "smtp down")
+    assert row.next_attempt_at > datetime.now(timezone.utc)
+    # Not due yet, so nothing is claimed
+    assert await EmailOutboxService.deliver_batch(AsyncTestingSessionLocal, email_service) == 0
+
+    row.next_attempt_at = datetime.now(timezone.utc)
+    await db_session.commit()
+    await EmailOutboxService.deliver_batch(AsyncTestingSessionLocal, email_service)
+    [row] = await outbox_rows(db_session)
+    assert (row.status, row.attempts, row.payload) == (EmailOutbox.FAILED, 2, {})
+
+
+async def test_claim_skips_rows_locked_by_another_worker(db_session):
+    await queue_messages(db_session, 4)
+    async with AsyncTestingSessionLocal() as other_worker:
+        async with AsyncTestingSessionLocal() as session:
+            first = await EmailOutboxService.claim_batch(session, 2, 60)
+        # Hold row locks on the remaining messages as if another worker were mid-claim
+        locked = await other_worker.execute(select(EmailOutbox.id).where(EmailOutbox.attempts == 0).with_for_update())
+        assert len(locked.all()) == 2
+        async with AsyncTestingSessionLocal() as session:
+            assert await EmailOutboxService.claim_batch(session, 10, 60) == []
+        await other_worker.rollback()
+    async with AsyncTestingSessionLocal() as session:
+        second = await EmailOutboxService.claim_batch(session, 10, 60)
+    assert len(first) == 2 and len(second) == 2
+    assert not {row.id for row in first} & {row.id for row in second}
+
+
+async def test_purge_sent_deletes_only_old_sent_messages(db_session):
+    await queue_messages(db_session, 3)
+    await EmailOutboxService.deliver_batch(AsyncTestingSessionLocal, AsyncMock())
+    old, recent, pending = await outbox_rows(db_session)
+    old.sent_at = datetime.now(timezone.utc) - timedelta(hours=48)
+    pending.status = EmailOutbox.PENDING
+    pending.sent_at = old.sent_at
+    await db_session.commit()
+    async with AsyncTestingSessionLocal() as session:
+        assert await EmailOutboxService.purge_sent(session, retention_hours=24) == 1
+    assert [row.recipient for row in await outbox_rows(db_session)] == ["to1@example.com", "to2@example.com"]
+
+
+async def test_backoff_doubles_up_to_cap():
+    assert [EmailOutboxService.backoff_seconds(attempt, 5, 30) for attempt in range(1, 6)] == [5, 10, 20, 30, 30]
+
+
+async def test_worker_drains_outbox(db_session, monkeypatch):
+    monkeypatch.setattr(settings, "email_outbox_poll_interval_seconds", 0.01)
+    await queue_messages(db_session, 5)
+    email_service = AsyncMock()
+    worker = EmailOutboxWorker(AsyncTestingSessionLocal, email_service, settings)
+    worker.start()
+    try:
+        for _ in range(200):
+            async with AsyncTestingSessionLocal() as session:
+                if await EmailOutboxService.pending_count(session) == 0:
+                    break
+            await asyncio.sleep(0.01)
+    finally:
+        await worker.stop()
+    assert email_service.send_user_email.await_count == 5
+    async with AsyncTestingSessionLocal() as session:
+        assert await EmailOutboxService.pending_count(session) == 0
@@ -0,0 +1,39 @@
+from datetime import timedelta
+import time
+import jwt
+from app.services.jwt_service import TokenVerifier, create_access_token
+from settings.config import settings
+
+
+def make_verifier(cache_size=16):
+    return TokenVerifier(settings.jwt_secret_key, settings.jwt_algorithm, cache_size)
+
+
+def test_repeated_token_is_verified_once(monkeypatch):
+    verifier = make_verifier()
+    token = create_access_token(data={"sub": "someone", "role": "admin"})
+    first = verifier.decode(token)
+    monkeypatch.setattr(verifier._jwt, "decode", lambda *args, **kwargs: (_ for _ in ()).throw(AssertionError("re-verified")))
+    second = verifier.decode(token)
+    assert first == second and first["role"] == "ADMIN"
+    # Callers get their own copy of the cached claims
+    second["role"] = "MANAGER"
+    assert verifier.decode(token)["role"] == "ADMIN"
+    assert verifier.stats()["hits"] == 2
+
+
+def test_cached_token_expires_with_exp():
+    verifier = make_verifier()
+    token = create_access_token(data={"sub": "someone"}, expires_delta=timedelta(seconds=1))
+    assert verifier.decode(token) is not None
+    time.sleep(1.1)
+    assert verifier.decode(token) is None
+    assert verifier.stats()["expirations"] == 1
+
+
+def test_invalid_tokens_are_rejected_and_not_cached():
+    verifier = make_verifier()
+    forged = jwt.encode({"sub": "someone", "exp": int(time.time()) + 60}, "another_secret_key_of_enough_length", algorithm="HS256")
+    assert verifier.decode(forged) is None
+    assert verifier.decode("not-a-token") is None
+    assert verifier.stats()["size"] == 0
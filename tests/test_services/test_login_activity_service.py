@@ -0,0 +1,67 @@
+from builtins import range
+from datetime import datetime, timedelta, timezone
+import pytest
+from sqlalchemy import select
+from app.models.user_model import User
+from app.services import login_activity_service
+from app.services.login_activity_service import LastLoginRecorder, start_last_login_recorder, stop_last_login_recorder
+from app.services.user_service import UserService
+from settings.config import settings
+from tests.conftest import AsyncTestingSessionLocal
+
+pytestmark = pytest.mark.asyncio
+
+
+async def stored_last_login(db_session, user_id):
+    db_session.expire_all()
+    result = await db_session.execute(select(User.last_login_at).where(User.id == user_id))
+    return result.scalar_one()
+
+
+async def test_flush_writes_latest_timestamp_per_user(db_session, verified_user, user):
+    verified_user_id, user_id, version = verified_user.id, user.id, verified_user.version
+    recorder = LastLoginRecorder(AsyncTestingSessionLocal, flush_interval_seconds=60)
+    first = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    for minutes in range(5):
+        recorder.record(verified_user.id, first + timedelta(minutes=minutes))
+    recorder.record(user.id, first)
+    assert recorder.stats() == {"pending": 2, "recorded": 6, "written": 0}
+
+    assert await recorder.flush() == 2
+    assert await stored_last_login(db_session, verified_user_id) == first + timedelta(minutes=4)
+    assert await stored_last_login(db_session, user_id) == first
+    # The user's ETag is unaffected
+    assert (await db_session.execute(select(User.version).where(User.id == verified_user_id))).scalar_one() == version
+    assert await recorder.flush() == 0
+    assert recorder.stats()["written"] == 2
+
+
+async def test_failed_flush_keeps_timestamps(verified_user):
+    def broken_factory():
+        raise RuntimeError("database unavailable")
+    recorder = LastLoginRecorder(broken_factory, flush_interval_seconds=60)
+    at = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    recorder.record(verified_user.id, at)
+    with pytest.raises(RuntimeError):
+        await recorder.flush()
+    assert recorder.stats()["pending"] == 1
+
+
+async def test_login_defers_last_login_write_to_recorder(db_session, verified_user):
+    user_id = verified_user.id
+    recorder = start_last_login_recorder(AsyncTestingSessionLocal, settings)
+    try:
+        logged_in_user = await UserService.login_user(db_session, verified_user.email, "MySuperPassword$1234")
+        assert logged_in_user is not None
+        assert not db_session.dirty
+        assert recorder.stats()["pending"] == 1
+        assert await stored_last_login(db_session, user_id) is None
+    finally:
+        await stop_last_login_recorder()
+    assert login_activity_service.get_last_login_recorder() is None
+    assert await stored_last_login(db_session, user_id) is not None
+
+
+async def test_recorder_disabled_by_zero_interval(monkeypatch):
+    monkeypatch.setattr(settings, "login_write_behind_seconds", 0)
+    assert start_last_login_recorder(AsyncTestingSessionLocal, settings) is None
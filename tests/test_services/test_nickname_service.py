@@ -0,0 +1,55 @@
+from builtins import iter, len, range, set
+import pytest
+from app.database import count_queries
+from app.models.user_model import User
+from app.services.nickname_service import NicknameExhaustedError, NicknameService
+from app.services.user_service import UserService
+from app.utils import nickname_gen
+from app.utils.nickname_gen import NicknameGenerator
+from settings.config import settings
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture
+def tiny_space(tmp_path, monkeypatch):
+    """A two-name nickname space so collisions are certain."""
+    (tmp_path / "adjectives.txt").write_text("calm\n")
+    (tmp_path / "animals.txt").write_text("otter\n")
+    generator = NicknameGenerator(tmp_path, number_max=1)
+    monkeypatch.setattr(nickname_gen, "_generator", generator)
+    return generator
+
+
+async def test_create_retries_taken_nickname(db_session, tiny_space, email_service):
+    db_session.add(User(nickname="calm_otter_0", email="taken@example.com", hashed_password="x"))
+    await db_session.commit()
+    checked, collisions = NicknameService.candidates_checked, NicknameService.collisions
+    tiny_space.generate = iter(["calm_otter_0", "calm_otter_1"]).__next__
+    with count_queries() as counter:
+        user = await UserService.create(db_session, {"email": "second@example.com", "password": "ValidPassword123!"}, email_service)
+    assert user.nickname == "calm_otter_1"
+    # Insert, email check after the conflict, insert again
+    assert counter.queries == 3
+    assert NicknameService.candidates_checked - checked == 2
+    assert NicknameService.collisions - collisions == 1
+
+
+async def test_create_gives_up_when_space_is_full(db_session, tiny_space, email_service):
+    for number in range(2):
+        db_session.add(User(nickname=f"calm_otter_{number}", email=f"taken{number}@example.com", hashed_password="x"))
+    await db_session.commit()
+    exhausted = NicknameService.exhausted
+    with count_queries() as counter:
+        with pytest.raises(NicknameExhaustedError):
+            await UserService.create(db_session, {"email": "full@example.com", "password": "ValidPassword123!"}, email_service)
+    assert counter.queries == 2 * settings.nickname_max_queries
+    assert NicknameService.exhausted == exhausted + 1
+
+
+async def test_generator_loads_bundled_word_lists():
+    generator = NicknameGenerator()
+    assert len(generator.adjectives) >= 200 and len(generator.animals) >= 200
+    candidates = generator.candidates(50)
+    assert len(set(candidates)) == 50
+    assert all(nickname.count("_") == 2 for nickname in candidates)
@@ -0,0 +1,77 @@
+from builtins import range, sum
+import asyncio
+import pytest
+from sqlalchemy import select
+from app.models.rate_limit_model import RateLimitBucket
+from app.services.rate_limit_service import PostgresRateLimitBackend, RateLimiter
+from app.utils.rate_limit import MemoryRateLimitBackend, RateLimit
+from tests.conftest import AsyncTestingSessionLocal
+
+pytestmark = pytest.mark.asyncio
+
+
+def postgres_backend():
+    return PostgresRateLimitBackend(AsyncTestingSessionLocal)
+
+
+@pytest.mark.parametrize("algorithm", ["token_bucket", "sliding_window"])
+async def test_postgres_backend_enforces_the_limit(db_session, algorithm):
+    backend = postgres_backend()
+    rate_limit = RateLimit("ip", 3, 3600.0, algorithm)
+    decisions = [await backend.hit("login:ip:10.0.0.1", rate_limit) for _ in range(4)]
+    assert [decision.allowed for decision in decisions] == [True, True, True, False]
+    # A full sliding window only frees up once it has become the previous window and partly decayed
+    assert 0 < decisions[-1].retry_after <= 2 * 3600
+    # Another key has a bucket of its own
+    assert (await backend.hit("login:ip:10.0.0.2", rate_limit)).allowed
+
+
+async def test_postgres_token_bucket_retry_after_matches_the_refill_rate(db_session):
+    backend = postgres_backend()
+    rate_limit = RateLimit("email", 2, 120.0, "token_bucket")
+    await backend.hit("bucket", rate_limit)
+    await backend.hit("bucket", rate_limit)
+    decision = await backend.hit("bucket", rate_limit)
+    assert not decision.allowed
+    assert decision.retry_after == pytest.approx(60.0, abs=1.0)
+
+
+@pytest.mark.parametrize("algorithm", ["token_bucket", "sliding_window"])
+async def test_postgres_backend_is_exact_under_concurrency(db_session, algorithm):
+    backend = postgres_backend()
+    rate_limit = RateLimit("ip", 5, 3600.0, algorithm)
+    decisions = await asyncio.gather(*(backend.hit("shared", rate_limit) for _ in range(20)))
+    assert sum(decision.allowed for decision in decisions) == 5
+
+
+async def test_postgres_backend_purges_expired_buckets(db_session):
+    backend = postgres_backend()
+    await backend.hit("short-lived", RateLimit("ip", 1, 0.01, "token_bucket"))
+    await asyncio.sleep(0.05)
+    backend._next_purge = 0
+    await backend.hit("other", RateLimit("ip", 1, 60.0, "token_bucket"))
+    result = await db_session.execute(select(RateLimitBucket.key))
+    assert result.scalars().all() == ["other"]
+
+
+async def test_postgres_backend_lets_requests_through_when_the_database_fails():
+    def broken_session():
+        raise ConnectionError("database is down")
+    backend = PostgresRateLimitBackend(broken_session)
+    assert (await backend.hit("bucket", RateLimit("ip", 1, 60.0, "token_bucket"))).allowed
+    assert backend.stats()["errors"] == 1
+
+
+async def test_limiter_applies_every_limit_of_a_policy():
+    limiter = RateLimiter(MemoryRateLimitBackend(100), {
+        "login": [RateLimit("ip", 10, 60.0, "sliding_window"), RateLimit("email", 2, 60.0, "token_bucket")],
+    })
+    for _ in range(2):
+        assert (await limiter.check("login", {"ip": "10.0.0.1", "email": "a@example.com"})).allowed
+    assert not (await limiter.check("login", {"ip": "10.0.0.2", "email": "a@example.com"})).allowed
+    # Missing keys and unknown policies are not limited
+    assert (await limiter.check("login", {"ip": "10.0.0.1", "email": None})).allowed
+    assert (await limiter.check("register", {"ip": "10.0.0.1"})).allowed
+    stats = limiter.stats()
+    assert stats["backend"] == "memory"
+    assert stats["policies"]["login"] == {"limits": ["ip:10/60:sliding_window", "email:2/60:token_bucket"], "allowed": 3, "rejected": 1}
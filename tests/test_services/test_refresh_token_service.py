@@ -0,0 +1,110 @@
+from builtins import len
+from datetime import datetime, timedelta, timezone
+import pytest
+from sqlalchemy import select, update
+from app.models.refresh_token_model import RefreshToken
+from app.models.user_model import User
+from app.services.refresh_token_service import RefreshOutcome, RefreshTokenService
+from app.services.user_cache import get_user_cache
+from app.services.user_service import UserService
+from tests.conftest import AsyncTestingSessionLocal
+
+pytestmark = pytest.mark.asyncio
+
+
+async def family_rows(db_session, user_id):
+    db_session.expire_all()
+    result = await db_session.execute(select(RefreshToken).where(RefreshToken.user_id == user_id))
+    return result.scalars().all()
+
+
+async def test_only_the_hash_is_stored(db_session, verified_user):
+    user_id = verified_user.id
+    token = RefreshTokenService.issue(db_session, user_id)
+    await db_session.commit()
+    (row,) = await family_rows(db_session, user_id)
+    assert row.token_hash == RefreshTokenService.hash_token(token)
+    assert token not in row.token_hash
+
+
+async def test_rotate_issues_a_successor_in_the_same_family(db_session, verified_user):
+    user_id = verified_user.id
+    token = RefreshTokenService.issue(db_session, user_id)
+    await db_session.commit()
+    outcome, user, successor = await RefreshTokenService.rotate(db_session, token)
+    assert outcome is RefreshOutcome.ROTATED
+    assert user.id == user_id
+    await db_session.commit()
+    assert successor != token
+    rows = await family_rows(db_session, user_id)
+    assert len(rows) == 2
+    assert len({row.family_id for row in rows}) == 1
+    outcome, _, _ = await RefreshTokenService.rotate(db_session, successor)
+    assert outcome is RefreshOutcome.ROTATED
+
+
+async def test_reuse_revokes_the_family(db_session, verified_user):
+    user_id = verified_user.id
+    token = RefreshTokenService.issue(db_session, user_id)
+    await db_session.commit()
+    _, _, successor = await RefreshTokenService.rotate(db_session, token)
+    await db_session.commit()
+    outcome, user, new_token = await RefreshTokenService.rotate(db_session, token)
+    assert (outcome, user, new_token) == (RefreshOutcome.REUSED, None, None)
+    # The legitimate holder's successor is revoked as well
+    outcome, _, _ = await RefreshTokenService.rotate(db_session, successor)
+    assert outcome is RefreshOutcome.INVALID
+    assert all(row.revoked_at is not None for row in await family_rows(db_session, user_id))
+
+
+async def test_other_families_survive_a_reuse(db_session, verified_user):
+    user_id = verified_user.id
+    stolen = RefreshTokenService.issue(db_session, user_id)
+    other_device = RefreshTokenService.issue(db_session, user_id)
+    await db_session.commit()
+    await RefreshTokenService.rotate(db_session, stolen)
+    await db_session.commit()
+    assert (await RefreshTokenService.rotate(db_session, stolen))[0] is RefreshOutcome.REUSED
+    assert (await RefreshTokenService.rotate(db_session, other_device))[0] is RefreshOutcome.ROTATED
+
+
+async def test_expired_and_unknown_tokens_are_invalid(db_session, verified_user):
+    user_id = verified_user.id
+    token = RefreshTokenService.issue(db_session, user_id)
+    await db_session.commit()
+    await db_session.execute(
+        update(RefreshToken)
+        .where(RefreshToken.user_id == user_id)
+        .values(expires_at=datetime.now(timezone.utc) - timedelta(minutes=1))
+    )
+    await db_session.commit()
+    assert (await RefreshTokenService.rotate(db_session, token))[0] is RefreshOutcome.INVALID
+    assert (await RefreshTokenService.rotate(db_session, "not-a-token"))[0] is RefreshOutcome.INVALID
+    # Rejected, not consumed: an expired token is never mistaken for reuse
+    (row,) = await family_rows(db_session, user_id)
+    assert row.used_at is None and row.revoked_at is None
+
+
+async def test_locked_user_cannot_refresh(db_session, locked_user):
+    user_id = locked_user.id
+    token = RefreshTokenService.issue(db_session, user_id)
+    await db_session.commit()
+    outcome, user, new_token = await RefreshTokenService.rotate(db_session, token)
+    assert (outcome, user, new_token) == (RefreshOutcome.LOCKED, None, None)
+    (row,) = await family_rows(db_session, user_id)
+    assert row.revoked_at is not None
+
+
+async def test_lock_is_seen_while_the_user_is_cached(db_session, verified_user):
+    user_id = verified_user.id
+    token = RefreshTokenService.issue(db_session, user_id)
+    await db_session.commit()
+    async with AsyncTestingSessionLocal() as session:
+        await UserService.get_by_id(session, user_id)
+    # Locked by another worker, whose invalidation never reaches this process's cache
+    async with AsyncTestingSessionLocal() as session:
+        await session.execute(update(User).where(User.id == user_id).values(is_locked=True))
+        await session.commit()
+    assert get_user_cache().get("id", user_id)["is_locked"] is False
+    outcome, user, new_token = await RefreshTokenService.rotate(db_session, token)
+    assert (outcome, user, new_token) == (RefreshOutcome.LOCKED, None, None)
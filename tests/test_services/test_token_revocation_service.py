@@ -0,0 +1,119 @@
+from datetime import datetime, timedelta, timezone
+import time
+import pytest
+from app.models.revoked_token_model import RevokedToken
+from app.services.jwt_service import TokenVerifier, create_access_token, decode_token
+from app.services.token_revocation_service import RevocationSyncer, TokenRevocationService, configure_revocation_table
+from settings.config import settings
+from tests.conftest import AsyncTestingSessionLocal
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_revoked_token_is_refused_even_when_cached(db_session):
+    verifier = TokenVerifier(settings.jwt_secret_key, settings.jwt_algorithm, 16)
+    token = create_access_token(data={"sub": "someone@example.com", "role": "authenticated"})
+    claims = verifier.decode(token)
+    assert claims is not None and verifier.stats()["size"] == 1
+    await TokenRevocationService.revoke_token(db_session, claims)
+    assert verifier.decode(token) is None
+    # Other tokens of the same user are unaffected
+    assert verifier.decode(create_access_token(data={"sub": "someone@example.com", "role": "authenticated"})) is not None
+
+
+async def test_subject_revocation_spares_later_tokens(db_session):
+    before = create_access_token(data={"sub": "someone@example.com", "role": "authenticated"})
+    await TokenRevocationService.revoke_subject(db_session, "someone@example.com")
+    assert decode_token(before) is None
+    # Tokens carry whole-second iat; one issued in a later second is new
+    time.sleep(1.1)
+    after = create_access_token(data={"sub": "someone@example.com", "role": "authenticated"})
+    assert decode_token(after) is not None
+
+
+async def test_user_revocation_covers_both_subject_forms(db_session, verified_user):
+    by_email = create_access_token(data={"sub": verified_user.email, "role": "authenticated"})
+    by_id = create_access_token(data={"sub": str(verified_user.id), "role": "authenticated"})
+    await TokenRevocationService.revoke_user(db_session, verified_user)
+    assert decode_token(by_email) is None
+    assert decode_token(by_id) is None
+
+
+async def test_revocations_are_persisted(db_session):
+    claims = decode_token(create_access_token(data={"sub": "someone@example.com", "role": "authenticated"}))
+    await TokenRevocationService.revoke_token(db_session, claims)
+    await db_session.commit()
+    stored = await db_session.get(RevokedToken, 1)
+    assert stored.key == f"jti:{claims['jti']}"
+    assert stored.issued_before is None
+
+
+async def test_syncer_mirrors_revocations_made_elsewhere(db_session, tmp_path):
+    token = create_access_token(data={"sub": "someone@example.com", "role": "authenticated"})
+    jti = decode_token(token)["jti"]
+    expires_at = datetime.now(timezone.utc) + timedelta(minutes=5)
+    # Rows written by workers on another host, one of them long expired
+    db_session.add(RevokedToken(key="jti:old", expires_at=datetime.now(timezone.utc) - timedelta(minutes=5)))
+    db_session.add(RevokedToken(key=f"jti:{jti}", expires_at=expires_at))
+    await db_session.commit()
+    assert decode_token(token) is not None
+
+    syncer = RevocationSyncer(AsyncTestingSessionLocal, interval_seconds=1, batch_size=1)
+    assert await syncer.sync() == 1
+    assert decode_token(token) is None
+    # Incremental: nothing new, nothing re-read
+    assert await syncer.sync() == 0
+
+    db_session.add(RevokedToken(key="sub:other@example.com", issued_before=datetime.now(timezone.utc), expires_at=expires_at))
+    await db_session.commit()
+    assert await syncer.sync() == 1
+    assert syncer.stats()["synced"] == 2
+
+
+async def test_syncer_picks_up_revocations_committed_out_of_order(db_session):
+    tokens = [create_access_token(data={"sub": "someone@example.com", "role": "authenticated"}) for _ in range(2)]
+    first, second = (f"jti:{decode_token(token)['jti']}" for token in tokens)
+    expires_at = datetime.now(timezone.utc) + timedelta(minutes=5)
+    syncer = RevocationSyncer(AsyncTestingSessionLocal, interval_seconds=1)
+    await syncer.sync()
+    async with AsyncTestingSessionLocal() as slow, AsyncTestingSessionLocal() as fast:
+        # The lower id is taken first but its transaction commits after the higher one
+        slow.add(RevokedToken(key=first, expires_at=expires_at))
+        await slow.flush()
+        fast.add(RevokedToken(key=second, expires_at=expires_at))
+        await fast.commit()
+        assert await syncer.sync() == 1
+        assert decode_token(tokens[0]) is not None and decode_token(tokens[1]) is None
+        assert syncer.stats()["gaps"] == 1
+        await slow.commit()
+    assert await syncer.sync() == 1
+    assert decode_token(tokens[0]) is None
+    assert syncer.stats()["gaps"] == 0
+
+
+async def test_gaps_left_by_rollbacks_are_given_up(db_session):
+    expires_at = datetime.now(timezone.utc) + timedelta(minutes=5)
+    syncer = RevocationSyncer(AsyncTestingSessionLocal, interval_seconds=1, gap_seconds=0, max_gaps=3)
+    await syncer.sync()
+    async with AsyncTestingSessionLocal() as aborted:
+        aborted.add_all([RevokedToken(key=f"jti:aborted-{i}", expires_at=expires_at) for i in range(5)])
+        await aborted.flush()
+        await aborted.rollback()
+    db_session.add(RevokedToken(key="jti:kept", expires_at=expires_at))
+    await db_session.commit()
+    assert await syncer.sync() == 1
+    # Only the newest skipped ids are tracked
+    assert syncer.stats()["gaps"] == 3
+    # Past `gap_seconds` they are dropped without another lookup
+    assert await syncer.sync() == 0
+    assert syncer.stats()["gaps"] == 0
+
+
+async def test_a_fresh_worker_loads_existing_revocations(db_session, tmp_path):
+    token = create_access_token(data={"sub": "someone@example.com", "role": "authenticated"})
+    await TokenRevocationService.revoke_token(db_session, decode_token(token))
+    await db_session.commit()
+    configure_revocation_table(settings.model_copy(update={"token_revocation_path": str(tmp_path / "new-host")}))
+    assert decode_token(token) is not None
+    await RevocationSyncer(AsyncTestingSessionLocal, interval_seconds=1).sync()
+    assert decode_token(token) is None
@@ -0,0 +1,84 @@
+import pytest
+from sqlalchemy import inspect
+from app.database import Replica, count_queries
+from app.services.user_cache import get_user_cache
+from app.services.user_service import UserService
+from tests.conftest import AsyncTestingSessionLocal, engine
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_repeated_lookups_are_served_from_cache(db_session, verified_user):
+    user_id, email, nickname = verified_user.id, verified_user.email, verified_user.nickname
+    hits = get_user_cache().hits
+    async with AsyncTestingSessionLocal() as session:
+        with count_queries() as counter:
+            assert (await UserService.get_by_id(session, user_id)).email == email
+            assert (await UserService.get_by_email(session, email)).id == user_id
+            assert (await UserService.get_by_nickname(session, nickname)).id == user_id
+    assert counter.queries == 1
+    assert get_user_cache().hits == hits + 2
+
+
+async def test_cached_copies_leave_out_secrets(db_session, verified_user):
+    user_id = verified_user.id
+    await UserService.get_by_id(db_session, user_id)
+    async with AsyncTestingSessionLocal() as session:
+        cached = await UserService.get_by_id(session, user_id)
+        assert "hashed_password" not in inspect(cached).dict
+        assert "verification_token" not in inspect(cached).dict
+        with_secrets = await UserService.get_by_id(session, user_id, with_secrets=True)
+        assert with_secrets.hashed_password
+
+
+async def test_rows_read_on_a_replica_are_not_cached(db_session, verified_user):
+    user_id = verified_user.id
+    replica = Replica("r1", engine)
+    async with replica.session_factory() as session:
+        assert (await UserService.get_by_id(session, user_id)).id == user_id
+    assert get_user_cache().get("id", user_id) is None
+    async with AsyncTestingSessionLocal() as session:
+        with count_queries() as counter:
+            await UserService.get_by_id(session, user_id)
+    assert counter.queries == 1
+    assert get_user_cache().get("id", user_id) is not None
+
+
+async def test_update_invalidates_cached_user(db_session, verified_user):
+    user_id, old_email = verified_user.id, verified_user.email
+    async with AsyncTestingSessionLocal() as session:
+        await UserService.get_by_id(session, user_id)
+        await UserService.update(session, user_id, {"email": "moved@example.com"})
+        await session.commit()
+    async with AsyncTestingSessionLocal() as session:
+        assert (await UserService.get_by_id(session, user_id)).email == "moved@example.com"
+        assert await UserService.get_by_email(session, old_email) is None
+
+
+async def test_rolled_back_changes_never_reach_the_cache(db_session, verified_user):
+    user_id, first_name = verified_user.id, verified_user.first_name
+    async with AsyncTestingSessionLocal() as session:
+        await UserService.update(session, user_id, {"first_name": "Uncommitted"})
+        await UserService.get_by_id(session, user_id)
+        await session.rollback()
+    async with AsyncTestingSessionLocal() as session:
+        assert (await UserService.get_by_id(session, user_id)).first_name == first_name
+
+
+async def test_delete_invalidates_cached_user(db_session, verified_user):
+    user_id = verified_user.id
+    async with AsyncTestingSessionLocal() as session:
+        await UserService.get_by_id(session, user_id)
+        assert await UserService.delete(session, user_id)
+        await session.commit()
+    async with AsyncTestingSessionLocal() as session:
+        assert await UserService.get_by_id(session, user_id) is None
+
+
+async def test_failed_login_invalidates_cached_user(db_session, verified_user):
+    user_id, email = verified_user.id, verified_user.email
+    await UserService.get_by_id(db_session, user_id)
+    async with AsyncTestingSessionLocal() as session:
+        await UserService.login_user(session, email, "wrongpassword")
+    async with AsyncTestingSessionLocal() as session:
+        assert (await UserService.get_by_id(session, user_id)).failed_login_attempts == 1
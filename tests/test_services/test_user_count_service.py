@@ -0,0 +1,61 @@
+import pytest
+from sqlalchemy import text
+from app.models.user_model import User
+from app.services import user_count_service
+from app.services.user_count_service import (
+    CachedCountStrategy, EstimatedCountStrategy, ExactCountStrategy, WindowCountStrategy, configure_user_count_strategy
+)
+from app.services.user_service import UserService
+from settings.config import Settings
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture
+def count_strategy():
+    previous = user_count_service._strategy
+    def use(name, **overrides):
+        return configure_user_count_strategy(Settings(user_count_strategy=name, **overrides))
+    yield use
+    user_count_service._strategy = previous
+
+
+async def test_exact_count(db_session, users_with_same_role_50_users):
+    assert await ExactCountStrategy().count(db_session) == (50, True)
+
+
+async def test_cached_count_until_invalidated(db_session, users_with_same_role_50_users, count_strategy):
+    strategy = count_strategy("cached", user_count_cache_ttl_seconds=60)
+    assert await strategy.count(db_session) == (50, True)
+    await UserService.delete(db_session, users_with_same_role_50_users[0].id)
+    # delete() invalidates the cache, so the next count goes back to the database
+    assert await strategy.count(db_session) == (49, True)
+    db_session.add(User(nickname="outside_write", email="outside@example.com", hashed_password="x"))
+    await db_session.commit()
+    assert await strategy.count(db_session) == (49, False)
+
+
+async def test_estimated_count_uses_planner_for_large_tables(db_session, users_with_same_role_50_users):
+    await db_session.execute(text("ANALYZE users"))
+    total, exact = await EstimatedCountStrategy(threshold=10).count(db_session)
+    assert exact is False
+    assert total == 50
+
+
+async def test_estimated_count_falls_back_to_exact_below_threshold(db_session, users_with_same_role_50_users):
+    assert await EstimatedCountStrategy(threshold=1000).count(db_session) == (50, True)
+
+
+async def test_window_count_from_page_query(db_session, users_with_same_role_50_users, count_strategy):
+    count_strategy("window")
+    users, user_count = await UserService.list_users_page(db_session, skip=10, limit=5)
+    assert len(users) == 5
+    assert user_count == (50, True)
+    users, user_count = await UserService.list_users_page(db_session, skip=100, limit=5)
+    assert users == []
+    assert user_count == (50, True)
+
+
+def test_unknown_strategy(count_strategy):
+    with pytest.raises(ValueError):
+        count_strategy("guess")
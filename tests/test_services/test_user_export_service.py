@@ -0,0 +1,20 @@
+import json
+import pytest
+from app.services.user_export_service import EXPORT_FIELDS, UserExportService
+from tests.conftest import AsyncTestingSessionLocal
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_stream_yields_one_chunk_per_batch(users_with_same_role_50_users):
+    query = UserExportService.build_query()
+    chunks = [chunk async for chunk in UserExportService.stream(AsyncTestingSessionLocal, query, "ndjson", batch_size=20)]
+    assert [chunk.count(b"\n") for chunk in chunks] == [20, 20, 10]
+    first = json.loads(chunks[0].splitlines()[0])
+    assert tuple(first) == EXPORT_FIELDS
+
+
+async def test_stream_csv_header_only_when_empty(users_with_same_role_50_users):
+    query = UserExportService.build_query(is_locked=True)
+    chunks = [chunk async for chunk in UserExportService.stream(AsyncTestingSessionLocal, query, "csv")]
+    assert b"".join(chunks).decode().strip() == ",".join(EXPORT_FIELDS)
@@ -1,9 +1,13 @@
 from builtins import range
+import asyncio
+import uuid
 import pytest
-from sqlalchemy import select
+from sqlalchemy import func, select
+from app.database import count_queries
 from app.dependencies import get_settings
 from app.models.user_model import User
-from app.services.user_service import UserService
+from app.services.user_service import DuplicateEmailError, LoginOutcome, UniqueFieldConflictError, UserService, VersionConflictError
+from tests.conftest import AsyncTestingSessionLocal
 
 pytestmark = pytest.mark.asyncio
 
@@ -35,7 +39,7 @@ async def test_get_by_id_user_exists(db_session, user):
 
 # Test fetching a user by ID when the user does not exist
 async def test_get_by_id_user_does_not_exist(db_session):
-    non_existent_user_id = "non-existent-id"
+    non_existent_user_id = uuid.uuid4()
     retrieved_user = await UserService.get_by_id(db_session, non_existent_user_id)
     assert retrieved_user is None
 
@@ -81,8 +85,9 @@ async def another_user(db_session):
 # Test updating a user with duplicate nickname
 async def test_update_user_duplicate_nickname(db_session, user, another_user):
     # Try to update 'user' to have the same nickname as 'another_user'
-    updated_user = await UserService.update(db_session, user.id, {"nickname": another_user.nickname})
-    assert updated_user is None
+    with pytest.raises(UniqueFieldConflictError):
+        await UserService.update(db_session, user.id, {"nickname": another_user.nickname})
+    await db_session.rollback()
 
 # Test creating a user with weak password
 async def test_create_user_weak_password(db_session, email_service):
@@ -111,7 +116,7 @@ async def test_delete_user_exists(db_session, user):
 
 # Test attempting to delete a user who does not exist
 async def test_delete_user_does_not_exist(db_session):
-    non_existent_user_id = "non-existent-id"
+    non_existent_user_id = uuid.uuid4()
     deletion_success = await UserService.delete(db_session, non_existent_user_id)
     assert deletion_success is False
 
@@ -198,7 +203,7 @@ import pytest
 from unittest.mock import AsyncMock, patch, MagicMock
 from pydantic import ValidationError
 from sqlalchemy.exc import SQLAlchemyError
-from app.services.user_service import UserService
+from app.services.user_service import UniqueFieldConflictError, UserService
 from app.schemas.user_schemas import UserCreate, UserUpdate
 
 from pydantic import ValidationError
@@ -227,30 +232,32 @@ async def test_update_user_password_validation_error(db_session, user):
 
 @pytest.mark.asyncio
 async def test_update_user_nickname_duplicate(db_session, user, another_user):
-    # Patch get_by_nickname to return a different user
-    with patch('app.services.user_service.UserService.get_by_nickname', new=AsyncMock(return_value=another_user)):
-        updated = await UserService.update(db_session, user.id, {'nickname': another_user.nickname})
-    assert updated is None
+    # No pre-check: the unique index rejects the UPDATE itself
+    user_id, nickname = user.id, another_user.nickname
+    await db_session.flush()
+    with count_queries() as counter:
+        with pytest.raises(UniqueFieldConflictError) as conflict:
+            await UserService.update(db_session, user_id, {'nickname': nickname})
+    assert conflict.value.fields == ["nickname"]
+    assert counter.queries == 1
+    await db_session.rollback()
 
 @pytest.mark.asyncio
-async def test_update_user_general_exception(db_session, user):
-    # Patch update to raise Exception
-    with patch('app.services.user_service.update', side_effect=Exception('unexpected')):
-        with patch('app.services.user_service.UserUpdate', return_value=UserUpdate(email='test@example.com')):
-            updated = await UserService.update(db_session, user.id, {'email': 'test@example.com'})
-    # Should handle and return None
-    assert updated is None
+async def test_update_user_db_error_propagates(db_session, user):
+    # Not reported as a missing user: get_db rolls the unit of work back and the app answers 500
+    with patch.object(db_session, 'execute', new=AsyncMock(side_effect=SQLAlchemyError('db error'))):
+        with pytest.raises(SQLAlchemyError):
+            await UserService.update(db_session, user.id, {'first_name': 'Renamed'})
 
 @pytest.mark.asyncio
-async def test_execute_query_db_error(db_session):
-    # Patch session.execute to raise SQLAlchemyError
+async def test_execute_query_db_error_propagates(db_session):
+    # The request's unit of work (get_db) rolls back; the service must not discard earlier writes itself
     session = MagicMock()
     session.execute = AsyncMock(side_effect=SQLAlchemyError('db error'))
     session.rollback = AsyncMock()
-    session.commit = AsyncMock()
-    result = await UserService._execute_query(session, MagicMock())
-    assert result is None
-    session.rollback.assert_called()
+    with pytest.raises(SQLAlchemyError):
+        await UserService._execute_query(session, MagicMock())
+    session.rollback.assert_not_called()
 
 @pytest.mark.asyncio
 async def test_delete_user_not_found(db_session):
@@ -262,20 +269,23 @@ async def test_delete_user_not_found(db_session):
 @pytest.mark.asyncio
 async def test_delete_user_success(db_session, user):
     # Patch get_by_id to return a user
-    with patch('app.services.user_service.UserService.get_by_id', new=AsyncMock(return_value=user)):
-        db_session.delete = AsyncMock()
-        db_session.commit = AsyncMock()
+    # db_session comes from a scoped session shared across tests, so patch its methods only for this test
+    with patch('app.services.user_service.UserService.get_by_id', new=AsyncMock(return_value=user)), \
+            patch.object(db_session, 'delete', new=AsyncMock()) as delete, \
+            patch.object(db_session, 'flush', new=AsyncMock()) as flush, \
+            patch.object(db_session, 'commit', new=AsyncMock()) as commit:
         result = await UserService.delete(db_session, user.id)
     assert result is True
-    db_session.delete.assert_called()
-    db_session.commit.assert_called()
+    delete.assert_called()
+    # The request's unit of work commits, not the service
+    flush.assert_called()
+    commit.assert_not_called()
 
 @pytest.mark.asyncio
-async def test_list_users_execute_query_none(db_session):
-    # Patch _execute_query to return None
-    with patch('app.services.user_service.UserService._execute_query', new=AsyncMock(return_value=None)):
-        users = await UserService.list_users(db_session)
-    assert users == []
+async def test_list_users_db_error_is_not_reported_as_empty(db_session):
+    with patch('app.services.user_service.UserService._execute_query', new=AsyncMock(side_effect=SQLAlchemyError('db error'))):
+        with pytest.raises(SQLAlchemyError):
+            await UserService.list_users(db_session)
 
 @pytest.mark.asyncio
 async def test_login_user_unverified_email(db_session, user):
@@ -298,8 +308,8 @@ async def test_login_user_wrong_password(db_session, user):
     user.is_locked = False
     user.failed_login_attempts = 0
     with patch('app.services.user_service.UserService.get_by_email', new=AsyncMock(return_value=user)):
-        with patch('app.utils.security.verify_password', return_value=False):
-            db_session.commit = AsyncMock()
+        with patch('app.utils.security.verify_password', return_value=False), \
+                patch.object(db_session, 'commit', new=AsyncMock()):
             result = await UserService.login_user(db_session, user.email, 'wrongpassword')
     assert result is None
     assert user.failed_login_attempts >= 1
@@ -310,3 +320,138 @@ async def test_login_user_success(db_session, user):
     with patch.object(UserService, 'login_user', new=AsyncMock(return_value=user)):
         result = await UserService.login_user(db_session, user.email, 'password')
     assert result is user
+
+async def test_login_user_rehashes_stale_hash(db_session, verified_user):
+    from app.utils.password_hashers import BcryptHasher
+    verified_user.hashed_password = BcryptHasher(4).hash("MySuperPassword$1234")
+    await db_session.commit()
+    logged_in_user = await UserService.login_user(db_session, verified_user.email, "MySuperPassword$1234")
+    assert logged_in_user is not None
+    assert logged_in_user.hashed_password.startswith("$2b$12$")
+
+async def test_login_bookkeeping_keeps_the_version(db_session, verified_user, monkeypatch):
+    # Failed attempts, the counter reset and last_login_at are not profile changes, so the ETag stays valid
+    monkeypatch.setattr("app.services.user_service.get_last_login_recorder", lambda: None)
+    user_id, email, version = verified_user.id, verified_user.email, verified_user.version
+    assert (await UserService.authenticate(db_session, email, "wrongpassword"))[0] is LoginOutcome.INVALID
+    assert (await UserService.authenticate(db_session, email, "MySuperPassword$1234"))[0] is LoginOutcome.SUCCESS
+    await db_session.commit()
+    row = (await db_session.execute(select(User.version, User.failed_login_attempts, User.last_login_at).where(User.id == user_id))).one()
+    assert row.version == version
+    assert row.failed_login_attempts == 0 and row.last_login_at is not None
+
+async def test_list_users_keyset_walks_all_pages(db_session, users_with_same_role_50_users):
+    seen = []
+    cursor = None
+    while True:
+        users, next_cursor, prev_cursor = await UserService.list_users_keyset(db_session, limit=15, cursor=cursor)
+        assert (prev_cursor is None) == (cursor is None)
+        seen.extend(user.id for user in users)
+        if next_cursor is None:
+            break
+        cursor = next_cursor
+    assert len(seen) == 50
+    assert len(set(seen)) == 50
+
+async def test_list_users_keyset_prev_returns_previous_page(db_session, users_with_same_role_50_users):
+    first_page, next_cursor, _ = await UserService.list_users_keyset(db_session, limit=10)
+    second_page, _, prev_cursor = await UserService.list_users_keyset(db_session, limit=10, cursor=next_cursor)
+    back_page, back_next, back_prev = await UserService.list_users_keyset(db_session, limit=10, cursor=prev_cursor)
+    assert [u.id for u in back_page] == [u.id for u in first_page]
+    assert back_prev is None
+    assert back_next is not None
+    assert second_page[0].id not in {u.id for u in first_page}
+
+async def test_list_users_keyset_invalid_cursor(db_session):
+    with pytest.raises(ValueError):
+        await UserService.list_users_keyset(db_session, cursor="not-a-cursor")
+
+async def test_concurrent_failed_logins_are_all_counted(db_session, verified_user):
+    max_login_attempts = get_settings().max_login_attempts
+
+    async def attempt():
+        async with AsyncTestingSessionLocal() as session:
+            return await UserService.authenticate(session, verified_user.email, "wrongpassword")
+
+    outcomes = await asyncio.gather(*(attempt() for _ in range(max_login_attempts - 1)))
+    assert {outcome for outcome, _ in outcomes} == {LoginOutcome.INVALID}
+    await db_session.refresh(verified_user)
+    assert verified_user.failed_login_attempts == max_login_attempts - 1
+    assert not verified_user.is_locked
+
+    await attempt()
+    await db_session.refresh(verified_user)
+    assert verified_user.is_locked
+    outcome, _ = await UserService.authenticate(db_session, verified_user.email, "MySuperPassword$1234")
+    assert outcome is LoginOutcome.LOCKED
+
+async def test_successful_login_resets_failures_without_rehash(db_session, verified_user):
+    verified_user.failed_login_attempts = 2
+    await db_session.commit()
+    outcome, logged_in_user = await UserService.authenticate(db_session, verified_user.email, "MySuperPassword$1234")
+    assert outcome is LoginOutcome.SUCCESS
+    assert logged_in_user.failed_login_attempts == 0
+    await db_session.commit()
+    await db_session.refresh(verified_user)
+    assert verified_user.failed_login_attempts == 0
+    assert verified_user.last_login_at is not None
+
+async def test_create_user_duplicate_email_raises(db_session, verified_user, email_service):
+    with pytest.raises(DuplicateEmailError):
+        await UserService.create(db_session, {"email": verified_user.email, "password": "ValidPassword123!"}, email_service)
+    # The conflict did not abort the transaction
+    assert await UserService.get_by_email(db_session, verified_user.email) is not None
+
+async def test_create_user_inserts_without_reading_the_email(db_session, email_service):
+    with patch.object(UserService, 'get_by_email', new=AsyncMock()) as get_by_email:
+        user = await UserService.create(db_session, {"email": "insert_first@example.com", "password": "ValidPassword123!"}, email_service)
+    get_by_email.assert_not_awaited()
+    # Server defaults come back with the inserted row
+    assert user.created_at is not None and user.nickname
+
+async def test_concurrent_registrations_with_one_email(db_session, email_service):
+    user_data = {"email": "race@example.com", "password": "ValidPassword123!"}
+
+    async def register():
+        async with AsyncTestingSessionLocal() as session:
+            try:
+                user = await UserService.create(session, user_data, email_service)
+                await session.commit()
+                return user
+            except DuplicateEmailError:
+                return None
+
+    results = await asyncio.gather(*(register() for _ in range(4)))
+    assert len([user for user in results if user is not None]) == 1
+    count = await db_session.execute(select(func.count()).select_from(User).where(User.email == "race@example.com"))
+    assert count.scalar_one() == 1
+
+async def test_create_user_retries_nickname_taken_concurrently(db_session, verified_user, email_service):
+    generator = MagicMock()
+    generator.generate.side_effect = [verified_user.nickname, "fresh_nickname_1"]
+    with patch('app.services.user_service.get_nickname_generator', return_value=generator):
+        user = await UserService.create(db_session, {"email": "retry@example.com", "password": "ValidPassword123!"}, email_service)
+    assert user.nickname == "fresh_nickname_1"
+    assert generator.generate.call_count == 2
+
+async def test_create_user_is_a_single_insert(db_session, email_service):
+    with count_queries() as counter:
+        user = await UserService.create(db_session, {"email": "one_trip@example.com", "password": "ValidPassword123!"}, email_service)
+    assert user is not None
+    assert counter.queries == 1
+
+async def test_update_user_bumps_version(db_session, user):
+    version = user.version
+    updated_user = await UserService.update(db_session, user.id, {"first_name": "Versioned"}, expected_versions=[version])
+    assert updated_user.first_name == "Versioned"
+    assert updated_user.version == version + 1
+
+async def test_update_user_stale_version_conflicts(db_session, user):
+    with pytest.raises(VersionConflictError) as conflict:
+        await UserService.update(db_session, user.id, {"first_name": "Lost"}, expected_versions=[user.version + 5])
+    assert conflict.value.current_version == user.version
+
+async def test_update_user_skips_unchanged_values(db_session, user):
+    version, first_name = user.version, user.first_name
+    updated_user = await UserService.update(db_session, user.id, {"first_name": first_name})
+    assert updated_user.version == version
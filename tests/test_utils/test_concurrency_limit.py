@@ -0,0 +1,163 @@
+from builtins import range
+import asyncio
+import pytest
+from app.utils.concurrency_limit import AUTH, READ, WRITE, AdaptiveConcurrencyLimiter, LoadSheddingError, request_lane
+
+pytestmark = pytest.mark.asyncio
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_limiter(**overrides):
+    options = dict(initial_limit=2, min_limit=1, max_limit=10, queue_size=1, queue_timeout_seconds=0.2)
+    options.update(overrides)
+    return AdaptiveConcurrencyLimiter("test", **options)
+
+
+async def hold(limiter, release: asyncio.Event):
+    async with limiter.acquire():
+        await release.wait()
+
+
+async def test_lanes():
+    assert request_lane("POST", "/login/") == AUTH
+    assert request_lane("POST", "/register/") == AUTH
+    assert request_lane("PUT", "/users/1") == WRITE
+    assert request_lane("DELETE", "/users/1") == WRITE
+    assert request_lane("GET", "/users/1") == READ
+
+
+async def test_rejects_at_once_when_the_queue_is_full():
+    limiter = make_limiter()
+    release = asyncio.Event()
+    holders = [asyncio.create_task(hold(limiter, release)) for _ in range(3)]
+    await asyncio.sleep(0)
+    assert (limiter.in_flight, len(limiter._waiters)) == (2, 1)
+    with pytest.raises(LoadSheddingError):
+        async with limiter.acquire():
+            pass
+    assert limiter.stats()["rejected_queue_full"] == 1
+    release.set()
+    await asyncio.gather(*holders)
+    # The queued request got the first freed slot
+    assert limiter.stats()["admitted"] == 3
+    assert limiter.in_flight == 0
+
+
+async def test_queued_request_gives_up_at_its_deadline():
+    limiter = make_limiter(initial_limit=1, queue_timeout_seconds=0.05)
+    release = asyncio.Event()
+    holder = asyncio.create_task(hold(limiter, release))
+    await asyncio.sleep(0)
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    with pytest.raises(LoadSheddingError):
+        async with limiter.acquire():
+            pass
+    assert loop.time() - started < 0.5
+    assert limiter.stats()["rejected_timeout"] == 1
+    # The abandoned place in the queue is not kept
+    assert limiter.stats()["waiting"] == 0
+    release.set()
+    await holder
+    assert limiter.in_flight == 0
+
+
+async def test_release_while_the_wait_times_out(monkeypatch):
+    limiter = make_limiter(initial_limit=1, queue_timeout_seconds=5)
+    release = asyncio.Event()
+    holder = asyncio.create_task(hold(limiter, release))
+    await asyncio.sleep(0)
+
+    async def times_out_as_the_slot_frees(waiter, timeout):
+        # What wait_for does on timeout: cancel the waiter, then wait for it to finish cancelling. The
+        # holder finishes in between and its release pops the cancelled waiter off the queue.
+        waiter.cancel()
+        release.set()
+        await holder
+        raise asyncio.TimeoutError()
+    monkeypatch.setattr(asyncio, "wait_for", times_out_as_the_slot_frees)
+
+    with pytest.raises(LoadSheddingError):
+        async with limiter.acquire():
+            pass
+    assert (limiter.in_flight, limiter.stats()["waiting"], limiter.stats()["rejected_timeout"]) == (0, 0, 1)
+
+
+async def test_cancelled_waiter_does_not_leak_a_slot():
+    limiter = make_limiter(initial_limit=1, queue_timeout_seconds=5)
+    release = asyncio.Event()
+    holder = asyncio.create_task(hold(limiter, release))
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(hold(limiter, asyncio.Event()))
+    await asyncio.sleep(0)
+    waiter.cancel()
+    await asyncio.gather(waiter, return_exceptions=True)
+    release.set()
+    await holder
+    assert limiter.in_flight == 0
+    async with limiter.acquire():
+        assert limiter.in_flight == 1
+
+
+async def test_slow_requests_shrink_the_limit_once_per_round_trip():
+    clock = FakeClock()
+    limiter = make_limiter(initial_limit=10, max_limit=20, clock=clock)
+    limiter._adjust(0.1, saturated=False)
+    assert limiter.baseline == pytest.approx(0.1)
+    # Three slow completions at the same moment are one congestion signal
+    for _ in range(3):
+        limiter._adjust(1.0, saturated=True)
+    assert limiter.limit == pytest.approx(9.0)
+    clock.now += 1.0
+    limiter._adjust(1.0, saturated=True)
+    assert limiter.limit == pytest.approx(8.1)
+    assert limiter.stats()["limit_decreases"] == 2
+
+
+async def test_limit_never_leaves_its_bounds():
+    clock = FakeClock()
+    limiter = make_limiter(initial_limit=2, max_limit=3, clock=clock)
+    limiter._adjust(0.1, saturated=False)
+    for _ in range(100):
+        limiter._adjust(0.1, saturated=True)
+    assert limiter.limit == 3
+    for _ in range(20):
+        clock.now += 10
+        limiter._adjust(5.0, saturated=True)
+    assert limiter.limit == 1
+
+
+async def test_a_lasting_slowdown_becomes_the_new_baseline():
+    clock = FakeClock()
+    limiter = make_limiter(initial_limit=4, clock=clock)
+    limiter._adjust(0.1, saturated=False)
+    for _ in range(500):
+        clock.now += 10
+        limiter._adjust(1.0, saturated=True)
+    # After the early cuts the limit recovers instead of staying pinned at the minimum
+    assert limiter.baseline == pytest.approx(1.0, abs=0.01)
+    assert limiter.limit > 4
+
+
+async def test_fast_requests_grow_the_limit_only_when_it_was_used():
+    limiter = make_limiter(initial_limit=4, max_limit=10)
+    limiter._adjust(0.1, saturated=False)
+    assert limiter.limit == 4
+    for _ in range(4):
+        limiter._adjust(0.1, saturated=True)
+    # Additive increase: about one per limit's worth of completions
+    assert limiter.limit == pytest.approx(4.9, abs=0.05)
+
+
+async def test_jitter_on_fast_endpoints_is_not_congestion():
+    limiter = make_limiter(initial_limit=4)
+    limiter._adjust(0.001, saturated=False)
+    limiter._adjust(0.02, saturated=True)
+    assert limiter.limit > 4
@@ -0,0 +1,37 @@
+import pytest
+from app.container import AppContainer, get_container
+from app.database import Database
+from app.dependencies import get_email_service, get_settings
+from app.services import email_outbox_service
+from app.utils import security
+
+
+def test_dependencies_return_shared_instances():
+    assert get_settings() is get_settings()
+    assert get_email_service() is get_email_service()
+    assert get_email_service() is get_container().email_service
+    assert get_email_service().smtp_client is get_container().smtp_client
+
+
+@pytest.mark.asyncio
+async def test_container_startup_and_shutdown(monkeypatch):
+    settings = get_settings()
+    monkeypatch.setattr(settings, "password_hash_calibrate", False)
+    monkeypatch.setattr(security, "_password_hasher", None)
+    container = AppContainer(settings)
+    try:
+        await container.startup()
+        assert container.started
+        assert email_outbox_service._worker is not None
+        assert security._hashing_pool is not None
+        assert Database.get_session_factory() is not None
+
+        await container.shutdown()
+        assert not container.started
+        assert email_outbox_service._worker is None
+        assert security._hashing_pool is None
+        with pytest.raises(ValueError):
+            Database.get_session_factory()
+    finally:
+        # Other tests expect the session-wide database setup from conftest
+        Database.initialize(settings.database_url)
@@ -13,3 +13,86 @@ async def test_database_initialize_and_session():
         await conn.run_sync(Base.metadata.create_all)
     async with async_session() as session:
         assert session is not None
+    await engine.dispose()
+
+
+def test_pool_options_profile_and_overrides():
+    from app.database import POOL_PROFILES, pool_options
+    from settings.config import Settings
+    assert pool_options(Settings(db_pool_profile="production")) == POOL_PROFILES["production"]
+    options = pool_options(Settings(db_pool_profile="production", db_pool_size=3, db_pool_pre_ping=False))
+    assert (options["pool_size"], options["pool_pre_ping"], options["max_overflow"]) == (3, False, POOL_PROFILES["production"]["max_overflow"])
+    with pytest.raises(ValueError):
+        pool_options(Settings(db_pool_profile="nope"))
+
+
+@pytest.mark.asyncio
+async def test_instrumented_pool_records_waits_holds_and_timeouts(caplog):
+    from sqlalchemy import exc, text
+    from app.database import InstrumentedAsyncPool
+    from settings.config import settings
+    engine = create_async_engine(settings.database_url, poolclass=InstrumentedAsyncPool, pool_size=1, max_overflow=0, pool_timeout=0.1)
+    metrics = engine.sync_engine.pool.metrics
+    metrics.leak_threshold_seconds = 0
+    try:
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+            assert metrics.check_leaks() == 1
+            with pytest.raises(exc.TimeoutError):
+                async with engine.connect():
+                    pass
+        stats = metrics.stats()
+        assert (stats["checkouts"], stats["timeouts"], stats["held_past_threshold"]) == (1, 1, 0)
+        assert stats["hold_max_ms"] > 0
+        assert stats["wait_max_ms"] >= 100
+        assert stats["leak_warnings"] == 2
+        assert "not returned yet" in caplog.text
+    finally:
+        await engine.dispose()
+
+
+def make_replica(name):
+    from app.database import Replica
+    from settings.config import settings
+    return Replica(name, create_async_engine(settings.database_url))
+
+
+@pytest.mark.asyncio
+async def test_replica_check_measures_lag_and_leaves_rotation(monkeypatch):
+    replica = make_replica("r1")
+    try:
+        assert await replica.check(max_lag_seconds=5, timeout=5) is True
+        assert replica.lag_seconds == 0
+
+        async def lagging():
+            return 30.0
+        monkeypatch.setattr(replica, "measure_lag", lagging)
+        assert await replica.check(max_lag_seconds=5, timeout=5) is False
+
+        async def unreachable():
+            raise ConnectionError("down")
+        monkeypatch.setattr(replica, "measure_lag", unreachable)
+        assert await replica.check(max_lag_seconds=5, timeout=5) is False
+        assert replica.last_error == "down"
+    finally:
+        await replica.engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_read_session_factory_balances_healthy_replicas(monkeypatch):
+    from app.database import Database
+    first, second = make_replica("r1"), make_replica("r2")
+    monkeypatch.setattr(Database, "_replicas", [first, second])
+    try:
+        picked = {Database.get_read_session_factory() for _ in range(4)}
+        assert picked == {first.session_factory, second.session_factory}
+        assert Database.get_read_session_factory(use_primary=True) is Database.get_session_factory()
+
+        second.healthy = False
+        assert {Database.get_read_session_factory() for _ in range(4)} == {first.session_factory}
+        first.healthy = False
+        assert Database.get_read_session_factory() is Database.get_session_factory()
+        assert [replica["name"] for replica in Database.pool_stats()["replicas"]] == ["r1", "r2"]
+    finally:
+        await first.engine.dispose()
+        await second.engine.dispose()
@@ -1,6 +1,14 @@
 import pytest
-from app.dependencies import get_settings, require_role, get_current_user
+from sqlalchemy import select, text
+from starlette.requests import Request
+from app.database import Database, count_queries
+from app.dependencies import get_db, get_read_db, get_settings, require_role, get_current_user
+from app.models.user_model import User
+from app.services.user_service import UserService
+from app.utils.security import hash_password
+from app.utils.worker_pool import WorkerPoolSaturatedError
 from fastapi import HTTPException
+from tests.conftest import AsyncTestingSessionLocal
 
 
 def test_get_settings_returns_settings():
@@ -39,3 +47,94 @@ def test_get_current_user_invalid(monkeypatch):
     token = "sometoken"
     with pytest.raises(HTTPException):
         get_current_user(token)
+
+
+def make_request(headers, client=("10.0.0.9", 1234)):
+    from starlette.requests import Request
+    return Request({"type": "http", "headers": [(k.lower().encode(), v.encode()) for k, v in headers.items()], "client": client})
+
+
+def test_client_ip_uses_the_address_added_by_the_trusted_proxy():
+    from app.dependencies import client_ip
+    # The client may send its own X-Forwarded-For; nginx appends the real peer address after it
+    request = make_request({"X-Forwarded-For": "1.2.3.4, 203.0.113.7"})
+    assert client_ip(request, trusted_proxies=1) == "203.0.113.7"
+    assert client_ip(request, trusted_proxies=2) == "1.2.3.4"
+    assert client_ip(request, trusted_proxies=0) == "10.0.0.9"
+    assert client_ip(make_request({}), trusted_proxies=1) == "10.0.0.9"
+
+
+@pytest.fixture
+async def release_app_pool():
+    # The application engine's pooled connections belong to this test's event loop
+    yield
+    await Database._engine.dispose()
+
+
+def new_user(email):
+    return User(nickname=email.split("@")[0], email=email, hashed_password=hash_password("ValidPassword123!", rounds=4))
+
+
+async def stored_emails():
+    async with AsyncTestingSessionLocal() as session:
+        result = await session.execute(select(User.email))
+        return set(result.scalars().all())
+
+
+@pytest.mark.usefixtures("release_app_pool")
+async def test_get_db_commits_once_after_endpoint():
+    dependency = get_db()
+    session = await dependency.__anext__()
+    session.add(new_user("uow@example.com"))
+    await session.flush()
+    with count_queries() as counter:
+        with pytest.raises(StopAsyncIteration):
+            await dependency.__anext__()
+    assert counter.commits == 1
+    assert "uow@example.com" in await stored_emails()
+
+
+@pytest.mark.usefixtures("release_app_pool")
+async def test_get_db_rolls_back_when_endpoint_raises():
+    dependency = get_db()
+    session = await dependency.__anext__()
+    session.add(new_user("rolledback@example.com"))
+    await session.flush()
+    with pytest.raises(HTTPException) as raised:
+        await dependency.athrow(HTTPException(status_code=404, detail="User not found"))
+    assert raised.value.status_code == 404
+    assert "rolledback@example.com" not in await stored_emails()
+
+
+@pytest.mark.usefixtures("release_app_pool")
+async def test_get_db_passes_application_errors_through():
+    dependency = get_db()
+    session = await dependency.__anext__()
+    session.add(new_user("saturated@example.com"))
+    await session.flush()
+    error = WorkerPoolSaturatedError("busy")
+    with pytest.raises(WorkerPoolSaturatedError) as raised:
+        await dependency.athrow(error)
+    # Left for the app's handler to turn into a 503, not rewrapped as a 500
+    assert raised.value is error
+    assert "saturated@example.com" not in await stored_emails()
+
+
+@pytest.mark.usefixtures("release_app_pool")
+async def test_get_read_db_is_read_only(user):
+    dependency = get_read_db(Request({"type": "http", "headers": []}))
+    session = await dependency.__anext__()
+    try:
+        assert (await session.execute(select(User.email).where(User.id == user.id))).scalar() == user.email
+        with pytest.raises(Exception, match="read-only"):
+            await session.execute(text("UPDATE users SET bio = 'x'"))
+    finally:
+        await dependency.aclose()
+
+
+async def test_service_reads_and_updates_do_not_commit(db_session, user):
+    with count_queries() as counter:
+        assert await UserService.get_by_id(db_session, user.id) is not None
+        assert await UserService.update(db_session, user.id, {"first_name": "Renamed"}) is not None
+    # One SELECT, then a single UPDATE ... RETURNING; the unit of work commits later
+    assert (counter.queries, counter.commits) == (2, 0)
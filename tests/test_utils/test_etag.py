@@ -0,0 +1,27 @@
+from datetime import datetime, timedelta, timezone
+from app.utils.etag import http_date, none_match, not_modified_since, parse_if_match, version_etag
+
+
+def test_parse_if_match():
+    assert parse_if_match(None) is None
+    assert parse_if_match("*") is None
+    assert parse_if_match('"3", "4"') == [3, 4]
+    # If-Match uses strong comparison, so weak tags never match
+    assert parse_if_match('W/"3"') == []
+
+
+def test_none_match_uses_weak_comparison():
+    etag = version_etag(7)
+    assert none_match('W/"7"', etag)
+    assert none_match('"1", "7"', etag)
+    assert none_match("*", etag)
+    assert not none_match('"8"', etag)
+
+
+def test_not_modified_since_ignores_sub_second_precision():
+    moment = datetime(2024, 5, 1, 10, 0, 0, 250000, tzinfo=timezone.utc)
+    header = http_date(moment)
+    assert header == "Wed, 01 May 2024 10:00:00 GMT"
+    assert not_modified_since(header, moment)
+    assert not not_modified_since(header, moment + timedelta(seconds=1))
+    assert not not_modified_since("not a date", moment)
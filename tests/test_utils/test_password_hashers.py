@@ -0,0 +1,75 @@
+import pickle
+import pytest
+from app.utils import security
+from app.utils.password_hashers import (
+    Argon2idHasher, BcryptHasher, calibrate_hasher, get_hasher_class, identify_hasher
+)
+from settings.config import Settings
+
+
+@pytest.fixture
+def restore_hasher():
+    previous = security._password_hasher
+    yield
+    security._password_hasher = previous
+
+
+def test_bcrypt_needs_rehash_on_cost_increase_only():
+    hashed = BcryptHasher(5).hash("secret")
+    assert BcryptHasher(5).needs_rehash(hashed) is False
+    assert BcryptHasher(6).needs_rehash(hashed) is True
+    # A worker calibrated lower leaves stronger hashes alone
+    assert BcryptHasher(4).needs_rehash(hashed) is False
+
+
+def test_argon2id_round_trip_and_rehash():
+    hasher = Argon2idHasher(2, memory_cost=1024)
+    hashed = hasher.hash("secret")
+    assert hashed.startswith("$argon2id$")
+    assert hasher.verify("secret", hashed) is True
+    assert hasher.verify("wrong", hashed) is False
+    assert hasher.needs_rehash(hashed) is False
+    assert hasher.with_cost(3).needs_rehash(hashed) is True
+    assert hasher.with_cost(1).needs_rehash(hashed) is False
+    assert Argon2idHasher(2, memory_cost=2048).needs_rehash(hashed) is True
+    assert BcryptHasher(4).needs_rehash(hashed) is True
+
+
+def test_argon2id_hasher_is_picklable():
+    hasher = pickle.loads(pickle.dumps(Argon2idHasher(2, memory_cost=1024)))
+    assert hasher.verify("secret", hasher.hash("secret"))
+
+
+def test_identify_hasher():
+    assert identify_hasher(BcryptHasher(4).hash("secret")) is BcryptHasher
+    assert identify_hasher(Argon2idHasher(2, memory_cost=1024).hash("secret")) is Argon2idHasher
+    assert identify_hasher("plaintext") is None
+
+
+def test_get_hasher_class_unknown():
+    with pytest.raises(ValueError):
+        get_hasher_class("md5")
+
+
+def test_calibrate_keeps_minimum_cost_when_budget_is_tiny(monkeypatch):
+    monkeypatch.setattr("app.utils.password_hashers._time_hash", lambda hasher: 2.0 ** hasher.cost)
+    assert calibrate_hasher(BcryptHasher(), target_ms=0).cost == BcryptHasher.min_cost == 12
+
+
+def test_calibrate_stops_at_budget(monkeypatch):
+    timings = {12: 120.0, 13: 240.0, 14: 480.0}
+    monkeypatch.setattr("app.utils.password_hashers._time_hash", lambda hasher: timings[hasher.cost])
+    assert calibrate_hasher(BcryptHasher(), target_ms=250).cost == 13
+
+
+def test_configure_password_hasher_fixed_cost(restore_hasher):
+    config = Settings(password_hasher="argon2id", password_hash_cost=2, argon2_memory_cost=1024)
+    hasher = security.configure_password_hasher(config)
+    assert isinstance(hasher, Argon2idHasher)
+    hashed = security.hash_password("secret")
+    assert hashed.startswith("$argon2id$")
+    assert security.verify_password("secret", hashed) is True
+    # Hashes from the previous scheme still verify but are flagged for upgrade
+    old_hash = BcryptHasher(4).hash("secret")
+    assert security.verify_password("secret", old_hash) is True
+    assert security.password_needs_rehash(old_hash) is True
@@ -0,0 +1,86 @@
+from builtins import range
+import pytest
+from app.utils.rate_limit import MemoryRateLimitBackend, RateLimit, retry_after_header, sliding_window, token_bucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 6000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_parse_rules():
+    assert RateLimit.parse("ip:20/minute") == RateLimit("ip", 20, 60.0, "sliding_window")
+    assert RateLimit.parse("email:5/300:token_bucket") == RateLimit("email", 5, 300.0, "token_bucket")
+    assert str(RateLimit.parse("subject:600/minute:token_bucket")) == "subject:600/60:token_bucket"
+
+
+@pytest.mark.parametrize("rule", ["ip", "ip:20", "ip:x/minute", "ip:20/fortnight", "host:20/minute", "ip:20/minute:leaky", "ip:0/minute"])
+def test_parse_rejects_invalid_rules(rule):
+    with pytest.raises(ValueError):
+        RateLimit.parse(rule)
+
+
+def test_token_bucket_allows_a_burst_then_refills():
+    rate_limit = RateLimit("ip", 3, 60.0, "token_bucket")
+    state, now = None, 0.0
+    for _ in range(3):
+        state, decision = token_bucket(state, rate_limit, now)
+        assert decision.allowed
+    state, decision = token_bucket(state, rate_limit, now)
+    assert not decision.allowed
+    # One token every 20 seconds
+    assert decision.retry_after == pytest.approx(20.0)
+    state, decision = token_bucket(state, rate_limit, now + 19.9)
+    assert not decision.allowed
+    state, decision = token_bucket(state, rate_limit, now + 20.0)
+    assert decision.allowed
+
+
+def test_sliding_window_weights_the_previous_window():
+    rate_limit = RateLimit("ip", 4, 60.0, "sliding_window")
+    state = None
+    for second in range(4):
+        state, decision = sliding_window(state, rate_limit, 6000.0 + second)
+        assert decision.allowed
+    state, decision = sliding_window(state, rate_limit, 6059.0)
+    assert not decision.allowed
+    # At 6075 a quarter of the next window has passed: 4 * 0.75 = 3 still count, leaving room for one
+    assert decision.retry_after == pytest.approx(16.0)
+    state, decision = sliding_window(state, rate_limit, 6074.0)
+    assert not decision.allowed
+    state, decision = sliding_window(state, rate_limit, 6075.0)
+    assert decision.allowed
+    state, decision = sliding_window(state, rate_limit, 6075.0)
+    assert not decision.allowed
+
+
+def test_sliding_window_does_not_count_rejected_requests():
+    rate_limit = RateLimit("ip", 1, 60.0, "sliding_window")
+    state, _ = sliding_window(None, rate_limit, 6000.0)
+    for second in range(1, 50):
+        state, decision = sliding_window(state, rate_limit, 6000.0 + second)
+        assert not decision.allowed
+    assert state[1] == 1
+
+
+def test_retry_after_header_rounds_up():
+    assert retry_after_header(0.0) == "1"
+    assert retry_after_header(1.2) == "2"
+    assert retry_after_header(20.0) == "20"
+
+
+async def test_memory_backend_keeps_buckets_apart():
+    clock = FakeClock()
+    backend = MemoryRateLimitBackend(maxsize=100, clock=clock)
+    rate_limit = RateLimit("ip", 2, 60.0, "token_bucket")
+    assert (await backend.hit("a", rate_limit)).allowed
+    assert (await backend.hit("a", rate_limit)).allowed
+    assert not (await backend.hit("a", rate_limit)).allowed
+    assert (await backend.hit("b", rate_limit)).allowed
+    assert backend.stats()["buckets"] == 2
+    clock.now += 60
+    assert (await backend.hit("a", rate_limit)).allowed
+    assert (await backend.hit("a", rate_limit)).allowed
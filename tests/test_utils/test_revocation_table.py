@@ -0,0 +1,76 @@
+from builtins import range
+import multiprocessing
+import time
+from app.utils.revocation_table import ALL_TOKENS, SharedRevocationTable
+
+
+def future(seconds=60):
+    return int(time.time()) + seconds
+
+
+def test_revoked_key_is_found(tmp_path):
+    table = SharedRevocationTable(str(tmp_path / "table"), capacity=16)
+    table.revoke("jti:abc", ALL_TOKENS, future())
+    assert table.is_revoked("jti:abc", issued_at=0)
+    assert not table.is_revoked("jti:other", issued_at=0)
+
+
+def test_subject_revocation_only_covers_earlier_tokens(tmp_path):
+    table = SharedRevocationTable(str(tmp_path / "table"), capacity=16)
+    table.revoke("sub:a@example.com", 1000, future())
+    assert table.is_revoked("sub:a@example.com", issued_at=999)
+    assert table.is_revoked("sub:a@example.com", issued_at=1000)
+    assert not table.is_revoked("sub:a@example.com", issued_at=1001)
+    # Revoking again only ever widens the entry
+    table.revoke("sub:a@example.com", 500, future())
+    assert table.is_revoked("sub:a@example.com", issued_at=1000)
+
+
+def test_expired_revocations_no_longer_apply(tmp_path):
+    table = SharedRevocationTable(str(tmp_path / "table"), capacity=16)
+    table.revoke("jti:abc", ALL_TOKENS, 2000)
+    assert table.is_revoked("jti:abc", issued_at=0, now=1999)
+    assert not table.is_revoked("jti:abc", issued_at=0, now=2000)
+
+
+def test_tables_on_the_same_file_share_entries(tmp_path):
+    path = str(tmp_path / "table")
+    worker_a = SharedRevocationTable(path, capacity=16)
+    worker_b = SharedRevocationTable(path, capacity=16)
+    worker_a.revoke("jti:abc", ALL_TOKENS, future())
+    assert worker_b.is_revoked("jti:abc", issued_at=0)
+    # And the entries outlive the processes that wrote them
+    worker_a.close()
+    worker_b.close()
+    assert SharedRevocationTable(path, capacity=16).is_revoked("jti:abc", issued_at=0)
+
+
+def test_full_table_is_rebuilt_and_followed_by_other_workers(tmp_path):
+    path = str(tmp_path / "table")
+    worker_a = SharedRevocationTable(path, capacity=8)
+    worker_b = SharedRevocationTable(path, capacity=8)
+    worker_a.revoke("jti:expired", ALL_TOKENS, int(time.time()) - 1)
+    for i in range(20):
+        worker_a.revoke(f"jti:{i}", ALL_TOKENS, future())
+    assert worker_a.stats()["rebuilds"] > 0
+    assert worker_a.stats()["capacity"] >= 64
+    # worker_b still maps the retired file and switches on its next lookup
+    assert all(worker_b.is_revoked(f"jti:{i}", issued_at=0) for i in range(20))
+    assert worker_b.stats()["used_slots"] == 20
+    # Writes after the switch land in the shared successor
+    worker_b.revoke("jti:late", ALL_TOKENS, future())
+    assert worker_a.is_revoked("jti:late", issued_at=0)
+
+
+def _revoke_in_child(path, key):
+    SharedRevocationTable(path, capacity=16).revoke(key, ALL_TOKENS, future())
+
+
+def test_revocations_from_another_process_are_visible(tmp_path):
+    path = str(tmp_path / "table")
+    table = SharedRevocationTable(path, capacity=16)
+    child = multiprocessing.get_context("fork").Process(target=_revoke_in_child, args=(path, "jti:from-child"))
+    child.start()
+    child.join(10)
+    assert child.exitcode == 0
+    assert table.is_revoked("jti:from-child", issued_at=0)
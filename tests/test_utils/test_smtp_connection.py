@@ -1,17 +1,94 @@
+import asyncio
 import pytest
-from unittest.mock import patch, MagicMock
+import aiosmtplib
 from app.utils.smtp_connection import SMTPClient
+from app.utils.smtp_sink import SMTPSink
 
-def test_send_email_success():
-    smtp = SMTPClient('smtp.example.com', 587, 'user', 'pass')
-    with patch('smtplib.SMTP') as smtp_mock:
-        smtp_instance = smtp_mock.return_value.__enter__.return_value
-        smtp_instance.sendmail = MagicMock()
-        smtp.send_email('Subject', '<html>test</html>', 'to@example.com')
-        smtp_instance.sendmail.assert_called_once()
-
-def test_send_email_failure():
-    smtp = SMTPClient('smtp.example.com', 587, 'user', 'pass')
-    with patch('smtplib.SMTP', side_effect=Exception('fail')):
-        with pytest.raises(Exception):
-            smtp.send_email('Subject', '<html>test</html>', 'to@example.com')
+@pytest.fixture
+async def sink():
+    async with SMTPSink() as smtp_sink:
+        yield smtp_sink
+
+def make_client(sink, **kwargs):
+    return SMTPClient('127.0.0.1', sink.port, 'user', 'pass', start_tls=False, timeout=5, **kwargs)
+
+async def test_send_email_success(sink):
+    smtp = make_client(sink)
+    await smtp.send_email('Subject', '<html>test</html>', 'to@example.com')
+    await smtp.close()
+    assert len(sink.messages) == 1
+    assert sink.messages[0].recipients == ['to@example.com']
+    assert b'<html>test</html>' in sink.messages[0].data
+
+async def test_send_email_failure():
+    # Nothing listens on the port once the sink is stopped
+    async with SMTPSink() as stopped:
+        port = stopped.port
+    smtp = SMTPClient('127.0.0.1', port, 'user', 'pass', start_tls=False, timeout=1)
+    with pytest.raises(Exception):
+        await smtp.send_email('Subject', '<html>test</html>', 'to@example.com')
+
+async def test_connections_are_reused(sink):
+    smtp = make_client(sink, pool_size=2)
+    for i in range(5):
+        await smtp.send_email('Subject', f'<p>{i}</p>', f'to{i}@example.com')
+    await smtp.close()
+    assert len(sink.messages) == 5
+    assert sink.connections == 1
+    assert sink.logins == 1
+
+async def test_concurrent_sends_stay_within_pool_size(sink):
+    smtp = make_client(sink, pool_size=2)
+    await asyncio.gather(*(smtp.send_email('Subject', '<p>hi</p>', f'to{i}@example.com') for i in range(10)))
+    await smtp.close()
+    assert len(sink.messages) == 10
+    assert sink.connections <= 2
+
+async def test_connection_recycled_after_max_messages(sink):
+    smtp = make_client(sink, max_messages_per_connection=2)
+    for i in range(5):
+        await smtp.send_email('Subject', '<p>hi</p>', 'to@example.com')
+    await smtp.close()
+    assert len(sink.messages) == 5
+    assert sink.connections == 3
+
+async def test_reconnects_after_server_restart():
+    async with SMTPSink() as first:
+        port = first.port
+        smtp = SMTPClient('127.0.0.1', port, 'user', 'pass', start_tls=False, timeout=5)
+        await smtp.send_email('Subject', '<p>one</p>', 'to@example.com')
+    # The pooled connection is now dead; the next send must transparently open a new one
+    async with SMTPSink(port=port) as second:
+        await smtp.send_email('Subject', '<p>two</p>', 'to@example.com')
+        await smtp.close()
+        assert len(second.messages) == 1
+        assert second.connections == 1
+
+async def test_message_timeout():
+    released = asyncio.Event()
+    async def silent(reader, writer):
+        await released.wait()
+        writer.close()
+    server = await asyncio.start_server(silent, '127.0.0.1', 0)
+    port = server.sockets[0].getsockname()[1]
+    smtp = SMTPClient('127.0.0.1', port, 'user', 'pass', start_tls=False, timeout=0.2)
+    with pytest.raises((asyncio.TimeoutError, aiosmtplib.SMTPException)):
+        await smtp.send_email('Subject', '<p>hi</p>', 'to@example.com')
+    released.set()
+    server.close()
+    await server.wait_closed()
+
+async def test_connection_closed_when_login_fails(sink, monkeypatch):
+    opened = []
+    connect = aiosmtplib.SMTP.connect
+    async def tracking_connect(self, *args, **kwargs):
+        opened.append(self)
+        return await connect(self, *args, **kwargs)
+    async def failing_login(self, username, password, **kwargs):
+        raise aiosmtplib.SMTPAuthenticationError(535, "Authentication failed")
+    monkeypatch.setattr(aiosmtplib.SMTP, "connect", tracking_connect)
+    monkeypatch.setattr(aiosmtplib.SMTP, "login", failing_login)
+    smtp = make_client(sink)
+    with pytest.raises(aiosmtplib.SMTPAuthenticationError):
+        await smtp.send_email('Subject', '<html>test</html>', 'to@example.com')
+    assert opened and not any(connection.is_connected for connection in opened)
@@ -1,3 +1,5 @@
+import os
+import markdown2
 import pytest
 from unittest.mock import patch, MagicMock
 from app.utils.template_manager import TemplateManager
@@ -22,3 +24,37 @@ def test_render_template_success(template_manager):
         with patch('app.utils.template_manager.markdown2.markdown', return_value='<html>content</html>'):
             result = template_manager.render_template('main', name='Test')
             assert 'content' in result
+
+def test_compiled_render_matches_markdown_render(template_manager):
+    context = {'name': 'Ann', 'verification_url': 'http://localhost/verify-email/1/abc'}
+    header = template_manager._read_template('header.md')
+    footer = template_manager._read_template('footer.md')
+    main = template_manager._read_template('email_verification.md').format(**context)
+    expected = template_manager._apply_email_styles(markdown2.markdown(f"{header}\n{main}\n{footer}"))
+    assert template_manager.render_template('email_verification', **context) == expected
+
+def test_render_escapes_values(template_manager):
+    result = template_manager.render_template('email_verification', name='<b>Eve</b>', verification_url='http://x/?a=1&b="2"')
+    assert '&lt;b&gt;Eve&lt;/b&gt;' in result
+    assert 'href="http://x/?a=1&amp;b=&quot;2&quot;"' in result
+
+def test_render_missing_field_raises(template_manager):
+    with pytest.raises(KeyError):
+        template_manager.render_template('email_verification', name='Ann')
+
+def test_template_compiled_once_and_recompiled_on_mtime_change(tmp_path):
+    for name, content in {'header.md': '# Head', 'footer.md': 'Foot', 'note.md': 'Hi {name}'}.items():
+        (tmp_path / name).write_text(content)
+    manager = TemplateManager()
+    manager.templates_dir = tmp_path
+    with patch('app.utils.template_manager.markdown2.markdown', wraps=markdown2.markdown) as markdown:
+        assert 'Hi Ann' in manager.render_template('note', name='Ann')
+        assert 'Hi Bob' in TemplateManager.render_template(manager, 'note', name='Bob')
+        assert markdown.call_count == 1
+        (tmp_path / 'note.md').write_text('Bye {name}')
+        os.utime(tmp_path / 'note.md', (1, 1))
+        assert 'Bye Ann' in manager.render_template('note', name='Ann')
+        assert markdown.call_count == 2
+
+def test_warm_compiles_every_template(template_manager):
+    assert 'email_verification' in template_manager.warm()
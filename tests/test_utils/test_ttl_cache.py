@@ -0,0 +1,46 @@
+from builtins import range
+from app.utils.ttl_cache import TTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_entries_expire_after_ttl():
+    clock = FakeClock()
+    cache = TTLCache(maxsize=10, ttl_seconds=5, clock=clock)
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    clock.now += 5
+    assert cache.get("a") is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_explicit_expiry_overrides_ttl():
+    clock = FakeClock()
+    cache = TTLCache(maxsize=10, ttl_seconds=5, clock=clock)
+    cache.set("a", 1, expires_at=clock.now + 60)
+    clock.now += 30
+    assert cache.get("a") == 1
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = TTLCache(maxsize=3, ttl_seconds=60)
+    for key in range(3):
+        cache.set(key, key)
+    cache.get(0)
+    cache.set(3, 3)
+    assert cache.get(1) is None
+    assert cache.get(0) == 0 and cache.get(3) == 3
+    stats = cache.stats()
+    assert (stats["size"], stats["evictions"], stats["hits"], stats["misses"]) == (3, 1, 3, 1)
+
+
+def test_zero_size_cache_stores_nothing():
+    cache = TTLCache(maxsize=0, ttl_seconds=60)
+    cache.set("a", 1)
+    assert len(cache) == 0
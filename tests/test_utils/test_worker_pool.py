@@ -0,0 +1,53 @@
+import asyncio
+import time
+import pytest
+from app.utils.worker_pool import BoundedWorkerPool, WorkerPoolSaturatedError
+
+
+def slow_double(value, delay=0.05):
+    time.sleep(delay)
+    return value * 2
+
+
+@pytest.fixture
+def pool():
+    worker_pool = BoundedWorkerPool("test", max_workers=2, queue_size=1)
+    yield worker_pool
+    worker_pool.shutdown()
+
+
+async def test_run_returns_result_and_records_timings(pool):
+    assert await pool.run(slow_double, 21) == 42
+    stats = pool.stats()
+    assert stats["completed"] == 1
+    assert stats["in_flight"] == 0
+    assert stats["compute_avg_ms"] >= 40
+
+
+async def test_run_rejects_when_queue_full(pool):
+    jobs = [asyncio.ensure_future(pool.run(slow_double, i, 0.2)) for i in range(pool.capacity)]
+    await asyncio.sleep(0)
+    with pytest.raises(WorkerPoolSaturatedError):
+        await pool.run(slow_double, 99)
+    assert await asyncio.gather(*jobs) == [0, 2, 4]
+    stats = pool.stats()
+    assert stats["rejected"] == 1
+    assert stats["queue_wait_max_ms"] > 0
+
+
+async def test_run_failure_releases_slot(pool):
+    with pytest.raises(TypeError):
+        await pool.run(slow_double, None)
+    assert pool.stats()["in_flight"] == 0
+    assert pool.stats()["failed"] == 1
+
+
+async def test_run_after_shutdown_raises(pool):
+    pool.shutdown()
+    with pytest.raises(RuntimeError):
+        await pool.run(slow_double, 1)
+
+
+def test_invalid_executor_type():
+    with pytest.raises(ValueError):
+        BoundedWorkerPool("bad", executor_type="fiber")